@@ -2,6 +2,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from terminusgps_notifier.lifespan import lifespan
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.settings.prod")
 
-application = get_asgi_application()
+application = lifespan(get_asgi_application())
@@ -6,22 +6,33 @@ from authorizenet.constants import constants
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+AUTHORIZENET_SUBSCRIPTION_CACHE_TTL = 300
+AUTHORIZENET_SUBSCRIPTION_STALE_TTL = 86400
+AUTHORIZENET_SUBSCRIPTION_TIMEOUT = 5
 AUTHORIZENET_SERVICE = "terminusgps.authorizenet.service.AuthorizenetService"
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 ASGI_APPLICATION = "src.asgi.application"
+AWS_PINPOINT_ENDPOINT_URL = None
 AWS_PINPOINT_CONFIGURATION_ARN = os.getenv("AWS_PINPOINT_CONFIGURATION_ARN")
+AWS_PINPOINT_MAX_POOL_CONNECTIONS = 50
 AWS_PINPOINT_MAX_PRICE_SMS = os.getenv("AWS_PINPOINT_MAX_PRICE_SMS")
 AWS_PINPOINT_MAX_PRICE_VOICE = os.getenv("AWS_PINPOINT_MAX_PRICE_VOICE")
 AWS_PINPOINT_POOL_ARN = os.getenv("AWS_PINPOINT_POOL_ARN")
 AWS_PINPOINT_PROTECT_ID = os.getenv("AWS_PINPOINT_PROTECT_ID")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_API_URL = "https://api.twilio.com"
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
+TWILIO_MAX_CONNECTIONS = 20
+TWILIO_CALLS_PER_SECOND = 1
 CSRF_COOKIE_SECURE = False
 DEBUG = True
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LANGUAGE_CODE = "en-us"
 MERCHANT_AUTH_ENVIRONMENT = constants.SANDBOX
+WIALON_API_HOST = "hst-api.wialon.com"
+WIALON_API_PORT = 443
+WIALON_API_SCHEME = "https"
 WIALON_TOKEN = os.getenv("WIALON_TOKEN")
 MERCHANT_AUTH_LOGIN_ID = os.getenv("MERCHANT_AUTH_LOGIN_ID")
 MERCHANT_AUTH_TRANSACTION_KEY = os.getenv("MERCHANT_AUTH_TRANSACTION_KEY")
@@ -40,6 +51,41 @@ TIME_ZONE = "America/Chicago"
 USE_I18N = True
 USE_TZ = True
 WSGI_APPLICATION = "src.wsgi.application"
+WIALON_SESSION_CACHE_TTL = 240
+WIALON_PHONES_CACHE_TTL = 300
+WIALON_PHONES_NEGATIVE_CACHE_TTL = 60
+WIALON_PHONES_STALE_TTL = 3600
+WIALON_SYNC_CONCURRENCY = 4
+UNIT_CONTACT_MAX_AGE = 7200
+WIALON_EVENTS_POLL_INTERVAL = 2.0
+WIALON_WATCHERS_REFRESH_INTERVAL = 60
+DISPATCH_HISTORY_PAGE_SIZE = 50
+DISPATCH_LOG_BATCH_SIZE = 1
+DISPATCH_LOG_FLUSH_INTERVAL = 1.0
+DISPATCH_LOG_PENDING_TIMEOUT = 3600
+DISPATCH_LOG_PARTITIONS_AHEAD = 3
+DISPATCH_LOG_RETENTION_MONTHS = 12
+NOTIFICATION_HEDGE_DELAY = 2.0
+NOTIFICATION_HEDGED_METHODS = []
+NOTIFICATION_IDEMPOTENCY_TTL = 300
+NOTIFICATION_BREAKER_ERROR_RATE = 0.5
+NOTIFICATION_BREAKER_MIN_REQUESTS = 10
+NOTIFICATION_BREAKER_OPEN_TIMEOUT = 30
+NOTIFICATION_BREAKER_WINDOW = 60
+METRICS_FLUSH_INTERVAL = 5.0
+SLOW_REQUEST_THRESHOLD = 1.0
+NOTIFICATION_DISPATCH_MODE = "sync"
+NOTIFICATION_DISPATCHER_LIMIT_TIMEOUT = 10
+NOTIFICATION_DISPATCHER_LIMITS = {
+    "terminusgps_notifier.dispatchers.AWSNotificationDispatcher": {
+        "concurrency": 50,
+        "rate": 20,
+    },
+    "terminusgps_notifier.dispatchers.TwilioNotificationDispatcher": {
+        "concurrency": 10,
+        "rate": TWILIO_CALLS_PER_SECOND,
+    },
+}
 NOTIFICATION_DISPATCHERS = {
     "sms": ["terminusgps_notifier.dispatchers.AWSNotificationDispatcher"],
     "voice": [
@@ -91,10 +137,16 @@ DATABASES = {
     }
 }
 
+RQ_QUEUES = {
+    "default": {"HOST": "localhost", "PORT": 6379, "DB": 0},
+    "notifications": {"HOST": "localhost", "PORT": 6379, "DB": 0},
+}
+
 CACHES = {
     "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
 }
 
+INTERNAL_IPS = ["127.0.0.1"]
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.admindocs",
@@ -104,6 +156,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.staticfiles",
     "django.forms",
+    "django_rq",
     "terminusgps_notifier.apps.TerminusgpsNotifierConfig",
 ]
 
@@ -8,6 +8,15 @@ from authorizenet.constants import constants
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+AUTHORIZENET_SUBSCRIPTION_CACHE_TTL = int(
+    os.getenv("AUTHORIZENET_SUBSCRIPTION_CACHE_TTL", 300)
+)
+AUTHORIZENET_SUBSCRIPTION_STALE_TTL = int(
+    os.getenv("AUTHORIZENET_SUBSCRIPTION_STALE_TTL", 86400)
+)
+AUTHORIZENET_SUBSCRIPTION_TIMEOUT = float(
+    os.getenv("AUTHORIZENET_SUBSCRIPTION_TIMEOUT", 5)
+)
 AUTHORIZENET_SERVICE = "terminusgps.authorizenet.service.AuthorizenetService"
 ALLOWED_HOSTS = [
     ".terminusgps.com",
@@ -16,14 +25,21 @@ ALLOWED_HOSTS = [
     gethostbyname(gethostname()),
 ]
 ASGI_APPLICATION = "src.asgi.application"
+AWS_PINPOINT_ENDPOINT_URL = os.getenv("AWS_PINPOINT_ENDPOINT_URL")
 AWS_PINPOINT_CONFIGURATION_ARN = os.getenv("AWS_PINPOINT_CONFIGURATION_ARN")
+AWS_PINPOINT_MAX_POOL_CONNECTIONS = int(
+    os.getenv("AWS_PINPOINT_MAX_POOL_CONNECTIONS", 50)
+)
 AWS_PINPOINT_MAX_PRICE_SMS = os.getenv("AWS_PINPOINT_MAX_PRICE_SMS")
 AWS_PINPOINT_MAX_PRICE_VOICE = os.getenv("AWS_PINPOINT_MAX_PRICE_VOICE")
 AWS_PINPOINT_POOL_ARN = os.getenv("AWS_PINPOINT_POOL_ARN")
 AWS_PINPOINT_PROTECT_ID = os.getenv("AWS_PINPOINT_PROTECT_ID")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_API_URL = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
+TWILIO_MAX_CONNECTIONS = int(os.getenv("TWILIO_MAX_CONNECTIONS", 20))
+TWILIO_CALLS_PER_SECOND = int(os.getenv("TWILIO_CALLS_PER_SECOND", 1))
 CSRF_COOKIE_SECURE = True
 DEBUG = False
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -48,8 +64,74 @@ TIME_ZONE = "America/Chicago"
 USE_I18N = False
 USE_TZ = True
 USE_X_FORWARDED_HOST = True
+WIALON_API_HOST = os.getenv("WIALON_API_HOST", "hst-api.wialon.com")
+WIALON_API_PORT = int(os.getenv("WIALON_API_PORT", 443))
+WIALON_API_SCHEME = os.getenv("WIALON_API_SCHEME", "https")
 WIALON_TOKEN = os.getenv("WIALON_TOKEN")
 WSGI_APPLICATION = "src.wsgi.application"
+WIALON_SESSION_CACHE_TTL = int(os.getenv("WIALON_SESSION_CACHE_TTL", 240))
+WIALON_PHONES_CACHE_TTL = int(os.getenv("WIALON_PHONES_CACHE_TTL", 300))
+WIALON_PHONES_NEGATIVE_CACHE_TTL = int(
+    os.getenv("WIALON_PHONES_NEGATIVE_CACHE_TTL", 60)
+)
+WIALON_PHONES_STALE_TTL = int(os.getenv("WIALON_PHONES_STALE_TTL", 3600))
+WIALON_SYNC_CONCURRENCY = int(os.getenv("WIALON_SYNC_CONCURRENCY", 4))
+UNIT_CONTACT_MAX_AGE = int(os.getenv("UNIT_CONTACT_MAX_AGE", 7200))
+WIALON_EVENTS_POLL_INTERVAL = float(
+    os.getenv("WIALON_EVENTS_POLL_INTERVAL", 2.0)
+)
+WIALON_WATCHERS_REFRESH_INTERVAL = int(
+    os.getenv("WIALON_WATCHERS_REFRESH_INTERVAL", 60)
+)
+DISPATCH_HISTORY_PAGE_SIZE = int(os.getenv("DISPATCH_HISTORY_PAGE_SIZE", 50))
+DISPATCH_LOG_BATCH_SIZE = int(os.getenv("DISPATCH_LOG_BATCH_SIZE", 100))
+DISPATCH_LOG_FLUSH_INTERVAL = float(
+    os.getenv("DISPATCH_LOG_FLUSH_INTERVAL", 1.0)
+)
+DISPATCH_LOG_PENDING_TIMEOUT = int(
+    os.getenv("DISPATCH_LOG_PENDING_TIMEOUT", 3600)
+)
+DISPATCH_LOG_PARTITIONS_AHEAD = int(
+    os.getenv("DISPATCH_LOG_PARTITIONS_AHEAD", 3)
+)
+DISPATCH_LOG_RETENTION_MONTHS = int(
+    os.getenv("DISPATCH_LOG_RETENTION_MONTHS", 12)
+)
+NOTIFICATION_HEDGE_DELAY = float(os.getenv("NOTIFICATION_HEDGE_DELAY", 2.0))
+NOTIFICATION_HEDGED_METHODS = [
+    method
+    for method in os.getenv("NOTIFICATION_HEDGED_METHODS", "").split(",")
+    if method
+]
+NOTIFICATION_IDEMPOTENCY_TTL = int(
+    os.getenv("NOTIFICATION_IDEMPOTENCY_TTL", 300)
+)
+NOTIFICATION_BREAKER_ERROR_RATE = float(
+    os.getenv("NOTIFICATION_BREAKER_ERROR_RATE", 0.5)
+)
+NOTIFICATION_BREAKER_MIN_REQUESTS = int(
+    os.getenv("NOTIFICATION_BREAKER_MIN_REQUESTS", 10)
+)
+NOTIFICATION_BREAKER_OPEN_TIMEOUT = int(
+    os.getenv("NOTIFICATION_BREAKER_OPEN_TIMEOUT", 30)
+)
+NOTIFICATION_BREAKER_WINDOW = int(os.getenv("NOTIFICATION_BREAKER_WINDOW", 60))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5.0))
+SLOW_REQUEST_THRESHOLD = float(os.getenv("SLOW_REQUEST_THRESHOLD", 1.0))
+NOTIFICATION_DISPATCH_MODE = os.getenv("NOTIFICATION_DISPATCH_MODE", "sync")
+NOTIFICATION_DISPATCHER_LIMIT_TIMEOUT = float(
+    os.getenv("NOTIFICATION_DISPATCHER_LIMIT_TIMEOUT", 10)
+)
+NOTIFICATION_DISPATCHER_LIMITS = {
+    "terminusgps_notifier.dispatchers.AWSNotificationDispatcher": {
+        "concurrency": 50,
+        "rate": 20,
+    },
+    "terminusgps_notifier.dispatchers.TwilioNotificationDispatcher": {
+        "concurrency": 10,
+        "rate": TWILIO_CALLS_PER_SECOND,
+    },
+}
 NOTIFICATION_DISPATCHERS = {
     "sms": ["terminusgps_notifier.dispatchers.AWSNotificationDispatcher"],
     "voice": [
@@ -131,10 +213,25 @@ DATABASES = {
     }
 }
 
+RQ_QUEUES = {
+    "default": {"URL": os.getenv("REDIS_URL", "redis://localhost:6379/0")},
+    "notifications": {
+        "URL": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        "DEFAULT_TIMEOUT": 300,
+    },
+}
+
 CACHES = {
-    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://localhost:6379/1"),
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+    }
 }
 
+INTERNAL_IPS = [
+    ip.strip() for ip in os.getenv("INTERNAL_IPS", "").split(",") if ip.strip()
+]
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.admindocs",
@@ -144,6 +241,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.staticfiles",
     "django.forms",
+    "django_rq",
     "terminusgps_notifier.apps.TerminusgpsNotifierConfig",
 ]
 
@@ -10,6 +10,21 @@ class ProfileAdmin(admin.ModelAdmin):
 
 @admin.register(models.DispatchLog)
 class DispatchLogAdmin(admin.ModelAdmin):
-    list_filter = ["method"]
-    list_display = ["unit_id", "method", "phones", "pub_date", "message"]
+    list_filter = ["method", "status"]
+    list_display = [
+        "unit_id",
+        "method",
+        "status",
+        "phones",
+        "deliveries",
+        "pub_date",
+        "message",
+    ]
     date_hierarchy = "pub_date"
+
+
+@admin.register(models.UnitContact)
+class UnitContactAdmin(admin.ModelAdmin):
+    list_display = ["unit_name", "unit_id", "profile", "phones", "sync_date"]
+    list_filter = ["profile"]
+    search_fields = ["unit_name", "unit_id"]
@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TerminusgpsNotifierConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "terminusgps_notifier"
     verbose_name = "Terminus GPS Notifier"
+
+    def ready(self) -> None:
+        # Registers the writers' lifespan hooks
+        from . import metrics, writers  # noqa: F401
+        from .dispatchers import registry
+
+        registry.load(settings.NOTIFICATION_DISPATCHERS)
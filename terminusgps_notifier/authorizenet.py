@@ -1,7 +1,9 @@
 import logging
+import time
 
 from authorizenet import apicontractsv1
 from django.conf import settings
+from django.core.cache import cache
 from lxml.objectify import ObjectifiedElement
 from terminusgps.authorizenet import api
 from terminusgps.authorizenet.service import (
@@ -13,6 +15,8 @@ from . import constants
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_SUBSCRIPTION_STATUSES = ("active", "canceled")
+
 
 def get_authorizenet_service() -> AuthorizenetService:
     """
@@ -97,10 +101,49 @@ def create_customer_profile(
     return anet_service.execute(anet_request)
 
 
+def get_subscription_cache_key(id: int | str) -> str:
+    """Returns the cache key for an Authorizenet subscription's status."""
+    return f"terminusgps_notifier:subscription_status:{id}"
+
+
+def get_cached_subscription_status(id: int | str | None) -> str | None:
+    """
+    Returns the last cached status for an Authorizenet subscription by id, regardless of its age.
+
+    Never calls the Authorizenet API.
+
+    :param id: A subscription id.
+    :type id: int | str | None
+    :returns: The subscription's last known status, if any.
+    :rtype: str | None
+
+    """
+    if not id:
+        return
+    entry = cache.get(get_subscription_cache_key(id))
+    return entry["status"] if entry is not None else None
+
+
+def invalidate_subscription_status(id: int | str | None) -> None:
+    """
+    Removes an Authorizenet subscription's cached status by id.
+
+    :param id: A subscription id.
+    :type id: int | str | None
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    if id:
+        cache.delete(get_subscription_cache_key(id))
+
+
 def get_subscription_status(id: int | None) -> str | None:
     """
     Returns the status for an Authorizenet subscription by id.
 
+    Statuses are cached for :py:attr:`settings.AUTHORIZENET_SUBSCRIPTION_CACHE_TTL` seconds. If the Authorizenet API call fails, the last cached status is returned for up to :py:attr:`settings.AUTHORIZENET_SUBSCRIPTION_STALE_TTL` more seconds.
+
     Possible statuses:
 
         * "active"
@@ -117,15 +160,31 @@ def get_subscription_status(id: int | None) -> str | None:
     """
     if not id:
         return
+    key = get_subscription_cache_key(id)
+    entry = cache.get(key)
+    if entry is not None and entry["expires"] > time.time():
+        return entry["status"]
     anet_service = get_authorizenet_service()
     anet_request = api.get_subscription_status(id)
     try:
         anet_response = anet_service.execute(anet_request)
     except AuthorizenetError as error:
         logger.error(error)
+        if error.code == constants.SUBSCRIPTION_NOT_FOUND:
+            cache.delete(key)
+        elif entry is not None:
+            logger.warning(f"Using stale status for subscription #{id}")
+            return entry["status"]
         return
     else:
-        return str(anet_response.status)
+        ttl = settings.AUTHORIZENET_SUBSCRIPTION_CACHE_TTL
+        status = str(anet_response.status)
+        cache.set(
+            key,
+            {"status": status, "expires": time.time() + ttl},
+            ttl + settings.AUTHORIZENET_SUBSCRIPTION_STALE_TTL,
+        )
+        return status
 
 
 def subscription_is_active(id: int | None) -> bool:
@@ -145,4 +204,4 @@ def subscription_is_active(id: int | None) -> bool:
             return False
         raise
     else:
-        return status in ("active", "canceled")
+        return status in ACTIVE_SUBSCRIPTION_STATUSES
@@ -0,0 +1,179 @@
+import json
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+from django.db import transaction
+
+from terminusgps_notifier import dispatchers, forms, views, wialon
+from terminusgps_notifier.models import DispatchLog
+
+__all__ = [
+    "BENCHMARKS",
+    "compare",
+    "load_baseline",
+    "run_benchmark",
+    "save_baseline",
+]
+
+FORM_DATA = {
+    "user_id": "1",
+    "unit_id": "12345678",
+    "message": "Benchmark message",
+    "msg_time_int": "1700000000",
+    "location": "123 Main St",
+    "unit_name": "Benchmark unit",
+}
+PHONES = [
+    "+15555555555",
+    "+15555555556",
+    "+442071838750",
+    "5555555555",
+    "+1 555 555 5557",
+    "not a phone",
+] * 2
+
+
+def get_valid_form() -> forms.NotificationDispatchForm:
+    form = forms.NotificationDispatchForm(FORM_DATA)
+    form.is_valid()
+    return form
+
+
+def bench_form_validation() -> Callable[[], object]:
+    return lambda: forms.NotificationDispatchForm(FORM_DATA).is_valid()
+
+
+def bench_clean_phones() -> Callable[[], object]:
+    return lambda: wialon.clean_phones(PHONES)
+
+
+def bench_validate_e164_phone_number() -> Callable[[], object]:
+    return lambda: wialon.validate_e164_phone_number("+15555555555")
+
+
+def bench_render_message() -> Callable[[], object]:
+    form = get_valid_form()
+    # The undecorated renderer, without the thread pool hop
+    render = dispatchers.render_message.func
+    return lambda: render(form, "voice")
+
+
+def bench_get_dispatchers() -> Callable[[], object]:
+    return lambda: views.get_dispatchers("voice")
+
+
+def bench_generate_txt() -> Callable[[], object]:
+    return lambda: views.generate_txt(1, "Benchmark message")
+
+
+def bench_generate_act() -> Callable[[], object]:
+    return lambda: views.generate_act("voice")
+
+
+def create_dispatch_log() -> DispatchLog:
+    return DispatchLog(
+        user_id=1,
+        unit_id=12345678,
+        message="Benchmark message",
+        msg_time_int=1700000000,
+        phones=["+15555555555"],
+        deliveries={"+15555555555": "DummyNotificationDispatcher"},
+        method="voice",
+    )
+
+
+def bench_dispatch_log_create() -> Callable[[], object]:
+    def insert():
+        with transaction.atomic():
+            create_dispatch_log().save()
+            transaction.set_rollback(True)
+
+    return insert
+
+
+def bench_dispatch_log_bulk_create() -> Callable[[], object]:
+    def insert():
+        with transaction.atomic():
+            DispatchLog.objects.bulk_create(
+                [create_dispatch_log() for _ in range(100)]
+            )
+            transaction.set_rollback(True)
+
+    return insert
+
+
+#: Benchmark names and setup functions returning the callable to time.
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {
+    "form_validation": bench_form_validation,
+    "clean_phones": bench_clean_phones,
+    "validate_e164_phone_number": bench_validate_e164_phone_number,
+    "render_message": bench_render_message,
+    "get_dispatchers": bench_get_dispatchers,
+    "generate_txt": bench_generate_txt,
+    "generate_act": bench_generate_act,
+    "dispatch_log_create": bench_dispatch_log_create,
+    "dispatch_log_bulk_create_100": bench_dispatch_log_bulk_create,
+}
+
+
+def run_benchmark(
+    setup: Callable[[], Callable[[], object]],
+    number: int | None = None,
+    repeat: int = 5,
+) -> float:
+    """
+    Times a benchmark and returns its fastest time per call.
+
+    :param setup: A benchmark setup function.
+    :type setup: ~collections.abc.Callable
+    :param number: Calls per repetition. Default is :py:obj:`None` (calibrated to take at least 0.2 seconds).
+    :type number: int | None
+    :param repeat: Number of repetitions. Default is ``5``.
+    :type repeat: int
+    :returns: The fastest time per call in seconds.
+    :rtype: float
+
+    """
+    timer = timeit.Timer(setup())
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def load_baseline(path: Path) -> dict[str, float]:
+    """Returns saved seconds per call by benchmark name, or an empty dictionary if there's no baseline."""
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: Path, results: dict[str, float]) -> None:
+    """Saves seconds per call by benchmark name, keeping saved benchmarks that weren't run."""
+    baseline = load_baseline(path)
+    baseline.update(results)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """
+    Returns the names of benchmarks slower than their baseline.
+
+    :param results: Seconds per call by benchmark name.
+    :type results: dict[str, float]
+    :param baseline: Baseline seconds per call by benchmark name.
+    :type baseline: dict[str, float]
+    :param tolerance: Allowed slowdown ratio, e.g. ``0.25`` for 25%.
+    :type tolerance: float
+    :returns: A list of regressed benchmark names.
+    :rtype: list[str]
+
+    """
+    return [
+        name
+        for name, seconds in results.items()
+        if name in baseline and seconds > baseline[name] * (1 + tolerance)
+    ]
@@ -0,0 +1,132 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from terminusgps_notifier.limiters import atomic_incr
+
+__all__ = ["CircuitBreaker", "get_breaker"]
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Tracks a notification dispatcher's error rate and skips it while it's failing.
+
+    State is kept in the cache, so it's shared by every worker using the same cache:
+
+        * Closed - Sends are counted per time window. Once a window saw at least ``min_requests`` sends and ``error_rate`` of them failed, the breaker opens.
+        * Open - The dispatcher is skipped for ``open_timeout`` seconds.
+        * Half-open - One trial send per ``open_timeout`` seconds is let through. A success closes the breaker, a failure opens it again.
+
+    :param name: A unique breaker name, e.g. a dispatcher class path.
+    :type name: str
+    :param error_rate: Failed sends ratio that opens the breaker. Default is ``0.5``.
+    :type error_rate: float
+    :param min_requests: Minimum number of sends in a window before the breaker can open. Default is ``10``.
+    :type min_requests: int
+    :param window: Seconds per error rate window. Default is ``60``.
+    :type window: int
+    :param open_timeout: Seconds the breaker stays open before trial sends. Default is ``30``.
+    :type open_timeout: int
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        min_requests: int = 10,
+        window: int = 60,
+        open_timeout: int = 30,
+    ) -> None:
+        self.name = name
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.open_timeout = open_timeout
+
+    def get_key(self, suffix: str) -> str:
+        """Returns a cache key for the breaker's state."""
+        return f"terminusgps_notifier:breaker:{self.name}:{suffix}"
+
+    def allow(self) -> bool:
+        """
+        Returns whether the dispatcher should be used.
+
+        :returns: :py:obj:`False` if the breaker is open, or half-open and a trial send is already running.
+        :rtype: bool
+
+        """
+        state = cache.get_many([self.get_key("open"), self.get_key("tripped")])
+        if self.get_key("open") in state:
+            return False
+        if self.get_key("tripped") in state:
+            # Half-open, let one trial send through
+            return cache.add(self.get_key("probe"), True, self.open_timeout)
+        return True
+
+    async def record_success(self) -> None:
+        """Counts a successful send, closing the breaker if it was half-open."""
+        await self._count("requests")
+        if await cache.aget(self.get_key("tripped")):
+            logger.info(f"Closing circuit breaker for '{self.name}'")
+            window = int(time.time() // self.window)
+            await cache.adelete_many(
+                [
+                    self.get_key("tripped"),
+                    self.get_key("probe"),
+                    self.get_key(f"requests:{window}"),
+                    self.get_key(f"errors:{window}"),
+                ]
+            )
+
+    async def record_failure(self) -> None:
+        """Counts a failed send, opening the breaker if the error rate was reached or it was half-open."""
+        requests = await self._count("requests")
+        errors = await self._count("errors")
+        if await cache.aget(self.get_key("tripped")):
+            await self.open()
+        elif (
+            requests is not None
+            and errors is not None
+            and requests >= self.min_requests
+            and errors / requests >= self.error_rate
+        ):
+            await self.open()
+
+    async def open(self) -> None:
+        """Opens the breaker for :py:attr:`open_timeout` seconds."""
+        logger.warning(f"Opening circuit breaker for '{self.name}'")
+        await cache.aset(self.get_key("open"), True, self.open_timeout)
+        await cache.aset(self.get_key("tripped"), True, None)
+        await cache.adelete(self.get_key("probe"))
+
+    async def _count(self, counter: str) -> int | None:
+        key = self.get_key(f"{counter}:{int(time.time() // self.window)}")
+        await cache.aadd(key, 0, self.window * 2)
+        try:
+            return await atomic_incr(key)
+        except ValueError:
+            return
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Returns a circuit breaker configured by settings.
+
+    :param name: A notification dispatcher class path.
+    :type name: str
+    :returns: A circuit breaker.
+    :rtype: ~terminusgps_notifier.breakers.CircuitBreaker
+
+    """
+    return CircuitBreaker(
+        name,
+        error_rate=settings.NOTIFICATION_BREAKER_ERROR_RATE,
+        min_requests=settings.NOTIFICATION_BREAKER_MIN_REQUESTS,
+        window=settings.NOTIFICATION_BREAKER_WINDOW,
+        open_timeout=settings.NOTIFICATION_BREAKER_OPEN_TIMEOUT,
+    )
@@ -6,9 +6,11 @@ __all__ = [
     "HOSTED_PROFILE_PAGE_SETTINGS",
     "SUBSCRIPTION_NOT_FOUND",
     "TIMEZONES",
+    "WIALON_INVALID_SESSION",
 ]
 
 SUBSCRIPTION_NOT_FOUND = "E00035"
+WIALON_INVALID_SESSION = 1
 
 HOSTED_PROFILE_PAGE_SETTINGS_LIST = [
     apicontractsv1.settingType(
@@ -0,0 +1,140 @@
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from terminusgps.wialon.session import WialonAPIError
+
+from terminusgps_notifier.models import Profile, UnitContact
+from terminusgps_notifier.wialon import (
+    call_with_token_session,
+    clean_phones,
+    get_unit_contacts,
+)
+
+__all__ = [
+    "aget_synced_phones",
+    "fetch_unit_contacts",
+    "get_synced_phones",
+    "save_unit_contacts",
+    "sync_unit_contacts",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_synced_phones_queryset(user_id: int, unit_id: int) -> QuerySet:
+    """Returns a queryset of a unit contact's phone numbers, excluding contacts synced more than :py:attr:`settings.UNIT_CONTACT_MAX_AGE` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=settings.UNIT_CONTACT_MAX_AGE)
+    return UnitContact.objects.filter(
+        profile__user_id=user_id, unit_id=unit_id, sync_date__gte=cutoff
+    ).values_list("phones", flat=True)
+
+
+def get_synced_phones(user_id: int, unit_id: int) -> list[str] | None:
+    """
+    Returns the phone numbers synced for a user's unit.
+
+    :param user_id: A user id.
+    :type user_id: int
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
+    :returns: A list of phone numbers, or :py:obj:`None` if the unit wasn't synced recently.
+    :rtype: list[str] | None
+
+    """
+    return get_synced_phones_queryset(user_id, unit_id).first()
+
+
+async def aget_synced_phones(user_id: int, unit_id: int) -> list[str] | None:
+    """Async version of :py:func:`get_synced_phones`."""
+    return await get_synced_phones_queryset(user_id, unit_id).afirst()
+
+
+def fetch_unit_contacts(token: str) -> dict[int, dict] | None:
+    """
+    Calls the Wialon API and returns the name and cleaned phone numbers of every unit a token can access.
+
+    :param token: A Wialon API token.
+    :type token: str
+    :returns: A dictionary of unit ids and unit contacts, or :py:obj:`None` if the Wialon API call failed.
+    :rtype: dict[int, dict] | None
+
+    """
+    try:
+        contacts = call_with_token_session(token, get_unit_contacts)
+    except WialonAPIError as error:
+        logger.error(error)
+        return
+    for contact in contacts.values():
+        contact["phones"] = clean_phones(contact["phones"])
+    return contacts
+
+
+@transaction.atomic
+def save_unit_contacts(profile: Profile, contacts: dict[int, dict]) -> int:
+    """
+    Replaces a profile's unit contacts.
+
+    Units that are no longer accessible are deleted.
+
+    :param profile: A profile.
+    :type profile: ~terminusgps_notifier.models.Profile
+    :param contacts: A dictionary of unit ids and unit contacts.
+    :type contacts: dict[int, dict]
+    :returns: The number of saved unit contacts.
+    :rtype: int
+
+    """
+    now = timezone.now()
+    UnitContact.objects.bulk_create(
+        [
+            UnitContact(
+                profile=profile,
+                unit_id=unit_id,
+                unit_name=contact["name"][:255],
+                phones=contact["phones"],
+                sync_date=now,
+            )
+            for unit_id, contact in contacts.items()
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["profile", "unit_id"],
+        update_fields=["unit_name", "phones", "sync_date"],
+    )
+    UnitContact.objects.filter(profile=profile, sync_date__lt=now).delete()
+    return len(contacts)
+
+
+def sync_unit_contacts(profiles: Iterable[Profile] | None = None) -> int:
+    """
+    Syncs unit contacts from Wialon for profiles with a Wialon API token.
+
+    Wialon API calls run in parallel, up to :py:attr:`settings.WIALON_SYNC_CONCURRENCY` profiles at a time. A profile's unit contacts are kept if its Wialon API call failed. Unit contacts are ignored once they're older than :py:attr:`settings.UNIT_CONTACT_MAX_AGE` seconds, so syncs must be scheduled more often than that.
+
+    :param profiles: Profiles to sync. Default is :py:obj:`None` (every profile).
+    :type profiles: ~collections.abc.Iterable[~terminusgps_notifier.models.Profile] | None
+    :returns: The number of synced profiles.
+    :rtype: int
+
+    """
+    if profiles is None:
+        profiles = Profile.objects.all()
+    profiles = [profile for profile in profiles if profile.token]
+    synced = 0
+    with ThreadPoolExecutor(settings.WIALON_SYNC_CONCURRENCY) as executor:
+        results = executor.map(
+            fetch_unit_contacts, [profile.token for profile in profiles]
+        )
+        for profile, contacts in zip(profiles, results):
+            if contacts is None:
+                continue
+            count = save_unit_contacts(profile, contacts)
+            logger.debug(f"Synced {count} unit(s) for profile #{profile.pk}")
+            synced += 1
+    return synced
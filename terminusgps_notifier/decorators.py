@@ -1,20 +1,43 @@
 import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
 
 import wialon.api
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.models import AbstractBaseUser
-from django.http import HttpRequest, HttpResponse
+from django.core.cache import cache
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+)
 from django.shortcuts import get_object_or_404, redirect
-from terminusgps.wialon.session import WialonSession
 
+from .constants import WIALON_INVALID_SESSION
+from .limiters import atomic_incr
+from .metrics import increment, observe, stage_timer
 from .models import Profile
+from .wialon import get_session
 
 __all__ = [
     "htmx_template",
     "active_subscription_required",
+    "idempotent_notification",
+    "internal_only",
+    "measured_notification",
     "persistent_wialon_session",
+    "server_timing",
 ]
 
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_FIELDS = ("user_id", "unit_id", "msg_time_int", "message")
+
 
 class HtmxHttpRequest(HttpRequest):
     template_name: str
@@ -27,10 +50,10 @@ def get_wialon_api_token_from_user(user: AbstractBaseUser) -> str | None:
 
 def wialon_session_is_valid(sid: str | None = None) -> bool:
     try:
-        session = WialonSession(sid=sid)
+        session = get_session(sid)
         session.wialon_api.avl_evts()
     except wialon.api.WialonError as error:
-        if error._code == 1:
+        if error._code == WIALON_INVALID_SESSION:
             return False
         raise
     else:
@@ -62,18 +85,19 @@ def persistent_wialon_session(view_func=None):
         def inner_wrapper(request, *args, **kwargs) -> HttpResponse:
             sid = request.session.pop("wialon_sid", None)
             token = get_wialon_api_token_from_user(request.user)
-            if wialon_session_is_valid(sid):
-                # Resume Wialon API session
-                request.session["wialon_sid"] = sid
-            elif token:
-                # Refresh Wialon API session
-                session = WialonSession(sid=None)
-                session.token_login(token=token)
-                request.session["wialon_sid"] = session.id
-            else:
-                msg = "You need to connect your Wialon account to do that."
-                messages.error(request, msg)
-                return redirect("terminusgps_notifier:dashboard")
+            with stage_timer(request, "session"):
+                if wialon_session_is_valid(sid):
+                    # Resume Wialon API session
+                    request.session["wialon_sid"] = sid
+                elif token:
+                    # Refresh Wialon API session
+                    session = get_session(None)
+                    session.token_login(token=token)
+                    request.session["wialon_sid"] = session.id
+                else:
+                    msg = "You need to connect your Wialon account to do that."
+                    messages.error(request, msg)
+                    return redirect("terminusgps_notifier:dashboard")
             return view_func(request, *args, **kwargs)
 
         return inner_wrapper
@@ -84,6 +108,26 @@ def persistent_wialon_session(view_func=None):
         return outer_wrapper(view_func)
 
 
+def internal_only(view_func):
+    """
+    Restricts a view to staff users and requests from :py:attr:`settings.INTERNAL_IPS`.
+
+    Other requests receive status code 403.
+
+    """
+
+    @functools.wraps(view_func)
+    def inner_wrapper(request, *args, **kwargs) -> HttpResponse:
+        if not (
+            request.user.is_staff
+            or request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+        ):
+            return HttpResponseForbidden()
+        return view_func(request, *args, **kwargs)
+
+    return inner_wrapper
+
+
 def htmx_template(template_name: str):
     def request_is_htmx(request: HttpRequest) -> bool:
         hx_request = bool(request.headers.get("HX-Request"))
@@ -102,3 +146,170 @@ def htmx_template(template_name: str):
         return inner_wrapper
 
     return outer_wrapper
+
+
+def get_idempotency_key(request: HttpRequest, method: str) -> str | None:
+    """
+    Returns the idempotency cache key for a notification request.
+
+    :param request: A notification request.
+    :type request: ~django.http.HttpRequest
+    :param method: A notification method.
+    :type method: str
+    :returns: A cache key, or :py:obj:`None` if the request was missing a field.
+    :rtype: str | None
+
+    """
+    values = [request.POST.get(field) for field in IDEMPOTENCY_FIELDS]
+    if None in values:
+        return
+    payload = json.dumps([*values, method]).encode("utf-8")
+    digest = hashlib.sha256(payload).hexdigest()
+    return f"terminusgps_notifier:idempotency:{digest}"
+
+
+def get_idempotency_stats() -> dict[str, int]:
+    """Returns the number of duplicate (hits) and unique (misses) notification requests."""
+    keys = {
+        stat: f"terminusgps_notifier:idempotency_{stat}"
+        for stat in ("hits", "misses")
+    }
+    counts = cache.get_many(keys.values())
+    return {stat: counts.get(key, 0) for stat, key in keys.items()}
+
+
+async def count_idempotency_stat(stat: str) -> None:
+    key = f"terminusgps_notifier:idempotency_{stat}"
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await atomic_incr(key)
+    except ValueError:
+        pass
+
+
+def idempotent_notification(view_func):
+    """
+    Drops duplicate notification requests for :py:attr:`settings.NOTIFICATION_IDEMPOTENCY_TTL` seconds.
+
+    Requests are identified by their user id, unit id, message time, message and method. Duplicates receive the first request's response, or status code 202 if it's still being handled. Responses with status code 500 or greater aren't kept, so the request can be retried.
+
+    """
+
+    @functools.wraps(view_func)
+    async def inner_wrapper(request, method, *args, **kwargs) -> HttpResponse:
+        key = get_idempotency_key(request, method)
+        if key is None:
+            return await view_func(request, method, *args, **kwargs)
+        ttl = settings.NOTIFICATION_IDEMPOTENCY_TTL
+        if not await cache.aadd(key, {"status": None}, ttl):
+            await count_idempotency_stat("hits")
+            entry = await cache.aget(key) or {"status": None}
+            if entry["status"] is None:
+                response = HttpResponse(
+                    "Duplicate in progress".encode("utf-8"), status=202
+                )
+            else:
+                response = HttpResponse(
+                    entry["content"],
+                    status=entry["status"],
+                    content_type=entry["content_type"],
+                )
+            response["Idempotent-Replayed"] = "true"
+            return response
+        await count_idempotency_stat("misses")
+        try:
+            response = await view_func(request, method, *args, **kwargs)
+        except Exception:
+            await cache.adelete(key)
+            raise
+        if response.status_code >= 500:
+            await cache.adelete(key)
+        else:
+            entry = {
+                "status": response.status_code,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+            }
+            await cache.aset(key, entry, ttl)
+        return response
+
+    return inner_wrapper
+
+
+def measured_notification(view_func):
+    """Records notification request latency and response status code metrics for valid methods."""
+
+    @functools.wraps(view_func)
+    async def inner_wrapper(request, method, *args, **kwargs) -> HttpResponse:
+        if method not in settings.NOTIFICATION_DISPATCHERS:
+            return await view_func(request, method, *args, **kwargs)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await view_func(request, method, *args, **kwargs)
+            status = response.status_code
+            return response
+        except Http404:
+            status = 404
+            raise
+        finally:
+            observe(
+                "notify_request_seconds",
+                time.perf_counter() - start,
+                method=method,
+            )
+            increment("notify_requests_total", method=method, status=status)
+
+    return inner_wrapper
+
+
+def add_server_timing(request, response: HttpResponse, start: float) -> None:
+    total = time.perf_counter() - start
+    timings = {**request.timings, "total": total}
+    response["Server-Timing"] = ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}"
+        for stage, seconds in timings.items()
+    )
+    if total >= settings.SLOW_REQUEST_THRESHOLD:
+        breakdown = {
+            stage: round(seconds * 1000, 1)
+            for stage, seconds in timings.items()
+        }
+        logger.warning(
+            f"Slow request {request.method} {request.path} {response.status_code}: {json.dumps(breakdown)}",
+            extra={"timings": breakdown},
+        )
+
+
+def server_timing(view_func):
+    """
+    Adds a ``Server-Timing`` header with the duration of each request stage in milliseconds.
+
+    Stages are timed by :py:func:`~terminusgps_notifier.metrics.stage_timer`. Requests taking at least :py:attr:`settings.SLOW_REQUEST_THRESHOLD` seconds are logged with the same breakdown.
+
+    """
+    if inspect.iscoroutinefunction(view_func):
+
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs) -> HttpResponse:
+            request.timings = {}
+            start = time.perf_counter()
+            response = await view_func(request, *args, **kwargs)
+            add_server_timing(request, response, start)
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def inner_wrapper(request, *args, **kwargs) -> HttpResponse:
+        request.timings = {}
+        start = time.perf_counter()
+        response = view_func(request, *args, **kwargs)
+        if not getattr(response, "is_rendered", True):
+            # Template responses are rendered lazily, after the view returns
+            with stage_timer(request, "render"):
+                response.render()
+        add_server_timing(request, response, start)
+        return response
+
+    return inner_wrapper
@@ -1,89 +1,250 @@
+import asyncio
 import datetime
 import logging
+import statistics
+import time
 from abc import ABC, abstractmethod
+from collections import defaultdict, deque
 
 import aioboto3
+from aiobotocore.config import AioConfig
+from aiohttp import ClientSession, TCPConnector
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http.response import sync_to_async
 from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
 from twilio.http.async_http_client import AsyncTwilioHttpClient
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 
+from .breakers import get_breaker
 from .forms import NotificationDispatchForm
+from .lifespan import on_shutdown, on_startup
+from .limiters import get_limiter
+from .metrics import increment, timer
 
 logger = logging.getLogger(__name__)
 
 
+class ClientPool(ABC):
+    """
+    Per-process pool of long-lived async API clients.
+
+    Async API clients are bound to the event loop that created them, so one client is kept per event loop and key.
+
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[asyncio.AbstractEventLoop, dict] = {}
+
+    @abstractmethod
+    async def create_client(self, *key):
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    async def close_client(self, client) -> None:
+        await client.close()
+
+    async def get_client(self, *key):
+        """
+        Returns a long-lived client for the running event loop, creating it if necessary.
+
+        :param key: Arguments passed to :py:meth:`create_client`.
+        :returns: An async API client.
+
+        """
+        loop = asyncio.get_running_loop()
+        for closed_loop in [lp for lp in self._clients if lp.is_closed()]:
+            del self._clients[closed_loop]
+        clients = self._clients.setdefault(loop, {})
+        if key not in clients:
+            clients[key] = loop.create_task(self.create_client(*key))
+        try:
+            return await clients[key]
+        except Exception:
+            clients.pop(key, None)
+            raise
+
+    async def close(self) -> None:
+        """Closes every client created for the running event loop."""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for task in clients.values():
+            try:
+                client = await task
+            except Exception:
+                continue
+            await self.close_client(client)
+
+
+class AWSClientPool(ClientPool):
+    """
+    Pool of long-lived aioboto3 clients, one per event loop, service and region.
+
+    Each client reuses up to :py:attr:`settings.AWS_PINPOINT_MAX_POOL_CONNECTIONS` warm HTTP connections.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.session = aioboto3.Session()
+
+    async def create_client(self, service: str, region_name: str):
+        config = AioConfig(
+            max_pool_connections=settings.AWS_PINPOINT_MAX_POOL_CONNECTIONS
+        )
+        context = self.session.client(
+            service,
+            region_name=region_name,
+            endpoint_url=settings.AWS_PINPOINT_ENDPOINT_URL,
+            config=config,
+        )
+        return await context.__aenter__()
+
+
+class TwilioClientPool(ClientPool):
+    """
+    Pool of long-lived Twilio clients, one per event loop.
+
+    Each client shares a single aiohttp session limited to :py:attr:`settings.TWILIO_MAX_CONNECTIONS` concurrent connections. Requests beyond the limit wait for a free connection.
+
+    """
+
+    async def create_client(self) -> Client:
+        http_client = AsyncTwilioHttpClient(pool_connections=False)
+        http_client.session = ClientSession(
+            connector=TCPConnector(limit=settings.TWILIO_MAX_CONNECTIONS)
+        )
+        client = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=http_client,
+        )
+        client.api.base_url = settings.TWILIO_API_URL
+        return client
+
+    async def close_client(self, client: Client) -> None:
+        await client.http_client.close()
+
+
+aws_clients = AWSClientPool()
+twilio_clients = TwilioClientPool()
+
+
+@on_shutdown
+async def close_clients() -> None:
+    """Closes every long-lived dispatcher client created for the running event loop."""
+    await aws_clients.close()
+    await twilio_clients.close()
+
+
+MESSAGE_TEMPLATES = {
+    "sms": "terminusgps_notifier/message_sms.txt",
+    "voice": "terminusgps_notifier/message_voice.txt",
+}
+
+
+@sync_to_async
+def render_message(form: NotificationDispatchForm, method: str) -> str:
+    """
+    Renders a notification message for a method.
+
+    :param form: A valid notification dispatch form.
+    :type form: ~terminusgps_notifier.forms.NotificationDispatchForm
+    :param method: A notification method.
+    :type method: str
+    :returns: A rendered notification message.
+    :rtype: str
+
+    """
+    msg_time_int = form.cleaned_data["msg_time_int"]
+    context = form.cleaned_data.copy()
+    context["date"] = datetime.datetime.fromtimestamp(float(msg_time_int))
+    return render_to_string(MESSAGE_TEMPLATES[method], context)
+
+
 class NotificationDispatcher(ABC):
-    def __init__(self, form: NotificationDispatchForm) -> None:
-        if not form.is_valid():
-            raise ValueError("Form must be valid")
-        self.form = form
-
-    @sync_to_async
-    def render_message(self, template_name: str) -> str:
-        msg_time_int = self.form.cleaned_data["msg_time_int"]
-        context = self.form.cleaned_data.copy()
-        context["date"] = datetime.datetime.fromtimestamp(float(msg_time_int))
-        return render_to_string(template_name, context)
+    """
+    Stateless notification dispatcher.
+
+    Dispatchers are created once per process by :py:data:`registry` and shared by every request, so the notification message is passed to each send.
+
+    """
+
+    async def start(self) -> None:
+        """Prepares the dispatcher when the server starts."""
+
+    async def stop(self) -> None:
+        """Releases the dispatcher's resources when the server exits."""
 
     @abstractmethod
     async def send_voice(
-        self, to_number: str, dry_run: bool = False, **kwargs
+        self, to_number: str, message: str, dry_run: bool = False, **kwargs
     ) -> str | None:
         raise NotImplementedError("Subclasses must implement this method.")
 
     @abstractmethod
     async def send_sms(
-        self, to_number: str, dry_run: bool = False, **kwargs
+        self, to_number: str, message: str, dry_run: bool = False, **kwargs
     ) -> str | None:
         raise NotImplementedError("Subclasses must implement this method.")
 
     async def send_notification(
-        self, to_number: str, method: str
+        self, to_number: str, method: str, message: str, dry_run: bool = False
     ) -> str | None:
-        dry_run = self.form.cleaned_data.get("dry_run", False)
-        if method == "sms":
-            return await self.send_sms(to_number, dry_run)
-        elif method == "voice":
-            return await self.send_voice(to_number, dry_run)
-        else:
+        if method not in ("sms", "voice"):
             raise ValueError(f"Invalid method: '{method}'")
+        cls = type(self)
+        path = f"{cls.__module__}.{cls.__qualname__}"
+        breaker = get_breaker(path)
+        labels = {"method": method, "dispatcher": cls.__name__}
+        async with get_limiter(path).limit():
+            try:
+                with timer("dispatcher_send_seconds", **labels):
+                    if method == "sms":
+                        result = await self.send_sms(
+                            to_number, message, dry_run
+                        )
+                    else:
+                        result = await self.send_voice(
+                            to_number, message, dry_run
+                        )
+            except Exception:
+                increment("dispatcher_send_errors_total", **labels)
+                await breaker.record_failure()
+                raise
+        await breaker.record_success()
+        return result
 
 
 class DummyNotificationDispatcher(NotificationDispatcher):
     async def send_voice(
-        self, to_number: str, dry_run: bool = False, **kwargs
+        self, to_number: str, message: str, dry_run: bool = False, **kwargs
     ) -> str | None:
-        message = await self.render_message(
-            "terminusgps_notifier/message_voice.txt"
-        )
         logger.info(f"Sending '{message}' to '{to_number}' via voice...")
         logger.info(f"Sent '{message}' to '{to_number}'.")
 
     async def send_sms(
-        self, to_number: str, dry_run: bool = False, **kwargs
+        self, to_number: str, message: str, dry_run: bool = False, **kwargs
     ) -> str | None:
-        message = await self.render_message(
-            "terminusgps_notifier/message_sms.txt"
-        )
         logger.info(f"Sending '{message}' to '{to_number}' via voice...")
         logger.info(f"Sent '{message}' to '{to_number}'.")
 
 
 class AWSNotificationDispatcher(NotificationDispatcher):
-    def __init__(
-        self, form: NotificationDispatchForm, region_name: str = "us-east-1"
-    ) -> None:
-        super().__init__(form=form)
-        self.session = aioboto3.Session()
+    def __init__(self, region_name: str = "us-east-1") -> None:
         self.service = "pinpoint-sms-voice-v2"
         self.region_name = region_name
 
+    async def start(self) -> None:
+        """Creates the event loop's AWS client ahead of the first send."""
+        await aws_clients.get_client(self.service, self.region_name)
+
     async def send_voice(
         self,
         to_number: str,
+        message: str,
         dry_run: bool = False,
         *,
         message_type: str = "TEXT",
@@ -93,33 +254,29 @@ class AWSNotificationDispatcher(NotificationDispatcher):
         mppm: str | None = None,
         protect_id: str | None = None,
     ):
-        message = await self.render_message(
-            "terminusgps_notifier/message_voice.txt"
+        client = await aws_clients.get_client(self.service, self.region_name)
+        return await client.send_voice_message(
+            **{
+                "DestinationPhoneNumber": to_number,
+                "OriginationIdentity": pool_arn
+                or settings.AWS_PINPOINT_POOL_ARN,
+                "MessageBody": message,
+                "MessageBodyTextType": message_type,
+                "VoiceId": voice_id,
+                "ConfigurationSetName": config_arn
+                or settings.AWS_PINPOINT_CONFIGURATION_ARN,
+                "MaxPricePerMinute": mppm
+                or settings.AWS_PINPOINT_MAX_PRICE_VOICE,
+                "DryRun": dry_run,
+                "ProtectConfigurationId": protect_id
+                or settings.AWS_PINPOINT_PROTECT_ID,
+            }
         )
-        async with self.session.client(
-            self.service, region_name=self.region_name
-        ) as client:
-            return await client.send_voice_message(
-                **{
-                    "DestinationPhoneNumber": to_number,
-                    "OriginationIdentity": pool_arn
-                    or settings.AWS_PINPOINT_POOL_ARN,
-                    "MessageBody": message,
-                    "MessageBodyTextType": message_type,
-                    "VoiceId": voice_id,
-                    "ConfigurationSetName": config_arn
-                    or settings.AWS_PINPOINT_CONFIGURATION_ARN,
-                    "MaxPricePerMinute": mppm
-                    or settings.AWS_PINPOINT_MAX_PRICE_VOICE,
-                    "DryRun": dry_run,
-                    "ProtectConfigurationId": protect_id
-                    or settings.AWS_PINPOINT_PROTECT_ID,
-                }
-            )
 
     async def send_sms(
         self,
         to_number: str,
+        message: str,
         dry_run: bool = False,
         *,
         ttl: int = 300,
@@ -128,34 +285,34 @@ class AWSNotificationDispatcher(NotificationDispatcher):
         mpps: str | None = None,
         protect_id: str | None = None,
     ):
-        message = await self.render_message(
-            "terminusgps_notifier/message_sms.txt"
+        client = await aws_clients.get_client(self.service, self.region_name)
+        return await client.send_text_message(
+            **{
+                "DestinationPhoneNumber": to_number,
+                "OriginationIdentity": pool_arn
+                or settings.AWS_PINPOINT_POOL_ARN,
+                "MessageBody": message,
+                "MessageType": "TRANSACTIONAL",
+                "ConfigurationSetName": config_arn
+                or settings.AWS_PINPOINT_CONFIGURATION_ARN,
+                "MaxPrice": mpps or settings.AWS_PINPOINT_MAX_PRICE_SMS,
+                "TimeToLive": ttl,
+                "DryRun": dry_run,
+                "ProtectConfigurationId": protect_id
+                or settings.AWS_PINPOINT_PROTECT_ID,
+            }
         )
-        async with self.session.client(
-            self.service, region_name=self.region_name
-        ) as client:
-            return await client.send_text_message(
-                **{
-                    "DestinationPhoneNumber": to_number,
-                    "OriginationIdentity": pool_arn
-                    or settings.AWS_PINPOINT_POOL_ARN,
-                    "MessageBody": message,
-                    "MessageType": "TRANSACTIONAL",
-                    "ConfigurationSetName": config_arn
-                    or settings.AWS_PINPOINT_CONFIGURATION_ARN,
-                    "MaxPrice": mpps or settings.AWS_PINPOINT_MAX_PRICE_SMS,
-                    "TimeToLive": ttl,
-                    "DryRun": dry_run,
-                    "ProtectConfigurationId": protect_id
-                    or settings.AWS_PINPOINT_PROTECT_ID,
-                }
-            )
 
 
 class TwilioNotificationDispatcher(NotificationDispatcher):
+    async def start(self) -> None:
+        """Creates the event loop's Twilio client ahead of the first send."""
+        await twilio_clients.get_client()
+
     async def send_voice(
         self,
         to_number: str,
+        message: str,
         dry_run: bool = False,
         *,
         voice: str = "woman",
@@ -163,33 +320,235 @@ class TwilioNotificationDispatcher(NotificationDispatcher):
     ):
         if dry_run:
             return
-        raw = await self.render_message(
-            "terminusgps_notifier/message_voice.txt"
-        )
-        message = VoiceResponse()
-        message.say(raw, voice=voice)
-        client = Client(http_client=AsyncTwilioHttpClient())
+        twiml = VoiceResponse()
+        twiml.say(message, voice=voice)
+        client = await twilio_clients.get_client()
         return await client.calls.create_async(
             to=to_number,
             from_=from_number or settings.TWILIO_FROM_NUMBER,
-            twiml=message,
+            twiml=twiml,
         )
 
     async def send_sms(
         self,
         to_number: str,
+        message: str,
         dry_run: bool = False,
         *,
         from_number: str | None = None,
     ):
         if dry_run:
             return
-        message = await self.render_message(
-            "terminusgps_notifier/message_sms.txt"
-        )
-        client = Client(http_client=AsyncTwilioHttpClient())
+        client = await twilio_clients.get_client()
         return await client.messages.create_async(
             to=to_number,
             from_=from_number or settings.TWILIO_FROM_NUMBER,
             body=message,
         )
+
+
+#: Recent send latencies per dispatcher class, used to derive hedge delays.
+send_latencies: dict[str, deque[float]] = defaultdict(
+    lambda: deque(maxlen=200)
+)
+
+
+def get_hedge_delay(dispatcher: NotificationDispatcher) -> float:
+    """
+    Returns how many seconds to wait on a dispatcher before hedging with the next one.
+
+    The delay is the dispatcher's 95th percentile send latency, or :py:attr:`settings.NOTIFICATION_HEDGE_DELAY` until 20 sends were measured.
+
+    :param dispatcher: A notification dispatcher.
+    :type dispatcher: ~terminusgps_notifier.dispatchers.NotificationDispatcher
+    :returns: A delay in seconds.
+    :rtype: float
+
+    """
+    samples = send_latencies[type(dispatcher).__name__]
+    if len(samples) < 20:
+        return settings.NOTIFICATION_HEDGE_DELAY
+    return statistics.quantiles(samples, n=20)[-1]
+
+
+async def send_hedged_notification(
+    dispatchers: list[NotificationDispatcher],
+    to_number: str,
+    method: str,
+    message: str,
+    dry_run: bool = False,
+) -> str:
+    """
+    Sends a notification with the first dispatcher, hedging with the next dispatcher if it didn't accept the recipient in time.
+
+    A dispatcher is started once the previous one failed or took longer than its :py:func:`get_hedge_delay`. The first dispatcher to succeed wins and every other started dispatcher is cancelled. A cancelled send may still have reached its provider.
+
+    :param dispatchers: A list of notification dispatchers, in order of preference.
+    :type dispatchers: list[~terminusgps_notifier.dispatchers.NotificationDispatcher]
+    :param to_number: An E.164 formatted phone number.
+    :type to_number: str
+    :param method: A notification method.
+    :type method: str
+    :param message: A rendered notification message.
+    :type message: str
+    :param dry_run: Whether to validate the send without delivering it. Default is :py:obj:`False`.
+    :type dry_run: bool
+    :raises Exception: The last dispatcher error if every dispatcher failed.
+    :returns: The name of the dispatcher that delivered the notification.
+    :rtype: str
+
+    """
+
+    async def send(dispatcher: NotificationDispatcher) -> None:
+        start = time.monotonic()
+        try:
+            await dispatcher.send_notification(
+                to_number, method, message, dry_run
+            )
+        except asyncio.CancelledError:
+            # A lower bound, but keeps slow dispatchers from looking fast
+            send_latencies[type(dispatcher).__name__].append(
+                time.monotonic() - start
+            )
+            raise
+        send_latencies[type(dispatcher).__name__].append(
+            time.monotonic() - start
+        )
+
+    queue = list(dispatchers)
+    tasks: dict[asyncio.Task, NotificationDispatcher] = {}
+    error: BaseException | None = None
+    try:
+        while queue or tasks:
+            if not tasks:
+                dispatcher = queue.pop(0)
+                tasks[asyncio.create_task(send(dispatcher))] = dispatcher
+            timeout = get_hedge_delay(dispatcher) if queue else None
+            done, _ = await asyncio.wait(
+                tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                dispatcher = queue.pop(0)
+                tasks[asyncio.create_task(send(dispatcher))] = dispatcher
+                continue
+            for task in done:
+                winner = tasks.pop(task)
+                if task.exception() is None:
+                    return type(winner).__name__
+                error = task.exception()
+                logger.error(
+                    f"{type(winner).__name__} failed for '{to_number}': '{error}'"
+                )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    raise error or ValueError("No dispatchers")
+
+
+class DispatcherRegistry:
+    """
+    Resolves and validates each method's dispatcher chain once per process.
+
+    Every dispatcher path is imported and instantiated once, and the instance is shared by every method using it.
+
+    """
+
+    def __init__(self) -> None:
+        self.dispatchers: dict[str, NotificationDispatcher] = {}
+        self.chains: dict[str, list[tuple[str, NotificationDispatcher]]] = {}
+
+    def load(self, config: dict[str, list[str]]) -> None:
+        """
+        Replaces the registry's dispatcher chains.
+
+        :param config: A dictionary of notification methods and dispatcher paths, in order of preference.
+        :type config: dict[str, list[str]]
+        :raises ~django.core.exceptions.ImproperlyConfigured: If a method or dispatcher path was invalid.
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        dispatchers, chains = {}, {}
+        for method, paths in config.items():
+            if method not in MESSAGE_TEMPLATES:
+                raise ImproperlyConfigured(
+                    f"Invalid notification method: '{method}'"
+                )
+            for path in paths:
+                if path not in dispatchers:
+                    dispatchers[path] = self.create_dispatcher(path)
+            chains[method] = [(path, dispatchers[path]) for path in paths]
+        self.dispatchers, self.chains = dispatchers, chains
+
+    @staticmethod
+    def create_dispatcher(path: str) -> NotificationDispatcher:
+        try:
+            dispatcher_cls = import_string(path)
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                f"Failed to import dispatcher '{path}': '{error}'"
+            ) from error
+        if not (
+            isinstance(dispatcher_cls, type)
+            and issubclass(dispatcher_cls, NotificationDispatcher)
+        ):
+            raise ImproperlyConfigured(
+                f"'{path}' isn't a NotificationDispatcher subclass"
+            )
+        return dispatcher_cls()
+
+    def get_chain(
+        self, method: str
+    ) -> list[tuple[str, NotificationDispatcher]]:
+        """
+        Returns a method's dispatcher paths and instances, in order of preference.
+
+        :param method: A notification method.
+        :type method: str
+        :raises ValueError: If the method had no dispatcher chain.
+        :returns: A list of dispatcher path and instance tuples.
+        :rtype: list[tuple[str, ~terminusgps_notifier.dispatchers.NotificationDispatcher]]
+
+        """
+        if method not in self.chains:
+            raise ValueError(f"Invalid method: '{method}'")
+        return self.chains[method]
+
+    async def start(self) -> None:
+        """Starts every dispatcher, logging any failures."""
+        for path, dispatcher in self.dispatchers.items():
+            try:
+                await dispatcher.start()
+            except Exception as error:
+                logger.error(f"Failed to start '{path}': '{error}'")
+
+    async def stop(self) -> None:
+        """Stops every dispatcher, logging any failures."""
+        for path, dispatcher in self.dispatchers.items():
+            try:
+                await dispatcher.stop()
+            except Exception as error:
+                logger.error(f"Failed to stop '{path}': '{error}'")
+
+
+#: Process-wide dispatcher registry, loaded by the app config.
+registry = DispatcherRegistry()
+
+
+@receiver(setting_changed)
+def reload_registry(*, setting: str, value, **kwargs) -> None:
+    if setting == "NOTIFICATION_DISPATCHERS":
+        registry.load(value or {})
+
+
+@on_startup
+async def start_dispatchers() -> None:
+    """Starts every registered dispatcher when the server starts."""
+    await registry.start()
+
+
+@on_shutdown
+async def stop_dispatchers() -> None:
+    """Stops every registered dispatcher before its clients are closed."""
+    await registry.stop()
@@ -0,0 +1,208 @@
+import logging
+
+from django.utils import timezone
+from terminusgps.wialon import flags
+from terminusgps.wialon.session import WialonAPIError, WialonSession
+
+from terminusgps_notifier.constants import WIALON_INVALID_SESSION
+from terminusgps_notifier.models import Profile, UnitContact
+from terminusgps_notifier.wialon import (
+    cache_phones,
+    clean_phones,
+    get_phone_numbers_by_id,
+    get_session,
+    invalidate_phones,
+)
+
+__all__ = ["UnitPhonesWatcher"]
+
+logger = logging.getLogger(__name__)
+
+#: Wialon item class ids.
+UNIT_CLASS = 2
+RESOURCE_CLASS = 3
+
+
+class UnitPhonesWatcher:
+    """
+    Keeps a profile's cached unit phone numbers up to date from the Wialon event stream.
+
+    Units and resources are subscribed to with `core/update_data_flags` in a dedicated Wialon API session, then :py:meth:`poll` reads `avl_evts`. Only units whose ``to_number`` custom field or bound drivers changed are refreshed, so their cached phone numbers can be kept for much longer than :py:attr:`settings.WIALON_PHONES_CACHE_TTL`.
+
+    """
+
+    def __init__(self, profile: Profile) -> None:
+        self.profile = profile
+        self.session: WialonSession | None = None
+        self.units: set[int] = set()
+        self.resources: set[int] = set()
+        #: Driver bindings by (resource id, driver id), as bound unit ids.
+        self.bindings: dict[tuple[int, str], int] = {}
+
+    def __str__(self) -> str:
+        return f"Unit phones watcher for profile #{self.profile.pk}"
+
+    def subscribe(self) -> None:
+        """
+        Logs into a new Wialon API session and subscribes to every unit and resource the profile can access.
+
+        :raises WialonAPIError: If the Wialon API call failed.
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        session = get_session(None)
+        session.token_login(token=self.profile.token)
+        items = session.wialon_api.core_update_data_flags(
+            **{
+                "spec": [
+                    {
+                        "type": "type",
+                        "data": "avl_unit",
+                        "flags": flags.DataFlag.UNIT_BASE
+                        | flags.DataFlag.UNIT_CUSTOM_FIELDS,
+                        "mode": 0,
+                    },
+                    {
+                        "type": "type",
+                        "data": "avl_resource",
+                        "flags": flags.DataFlag.RESOURCE_BASE
+                        | flags.DataFlag.RESOURCE_DRIVERS,
+                        "mode": 0,
+                    },
+                ],
+                "flags": 0,
+            }
+        )
+        self.units.clear()
+        self.resources.clear()
+        self.bindings.clear()
+        for item in items or []:
+            data = item.get("d") or {}
+            if data.get("cls") == RESOURCE_CLASS or "drvrs" in data:
+                self.resources.add(item["i"])
+                self.update_bindings(item["i"], data["drvrs"] or {})
+            else:
+                self.units.add(item["i"])
+        self.session = session
+        logger.debug(
+            f"{self} subscribed to {len(self.units)} unit(s) and {len(self.resources)} resource(s)"
+        )
+
+    def update_bindings(self, resource_id: int, drivers: dict) -> set[int]:
+        """
+        Updates a resource's driver bindings and returns the ids of every unit a driver was bound to or unbound from.
+
+        Drivers set to :py:obj:`None` were deleted. Drivers without ``"bu"`` keep their binding.
+
+        :param resource_id: A Wialon resource id.
+        :type resource_id: int
+        :param drivers: Changed drivers by driver id.
+        :type drivers: dict
+        :returns: A set of Wialon unit ids.
+        :rtype: set[int]
+
+        """
+        changed = set()
+        for driver_id, driver in drivers.items():
+            key = (resource_id, str(driver_id))
+            old_unit = self.bindings.get(key, 0)
+            if driver is None:
+                new_unit = 0
+            else:
+                new_unit = driver.get("bu", old_unit)
+            if new_unit:
+                self.bindings[key] = new_unit
+            else:
+                self.bindings.pop(key, None)
+            # Phone number changes affect the bound unit even without a rebinding
+            changed.update(unit for unit in (old_unit, new_unit) if unit)
+        return changed
+
+    def poll(self) -> set[int]:
+        """
+        Reads pending Wialon events and refreshes the phone numbers of affected units.
+
+        Subscribes first if necessary. If Wialon reports the session as invalid, subscribes again on the next poll.
+
+        :raises WialonAPIError: If a Wialon API call failed.
+        :returns: The ids of every refreshed or invalidated unit.
+        :rtype: set[int]
+
+        """
+        if self.session is None:
+            self.subscribe()
+        try:
+            response = self.session.wialon_api.avl_evts()
+        except WialonAPIError as error:
+            if error.code != WIALON_INVALID_SESSION:
+                raise
+            logger.debug(f"{self} session expired, subscribing again...")
+            self.session = None
+            return set()
+
+        changed, deleted = set(), set()
+        for event in response.get("events", []):
+            item_id, data = event.get("i"), event.get("d") or {}
+            if event.get("t") == "d":
+                if item_id in self.units:
+                    deleted.add(item_id)
+                self.resources.discard(item_id)
+            elif event.get("t") != "u":
+                continue
+            elif item_id in self.units and "flds" in data:
+                changed.add(item_id)
+            elif item_id in self.resources and "drvrs" in data:
+                changed |= self.update_bindings(item_id, data["drvrs"] or {})
+
+        for unit_id in deleted:
+            self.forget_unit(unit_id)
+        for unit_id in (changed & self.units) - deleted:
+            self.refresh_unit(unit_id)
+        return changed & self.units | deleted
+
+    def refresh_unit(self, unit_id: int) -> None:
+        """
+        Calls the Wialon API and saves a unit's phone numbers to its unit contact and the cache.
+
+        If the Wialon API call failed, the unit's phone numbers are invalidated instead.
+
+        :param unit_id: A Wialon unit id.
+        :type unit_id: int
+        :raises WialonAPIError: If the Wialon API session was invalid.
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        try:
+            phones = clean_phones(
+                get_phone_numbers_by_id(unit_id, self.session)
+            )
+        except WialonAPIError as error:
+            if error.code == WIALON_INVALID_SESSION:
+                raise
+            logger.warning(error)
+            self.forget_unit(unit_id)
+            return
+        UnitContact.objects.filter(
+            profile=self.profile, unit_id=unit_id
+        ).update(phones=phones, sync_date=timezone.now())
+        cache_phones(self.profile.user_id, unit_id, phones)
+        logger.debug(f"{self} refreshed phones for unit #{unit_id}")
+
+    def forget_unit(self, unit_id: int) -> None:
+        """
+        Deletes a unit's unit contact and cached phone numbers.
+
+        :param unit_id: A Wialon unit id.
+        :type unit_id: int
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        self.units.discard(unit_id)
+        UnitContact.objects.filter(
+            profile=self.profile, unit_id=unit_id
+        ).delete()
+        invalidate_phones(self.profile.user_id, unit_id)
+        logger.debug(f"{self} invalidated phones for unit #{unit_id}")
@@ -5,6 +5,7 @@ from django.forms import widgets
 from django.utils.translation import gettext_lazy as _
 
 from terminusgps_notifier import constants
+from terminusgps_notifier.models import DispatchLog
 
 
 class WialonNotificationTrigger(models.TextChoices):
@@ -130,6 +131,32 @@ class NotificationDispatchForm(forms.Form):
     date_format = forms.CharField(required=False, initial="%Y-%m-%d %H:%M:%S")
 
 
+class DispatchHistoryForm(forms.Form):
+    """
+    A form for filtering and paginating dispatch history.
+
+    Attributes:
+        Optional:
+            - unit_id: A Wialon unit id.
+            - method: A notification method.
+            - since: Earliest publish date, inclusive.
+            - until: Latest publish date, exclusive.
+            - cursor: A cursor returned with the previous page.
+            - limit: Maximum number of dispatch logs per page, at most 100.
+
+    """
+
+    unit_id = forms.IntegerField(required=False)
+    method = forms.ChoiceField(
+        choices=[("", "")] + DispatchLog._meta.get_field("method").choices,
+        required=False,
+    )
+    since = forms.DateTimeField(required=False)
+    until = forms.DateTimeField(required=False)
+    cursor = forms.CharField(required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=100)
+
+
 class CreateNotificationStepFourForm(forms.Form):
     ta = forms.DateTimeField(
         label=_("Activation Time"),
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from terminusgps_notifier.models import DispatchLog
+
+__all__ = ["decode_cursor", "encode_cursor", "get_dispatch_history"]
+
+#: Dispatch log fields returned by the history endpoint.
+HISTORY_FIELDS = (
+    "id",
+    "unit_id",
+    "method",
+    "status",
+    "message",
+    "phones",
+    "deliveries",
+    "pub_date",
+)
+
+
+def encode_cursor(pub_date: datetime, pk: int) -> str:
+    """Returns an opaque cursor pointing after a dispatch log."""
+    payload = json.dumps([pub_date.isoformat(), pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Returns the publish date and primary key a cursor points after.
+
+    :param cursor: A cursor returned by :py:func:`encode_cursor`.
+    :type cursor: str
+    :raises ValueError: If the cursor was invalid.
+    :returns: A publish date and dispatch log primary key.
+    :rtype: tuple[~datetime.datetime, int]
+
+    """
+    try:
+        pub_date, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor: '{cursor}'") from error
+
+
+def get_dispatch_history(
+    user_id: int,
+    unit_id: int | None = None,
+    method: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+) -> tuple[list[dict], str | None]:
+    """
+    Returns a page of a user's dispatch logs, newest first.
+
+    Pages are selected with a keyset on ``(pub_date, id)`` instead of an offset, so every page is a single query served by the ``(user_id, pub_date)`` or ``(unit_id, pub_date)`` index regardless of its depth.
+
+    :param user_id: A user id.
+    :type user_id: int
+    :param unit_id: A Wialon unit id to filter by. Default is :py:obj:`None`.
+    :type unit_id: int | None
+    :param method: A notification method to filter by. Default is :py:obj:`None`.
+    :type method: str | None
+    :param since: Earliest publish date, inclusive. Default is :py:obj:`None`.
+    :type since: ~datetime.datetime | None
+    :param until: Latest publish date, exclusive. Default is :py:obj:`None`.
+    :type until: ~datetime.datetime | None
+    :param cursor: A cursor returned with the previous page. Default is :py:obj:`None` (first page).
+    :type cursor: str | None
+    :param limit: Maximum number of dispatch logs to return. Default is ``50``.
+    :type limit: int
+    :raises ValueError: If the cursor was invalid.
+    :returns: A list of dispatch log dictionaries and the next page's cursor, or :py:obj:`None` if this was the last page.
+    :rtype: tuple[list[dict], str | None]
+
+    """
+    logs = DispatchLog.objects.filter(user_id=user_id)
+    if unit_id is not None:
+        logs = logs.filter(unit_id=unit_id)
+    if method:
+        logs = logs.filter(method=method)
+    if since is not None:
+        logs = logs.filter(pub_date__gte=since)
+    if until is not None:
+        logs = logs.filter(pub_date__lt=until)
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        # The outer bound lets the index range scan start at the cursor
+        logs = logs.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk),
+            pub_date__lte=pub_date,
+        )
+    rows = list(
+        logs.order_by("-pub_date", "-pk").values(*HISTORY_FIELDS)[: limit + 1]
+    )
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["pub_date"], rows[-1]["id"])
@@ -0,0 +1,90 @@
+import logging
+from collections.abc import Awaitable, Callable
+
+__all__ = ["lifespan", "on_shutdown", "on_startup", "shutdown", "startup"]
+
+logger = logging.getLogger(__name__)
+
+_startup_hooks: list[Callable[[], Awaitable[None]]] = []
+_shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+
+
+def on_startup(func: Callable[[], Awaitable[None]]):
+    """
+    Registers an async callable to be awaited when the ASGI server starts.
+
+    Hooks are awaited in registration order.
+
+    :param func: An async callable without arguments.
+    :type func: ~collections.abc.Callable[[], ~collections.abc.Awaitable[None]]
+    :returns: The registered callable.
+    :rtype: ~collections.abc.Callable[[], ~collections.abc.Awaitable[None]]
+
+    """
+    _startup_hooks.append(func)
+    return func
+
+
+def on_shutdown(func: Callable[[], Awaitable[None]]):
+    """
+    Registers an async callable to be awaited when the ASGI server shuts down.
+
+    Hooks are awaited in reverse registration order.
+
+    :param func: An async callable without arguments.
+    :type func: ~collections.abc.Callable[[], ~collections.abc.Awaitable[None]]
+    :returns: The registered callable.
+    :rtype: ~collections.abc.Callable[[], ~collections.abc.Awaitable[None]]
+
+    """
+    _shutdown_hooks.append(func)
+    return func
+
+
+async def startup() -> None:
+    """Awaits every registered startup hook, logging any failures."""
+    for func in _startup_hooks:
+        try:
+            await func()
+        except Exception as error:
+            logger.error(f"Startup hook {func.__qualname__} failed: '{error}'")
+
+
+async def shutdown() -> None:
+    """Awaits every registered shutdown hook, logging any failures."""
+    for func in reversed(_shutdown_hooks):
+        try:
+            await func()
+        except Exception as error:
+            logger.error(
+                f"Shutdown hook {func.__qualname__} failed: '{error}'"
+            )
+
+
+def lifespan(application):
+    """
+    Wraps an ASGI application to handle ASGI lifespan events.
+
+    Django's ASGI handler doesn't support the lifespan protocol, so startup hooks are awaited here before the server accepts requests and shutdown hooks before it exits.
+
+    :param application: An ASGI application.
+    :type application: ~collections.abc.Callable
+    :returns: An ASGI application.
+    :rtype: ~collections.abc.Callable
+
+    """
+
+    async def wrapper(scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    return wrapper
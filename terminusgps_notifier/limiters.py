@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+__all__ = ["DispatchLimiter", "atomic_decr", "atomic_incr", "get_limiter"]
+
+logger = logging.getLogger(__name__)
+
+#: Number of sends waiting for each limiter in this process.
+_waiting: Counter[str] = Counter()
+
+
+async def atomic_incr(key: str, delta: int = 1) -> int:
+    """
+    Atomically adds ``delta`` to a cached counter, keeping its timeout.
+
+    :py:meth:`~django.core.cache.backends.base.BaseCache.aincr` is a separate get and set that resets the key's timeout, so the sync :py:meth:`incr` (``INCRBY`` on Redis) is run in a worker thread instead.
+
+    :param key: A cache key.
+    :type key: str
+    :param delta: Amount to add. Default is ``1``.
+    :type delta: int
+    :raises ValueError: If the key didn't exist.
+    :returns: The new counter value.
+    :rtype: int
+
+    """
+    return await sync_to_async(cache.incr, thread_sensitive=False)(key, delta)
+
+
+async def atomic_decr(key: str, delta: int = 1) -> int:
+    """Atomically subtracts ``delta`` from a cached counter, keeping its timeout. See :py:func:`atomic_incr`."""
+    return await sync_to_async(cache.decr, thread_sensitive=False)(key, delta)
+
+
+class DispatchLimiter:
+    """
+    Limits concurrent and per-second sends of a notification dispatcher across processes.
+
+    Both limits are counted with atomic cache increments, so they're shared by every worker using the same cache. Sends over a limit wait for a free slot or token until ``timeout`` runs out. The timeout is extended by the time the rate limit needs for sends already waiting in the same process, so a large batch isn't failed by its own queue. If the cache can't count (e.g. a dummy cache), sends aren't limited.
+
+    :param name: A unique limiter name, e.g. a dispatcher class path.
+    :type name: str
+    :param concurrency: Maximum number of concurrent sends. Default is :py:obj:`None` (unlimited).
+    :type concurrency: int | None
+    :param rate: Maximum number of sends per second. Default is :py:obj:`None` (unlimited).
+    :type rate: int | None
+    :param timeout: Maximum number of seconds to wait for a free slot and token, on top of the time needed for sends ahead in the same process. Default is ``10``.
+    :type timeout: float
+
+    """
+
+    #: Seconds between attempts to acquire a slot or token.
+    poll_interval = 0.05
+    #: Seconds an idle concurrency counter is kept, so slots leaked by crashed workers are eventually freed. Held slots refresh it.
+    slot_ttl = 60
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int | None = None,
+        rate: int | None = None,
+        timeout: float = 10,
+    ) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+
+    def get_concurrency_key(self) -> str:
+        """Returns the cache key for the limiter's concurrent sends counter."""
+        return f"terminusgps_notifier:limiter:{self.name}:concurrency"
+
+    def get_rate_key(self, window: int) -> str:
+        """Returns the cache key for the limiter's sends counter in a one second window."""
+        return f"terminusgps_notifier:limiter:{self.name}:rate:{window}"
+
+    @asynccontextmanager
+    async def limit(self) -> AsyncIterator[None]:
+        """
+        Waits for a free slot and token, then holds the slot until the context exits.
+
+        :raises TimeoutError: If no slot or token was available within :py:attr:`timeout` seconds.
+        :yields: Nothing.
+
+        """
+        ahead = _waiting[self.name]
+        _waiting[self.name] += 1
+        deadline = time.monotonic() + self.timeout
+        if self.rate is not None:
+            deadline += ahead / self.rate
+        acquired, heartbeat = False, None
+        try:
+            try:
+                if self.concurrency is not None:
+                    await self._wait(self._acquire_slot, deadline)
+                    acquired = True
+                    heartbeat = asyncio.create_task(self._refresh_slots())
+                if self.rate is not None:
+                    await self._wait(self._take_token, deadline)
+            finally:
+                _waiting[self.name] -= 1
+            yield
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            if acquired:
+                await self._release_slot()
+
+    async def _wait(
+        self, attempt: Callable[[], Awaitable[bool]], deadline: float
+    ) -> None:
+        while not await attempt():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for '{self.name}'")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _acquire_slot(self) -> bool:
+        key = self.get_concurrency_key()
+        await cache.aadd(key, 0, self.slot_ttl)
+        try:
+            count = await atomic_incr(key)
+        except ValueError:
+            return True
+        if count > self.concurrency:
+            await self._release_slot()
+            return False
+        await cache.atouch(key, self.slot_ttl)
+        return True
+
+    async def _refresh_slots(self) -> None:
+        # Keeps the counter from expiring while a long send holds its slot
+        while True:
+            await asyncio.sleep(self.slot_ttl / 3)
+            await cache.atouch(self.get_concurrency_key(), self.slot_ttl)
+
+    async def _release_slot(self) -> None:
+        try:
+            await atomic_decr(self.get_concurrency_key())
+        except ValueError:
+            pass
+
+    async def _take_token(self) -> bool:
+        key = self.get_rate_key(int(time.time()))
+        await cache.aadd(key, 0, 2)
+        try:
+            count = await atomic_incr(key)
+        except ValueError:
+            return True
+        return count <= self.rate
+
+
+def get_limiter(name: str) -> DispatchLimiter:
+    """
+    Returns a dispatch limiter configured by :py:attr:`settings.NOTIFICATION_DISPATCHER_LIMITS`.
+
+    :param name: A notification dispatcher class path.
+    :type name: str
+    :returns: A dispatch limiter.
+    :rtype: ~terminusgps_notifier.limiters.DispatchLimiter
+
+    """
+    limits = settings.NOTIFICATION_DISPATCHER_LIMITS.get(name, {})
+    return DispatchLimiter(
+        name,
+        concurrency=limits.get("concurrency"),
+        rate=limits.get("rate"),
+        timeout=settings.NOTIFICATION_DISPATCHER_LIMIT_TIMEOUT,
+    )
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import statistics
+import uuid
+from collections import defaultdict
+
+from aiohttp import web
+
+__all__ = [
+    "FakeProviders",
+    "LatencyRecorder",
+    "create_fake_pinpoint",
+    "create_fake_twilio",
+    "create_fake_wialon",
+    "parse_server_timing",
+]
+
+
+class LatencyRecorder:
+    """Collects latency samples per stage and summarizes them as percentiles."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Adds a latency sample in seconds to a stage."""
+        self.samples[stage].append(seconds)
+
+    def summarize(self) -> dict[str, dict[str, float]]:
+        """
+        Returns sample counts and p50/p95/p99 latencies in milliseconds per stage.
+
+        :returns: A dictionary of stage names and their latency summaries.
+        :rtype: dict[str, dict[str, float]]
+
+        """
+        summary = {}
+        for stage, samples in self.samples.items():
+            if len(samples) > 1:
+                cuts = statistics.quantiles(samples, n=100, method="inclusive")
+                p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            else:
+                p50 = p95 = p99 = samples[0]
+            summary[stage] = {
+                "count": len(samples),
+                "p50": p50 * 1000,
+                "p95": p95 * 1000,
+                "p99": p99 * 1000,
+            }
+        return summary
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """
+    Returns stage durations in seconds from a ``Server-Timing`` header.
+
+    :param header: A ``Server-Timing`` header value, e.g. ``"phones;dur=12.5, total;dur=40.1"``.
+    :type header: str
+    :returns: A dictionary of stage names and durations in seconds.
+    :rtype: dict[str, float]
+
+    """
+    timings = {}
+    for metric in filter(None, map(str.strip, header.split(","))):
+        name, *params = metric.split(";")
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                timings[name.strip()] = float(value) / 1000
+    return timings
+
+
+def create_fake_wialon(latency: float = 0, phones: int = 1) -> web.Application:
+    """
+    Returns a fake Wialon API application.
+
+    Supports ``token/login`` and the ``core/batch`` phone number lookup. Every unit has one driver phone number and ``phones - 1`` custom field phone numbers.
+
+    :param latency: Seconds to wait before each response. Default is ``0``.
+    :type latency: float
+    :param phones: Number of phone numbers per unit. Default is ``1``.
+    :type phones: int
+    :returns: An aiohttp application.
+    :rtype: ~aiohttp.web.Application
+
+    """
+    numbers = [f"+1555555{n:04}" for n in range(phones)]
+
+    async def ajax(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        data = await request.post()
+        request.app["calls"] += 1
+        if data["svc"] == "token/login":
+            result = {"eid": uuid.uuid4().hex, "user": {"id": 1}}
+        elif data["svc"] == "core/batch":
+            drivers = {"1": [{"ph": numbers[0]}]} if numbers else {}
+            fields = {"1": {"n": "to_number", "v": ",".join(numbers[1:])}}
+            search = {"item": {"flds": fields if numbers[1:] else {}}}
+            result = [drivers, search]
+        else:
+            result = {"error": 7}
+        # python-wialon only decodes an exact "application/json" content type
+        return web.Response(
+            body=json.dumps(result).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+
+    app = web.Application()
+    app["calls"] = 0
+    app.router.add_post("/wialon/ajax.html", ajax)
+    return app
+
+
+def create_fake_pinpoint(latency: float = 0) -> web.Application:
+    """
+    Returns a fake AWS End User Messaging (Pinpoint SMS and voice v2) API application.
+
+    :param latency: Seconds to wait before each response. Default is ``0``.
+    :type latency: float
+    :returns: An aiohttp application.
+    :rtype: ~aiohttp.web.Application
+
+    """
+
+    async def send(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        await request.read()
+        request.app["calls"] += 1
+        return web.Response(
+            text=json.dumps({"MessageId": uuid.uuid4().hex}),
+            content_type="application/x-amz-json-1.0",
+        )
+
+    app = web.Application()
+    app["calls"] = 0
+    app.router.add_post("/", send)
+    return app
+
+
+def create_fake_twilio(latency: float = 0) -> web.Application:
+    """
+    Returns a fake Twilio API application supporting message and call creation.
+
+    :param latency: Seconds to wait before each response. Default is ``0``.
+    :type latency: float
+    :returns: An aiohttp application.
+    :rtype: ~aiohttp.web.Application
+
+    """
+
+    async def create(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        await request.post()
+        request.app["calls"] += 1
+        return web.json_response(
+            {"sid": uuid.uuid4().hex, "status": "queued"}, status=201
+        )
+
+    app = web.Application()
+    app["calls"] = 0
+    app.router.add_post("/2010-04-01/Accounts/{sid}/Messages.json", create)
+    app.router.add_post("/2010-04-01/Accounts/{sid}/Calls.json", create)
+    return app
+
+
+class FakeProviders:
+    """
+    Serves fake Wialon, Pinpoint and Twilio APIs on local ports.
+
+    :param wialon_latency: Seconds added to each Wialon API response. Default is ``0``.
+    :type wialon_latency: float
+    :param pinpoint_latency: Seconds added to each Pinpoint API response. Default is ``0``.
+    :type pinpoint_latency: float
+    :param twilio_latency: Seconds added to each Twilio API response. Default is ``0``.
+    :type twilio_latency: float
+    :param phones: Number of phone numbers per unit. Default is ``1``.
+    :type phones: int
+
+    """
+
+    def __init__(
+        self,
+        wialon_latency: float = 0,
+        pinpoint_latency: float = 0,
+        twilio_latency: float = 0,
+        phones: int = 1,
+    ) -> None:
+        self.apps = {
+            "wialon": create_fake_wialon(wialon_latency, phones),
+            "pinpoint": create_fake_pinpoint(pinpoint_latency),
+            "twilio": create_fake_twilio(twilio_latency),
+        }
+        self.runners: list[web.AppRunner] = []
+        self.ports: dict[str, int] = {}
+
+    async def start(self, port_base: int = 0) -> None:
+        """
+        Starts every fake API server.
+
+        :param port_base: First of three consecutive local ports to serve on. Default is ``0`` (free ports).
+        :type port_base: int
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        for offset, (name, app) in enumerate(self.apps.items()):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            port = port_base + offset if port_base else 0
+            site = web.TCPSite(runner, "127.0.0.1", port)
+            await site.start()
+            self.runners.append(runner)
+            self.ports[name] = runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stops every fake API server."""
+        for runner in self.runners:
+            await runner.cleanup()
+        self.runners.clear()
+
+    def get_settings(self) -> dict:
+        """Returns settings pointing the Wialon, Pinpoint and Twilio clients at the fake API servers."""
+        return {
+            "WIALON_API_SCHEME": "http",
+            "WIALON_API_HOST": "127.0.0.1",
+            "WIALON_API_PORT": self.ports["wialon"],
+            "AWS_PINPOINT_ENDPOINT_URL": f"http://127.0.0.1:{self.ports['pinpoint']}",
+            "TWILIO_API_URL": f"http://127.0.0.1:{self.ports['twilio']}",
+        }
+
+    def get_calls(self) -> dict[str, int]:
+        """Returns the number of API calls served per fake API server."""
+        return {name: app["calls"] for name, app in self.apps.items()}
@@ -0,0 +1,85 @@
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from terminusgps_notifier.benchmarks import (
+    BENCHMARKS,
+    compare,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the notification dispatch hot path against a saved baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks",
+            nargs="*",
+            help=f"Benchmarks to run: {', '.join(BENCHMARKS)}. Default is every benchmark.",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            default=settings.BASE_DIR.parent / "benchmarks.json",
+            help="Baseline file. Default is 'benchmarks.json' in the project root.",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Save the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed slowdown over the baseline. Default is 0.25 (25%%).",
+        )
+        parser.add_argument(
+            "--number",
+            type=int,
+            help="Calls per repetition. Default is calibrated per benchmark.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        names = options["benchmarks"] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                f"Unknown benchmark(s): {', '.join(sorted(unknown))}"
+            )
+        baseline = load_baseline(options["baseline"])
+        results = {}
+        # Invalid phone numbers log warnings, which would dominate timings
+        previous_level = logging.root.manager.disable
+        logging.disable(logging.CRITICAL)
+        try:
+            for name in names:
+                results[name] = run_benchmark(
+                    BENCHMARKS[name], options["number"], options["repeat"]
+                )
+        finally:
+            logging.disable(previous_level)
+        for name in names:
+            line = f"{name:<32}{results[name] * 1e6:>12.2f} us"
+            if name in baseline:
+                change = results[name] / baseline[name] - 1
+                line += f"{change:>+10.1%}"
+            self.stdout.write(line)
+        if options["save"]:
+            save_baseline(options["baseline"], results)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Saved baseline to '{options['baseline']}'"
+                )
+            )
+            return
+        regressions = compare(results, baseline, options["tolerance"])
+        if regressions:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
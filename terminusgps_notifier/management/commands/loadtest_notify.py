@@ -0,0 +1,257 @@
+import asyncio
+import functools
+import os
+import time
+import urllib.parse
+from collections import Counter
+
+from aiohttp import ClientSession
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+
+from terminusgps_notifier.dispatchers import close_clients
+from terminusgps_notifier.loadtest import (
+    FakeProviders,
+    LatencyRecorder,
+    parse_server_timing,
+)
+from terminusgps_notifier.models import DispatchLog, Profile
+from terminusgps_notifier.writers import dispatch_log_writer
+
+
+class Command(BaseCommand):
+    help = "Load tests the notify endpoint against fake Wialon, Pinpoint and Twilio APIs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--methods",
+            nargs="+",
+            choices=["sms", "voice"],
+            default=["sms"],
+            help="Notification methods to alternate between.",
+        )
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument(
+            "--rate", type=float, default=10, help="Requests per second."
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Maximum number of requests in flight.",
+        )
+        parser.add_argument(
+            "--units",
+            type=int,
+            default=10,
+            help="Number of distinct Wialon units to notify for.",
+        )
+        parser.add_argument(
+            "--phones", type=int, default=1, help="Phone numbers per unit."
+        )
+        parser.add_argument(
+            "--wialon-latency", type=float, default=50, help="Milliseconds."
+        )
+        parser.add_argument(
+            "--pinpoint-latency", type=float, default=100, help="Milliseconds."
+        )
+        parser.add_argument(
+            "--twilio-latency", type=float, default=100, help="Milliseconds."
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server to load test instead of this process. The server must be configured with the printed fake API settings.",
+        )
+        parser.add_argument(
+            "--port-base",
+            type=int,
+            default=0,
+            help="First of three consecutive ports for the fake APIs. Default is random ports.",
+        )
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="User to send notifications for. Default is a staff user named 'loadtest', created if necessary and deleted afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["rate"] <= 0:
+            raise CommandError("--requests and --rate must be positive")
+        if options["url"]:
+            if options["user_id"] is None:
+                raise CommandError("--user-id is required with --url")
+            asyncio.run(self.run(options))
+            return
+        if not settings.DEBUG:
+            raise CommandError(
+                "In-process load tests write to the configured database, refusing to run without DEBUG"
+            )
+        user, created = None, False
+        if options["user_id"] is None:
+            user, created = self.get_loadtest_user()
+            options["user_id"] = user.pk
+        start = timezone.now()
+        try:
+            asyncio.run(self.run(options))
+        finally:
+            self.clean_up(options["user_id"], start, user if created else None)
+
+    def get_loadtest_user(self):
+        user, created = get_user_model().objects.get_or_create(
+            username="loadtest", defaults={"is_staff": True}
+        )
+        Profile.objects.update_or_create(
+            user=user,
+            defaults={"token": "loadtest", "messages_limit": 2147483647},
+        )
+        return user, created
+
+    def clean_up(self, user_id: int, start, user=None) -> None:
+        """Deletes dispatch logs written during the load test, and the load test user if it was created for it."""
+        dispatch_log_writer.flush()
+        deleted, _ = DispatchLog.objects.filter(
+            user_id=user_id, pub_date__gte=start
+        ).delete()
+        if user is not None:
+            user.delete()
+        self.stdout.write(f"Deleted {deleted} load test dispatch log(s)")
+
+    async def run(self, options) -> None:
+        fakes = FakeProviders(
+            wialon_latency=options["wialon_latency"] / 1000,
+            pinpoint_latency=options["pinpoint_latency"] / 1000,
+            twilio_latency=options["twilio_latency"] / 1000,
+            phones=options["phones"],
+        )
+        await fakes.start(options["port_base"])
+        recorder = LatencyRecorder()
+        try:
+            for name, value in fakes.get_settings().items():
+                self.stdout.write(f"{name}={value}")
+            if options["url"]:
+                async with ClientSession() as session:
+                    post = functools.partial(
+                        self.post_remote, session, options["url"]
+                    )
+                    elapsed, statuses = await self.drive(
+                        post, recorder, options
+                    )
+            else:
+                with override_settings(**self.get_settings(fakes)):
+                    elapsed, statuses = await self.drive_in_process(
+                        recorder, options
+                    )
+        finally:
+            await fakes.stop()
+        self.report(elapsed, statuses, recorder, fakes.get_calls())
+
+    def get_settings(self, fakes: FakeProviders) -> dict:
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(name, "loadtest")
+        overrides = fakes.get_settings()
+        overrides["ALLOWED_HOSTS"] = [*settings.ALLOWED_HOSTS, "testserver"]
+        for name, value in {
+            "AWS_PINPOINT_CONFIGURATION_ARN": "loadtest",
+            "AWS_PINPOINT_MAX_PRICE_SMS": "1.00",
+            "AWS_PINPOINT_MAX_PRICE_VOICE": "1.00",
+            "AWS_PINPOINT_POOL_ARN": "loadtest",
+            "AWS_PINPOINT_PROTECT_ID": "loadtest",
+            "TWILIO_ACCOUNT_SID": "ACloadtest",
+            "TWILIO_AUTH_TOKEN": "loadtest",
+            "TWILIO_FROM_NUMBER": "+15555550000",
+        }.items():
+            if getattr(settings, name, None) is None:
+                overrides[name] = value
+        return overrides
+
+    async def drive_in_process(self, recorder, options):
+        client = AsyncClient()
+
+        async def post(method: str, data: dict) -> tuple[int, str]:
+            response = await client.post(f"/v3/notify/{method}/", data)
+            return response.status_code, response.get("Server-Timing", "")
+
+        try:
+            return await self.drive(post, recorder, options)
+        finally:
+            await close_clients()
+
+    async def post_remote(
+        self, session: ClientSession, url: str, method: str, data: dict
+    ) -> tuple[int, str]:
+        target = urllib.parse.urljoin(url, f"/v3/notify/{method}/")
+        async with session.post(target, data=data) as response:
+            await response.read()
+            return response.status, response.headers.get("Server-Timing", "")
+
+    async def drive(self, post, recorder, options):
+        """
+        Sends requests at a fixed rate, measuring latency from each request's scheduled send time.
+
+        Per-stage latencies are read from each response's ``Server-Timing`` header.
+
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        statuses = Counter()
+        methods = options["methods"]
+        offset = int(time.time())
+
+        async def fire(i: int, scheduled: float) -> None:
+            data = {
+                "user_id": str(options["user_id"]),
+                "unit_id": str(1000 + i % options["units"]),
+                "message": f"Load test #{i}",
+                "msg_time_int": str(offset + i),
+            }
+            async with semaphore:
+                try:
+                    status, server_timing = await post(
+                        methods[i % len(methods)], data
+                    )
+                except Exception as error:
+                    status, server_timing = type(error).__name__, ""
+            for stage, seconds in parse_server_timing(server_timing).items():
+                recorder.record(
+                    "server" if stage == "total" else stage, seconds
+                )
+            recorder.record("total", loop.time() - scheduled)
+            statuses[status] += 1
+
+        start = loop.time()
+        tasks = []
+        for i in range(options["requests"]):
+            scheduled = start + i / options["rate"]
+            await asyncio.sleep(max(0, scheduled - loop.time()))
+            tasks.append(asyncio.create_task(fire(i, scheduled)))
+        await asyncio.gather(*tasks)
+        return loop.time() - start, statuses
+
+    def report(self, elapsed, statuses, recorder, calls) -> None:
+        total = sum(statuses.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {total} request(s) in {elapsed:.2f}s ({total / elapsed:.1f} req/s)"
+            )
+        )
+        self.stdout.write(
+            "Statuses: "
+            + ", ".join(
+                f"{k}={v}" for k, v in sorted(statuses.items(), key=str)
+            )
+        )
+        self.stdout.write(
+            "Fake API calls: "
+            + ", ".join(f"{k}={v}" for k, v in calls.items())
+        )
+        self.stdout.write(
+            f"{'stage':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        for stage, summary in recorder.summarize().items():
+            self.stdout.write(
+                f"{stage:<14}{summary['count']:>8}{summary['p50']:>10.1f}"
+                f"{summary['p95']:>10.1f}{summary['p99']:>10.1f}"
+            )
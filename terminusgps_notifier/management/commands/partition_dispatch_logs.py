@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from terminusgps_notifier import partitions
+
+
+class Command(BaseCommand):
+    help = "Creates upcoming dispatch log partitions and prunes expired dispatch logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--detach",
+            action="store_true",
+            help="Keep expired partitions as standalone tables instead of dropping them.",
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            deleted = partitions.delete_expired_dispatch_logs()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Dispatch logs aren't partitioned, deleted {deleted} expired dispatch log(s)"
+                )
+            )
+            return
+        created = partitions.create_partitions()
+        pruned = partitions.prune_partitions(detach=options["detach"])
+        for name in created:
+            self.stdout.write(f"Created partition '{name}'")
+        for name in pruned:
+            self.stdout.write(
+                f"{'Detached' if options['detach'] else 'Dropped'} partition '{name}'"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully created {len(created)} and pruned {len(pruned)} partition(s)"
+            )
+        )
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 
 from terminusgps_notifier.models import Profile
+from terminusgps_notifier.quotas import reset_messages_count
 
 
 class Command(BaseCommand):
@@ -18,6 +19,7 @@ class Command(BaseCommand):
             else:
                 profile.messages_count = 0
                 profile.save(update_fields=["messages_count"])
+                reset_messages_count(profile.pk)
                 self.stdout.write(
                     self.style.SUCCESS(
                         f"Successfully reset profile #{profile_id} messages count to 0"
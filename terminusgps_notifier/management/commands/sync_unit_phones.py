@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from terminusgps_notifier.contacts import sync_unit_contacts
+from terminusgps_notifier.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Syncs every unit's phone numbers from Wialon into unit contacts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "profiles",
+            nargs="*",
+            type=int,
+            help="Profile ids to sync. Default is every profile.",
+        )
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.all()
+        if options["profiles"]:
+            profiles = profiles.filter(pk__in=options["profiles"])
+        synced = sync_unit_contacts(profiles)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully synced unit phones for {synced} profile(s)"
+            )
+        )
@@ -0,0 +1,82 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from terminusgps_notifier.events import UnitPhonesWatcher
+from terminusgps_notifier.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Watches the Wialon event stream and refreshes cached unit phones when they change."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.WIALON_EVENTS_POLL_INTERVAL,
+            help="Seconds to wait between polls.",
+        )
+        parser.add_argument(
+            "--refresh-interval",
+            type=float,
+            default=settings.WIALON_WATCHERS_REFRESH_INTERVAL,
+            help="Seconds to wait between reloading Wialon API tokens.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Poll once and exit."
+        )
+
+    def handle(self, *args, **options):
+        watchers: dict[int, UnitPhonesWatcher] = {}
+        refreshed_at = None
+        with ThreadPoolExecutor(settings.WIALON_SYNC_CONCURRENCY) as executor:
+            while True:
+                close_old_connections()
+                now = time.monotonic()
+                if (
+                    refreshed_at is None
+                    or now - refreshed_at >= options["refresh_interval"]
+                ):
+                    self.update_watchers(watchers)
+                    refreshed_at = now
+                for watcher, result in zip(
+                    list(watchers.values()),
+                    executor.map(self.poll, list(watchers.values())),
+                ):
+                    if result:
+                        self.stdout.write(
+                            f"{watcher} refreshed unit(s): {sorted(result)}"
+                        )
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+
+    def update_watchers(self, watchers: dict[int, UnitPhonesWatcher]) -> None:
+        """Adds watchers for new or changed Wialon API tokens and removes watchers for removed tokens."""
+        profiles = {
+            profile.pk: profile
+            for profile in Profile.objects.all()
+            if profile.token
+        }
+        for pk in set(watchers) - set(profiles):
+            del watchers[pk]
+        for profile in profiles.values():
+            watcher = watchers.get(profile.pk)
+            if watcher is None or watcher.profile.token != profile.token:
+                watchers[profile.pk] = UnitPhonesWatcher(profile)
+
+    def poll(self, watcher: UnitPhonesWatcher) -> set[int]:
+        # Polls write unit contacts from long-lived worker threads
+        close_old_connections()
+        try:
+            return watcher.poll()
+        except Exception as error:
+            # Subscribe again on the next poll
+            watcher.session = None
+            self.stderr.write(self.style.ERROR(f"{watcher} failed: '{error}'"))
+            return set()
+        finally:
+            close_old_connections()
@@ -0,0 +1,261 @@
+import atexit
+import bisect
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from terminusgps_notifier.lifespan import on_shutdown
+
+__all__ = [
+    "MetricsWriter",
+    "increment",
+    "metrics_writer",
+    "observe",
+    "render_metrics",
+    "stage_timer",
+    "timer",
+]
+
+logger = logging.getLogger(__name__)
+
+#: Histogram bucket upper bounds in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+#: Stages of handling a notify request.
+STAGES = ("form", "profile", "subscription", "phones", "dispatch", "db")
+#: Status codes returned by the notify view.
+NOTIFY_STATUSES = (200, 202, 204, 403, 404, 406, 500)
+
+#: Metric names, types, descriptions and label names.
+METRICS = {
+    "notify_requests_total": (
+        "counter",
+        "Notify responses by method and status code.",
+        ("method", "status"),
+    ),
+    "notify_request_seconds": (
+        "histogram",
+        "Notify request latency in seconds.",
+        ("method",),
+    ),
+    "notify_stage_seconds": (
+        "histogram",
+        "Notify request stage latency in seconds.",
+        ("method", "stage"),
+    ),
+    "dispatcher_send_seconds": (
+        "histogram",
+        "Dispatcher send latency in seconds.",
+        ("method", "dispatcher"),
+    ),
+    "dispatcher_send_errors_total": (
+        "counter",
+        "Failed dispatcher sends.",
+        ("method", "dispatcher"),
+    ),
+}
+
+
+def get_metric_key(name: str, labels: dict[str, str], suffix: str = "") -> str:
+    label_names = METRICS[name][2]
+    series = ",".join(f"{n}={labels[n]}" for n in label_names)
+    key = f"terminusgps_notifier:metrics:{name}:{series}"
+    return f"{key}:{suffix}" if suffix else key
+
+
+class MetricsWriter:
+    """
+    Buffers metric increments in-process and adds them to the cache.
+
+    Every worker process adds to the same cache keys, so a scrape from any worker covers the whole node. Buffered increments are flushed :py:attr:`settings.METRICS_FLUSH_INTERVAL` seconds after the first buffered increment.
+
+    """
+
+    def __init__(self) -> None:
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def add(self, key: str, delta: int = 1) -> None:
+        """
+        Adds ``delta`` to a buffered counter and schedules a flush in a timer thread.
+
+        :param key: A metric cache key.
+        :type key: str
+        :param delta: Amount to add. Default is ``1``.
+        :type delta: int
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        with self._lock:
+            self.counts[key] += delta
+            if self._timer is None:
+                self._timer = threading.Timer(
+                    settings.METRICS_FLUSH_INTERVAL, self.flush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Adds every buffered increment to the cache. Increments are dropped if the cache is unavailable."""
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            for key, delta in counts.items():
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    if not cache.add(key, delta, timeout=None):
+                        cache.incr(key, delta)
+        except Exception as error:
+            logger.warning(f"Failed to flush metrics: '{error}'")
+
+
+metrics_writer = MetricsWriter()
+atexit.register(metrics_writer.flush)
+
+
+@on_shutdown
+async def flush_metrics() -> None:
+    """Flushes buffered metrics before the server exits."""
+    await sync_to_async(metrics_writer.flush)()
+
+
+def increment(name: str, **labels) -> None:
+    """
+    Increments a counter metric.
+
+    :param name: A counter metric name.
+    :type name: str
+    :param labels: Label values of the counter series.
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    metrics_writer.add(get_metric_key(name, labels))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """
+    Records a latency in a histogram metric.
+
+    :param name: A histogram metric name.
+    :type name: str
+    :param seconds: The observed latency in seconds.
+    :type seconds: float
+    :param labels: Label values of the histogram series.
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    index = bisect.bisect_left(BUCKETS, seconds)
+    le = str(BUCKETS[index]) if index < len(BUCKETS) else "+Inf"
+    metrics_writer.add(get_metric_key(name, labels, f"bucket:{le}"))
+    # Cache counters are integers, so sums are kept in microseconds
+    metrics_writer.add(
+        get_metric_key(name, labels, "sum"), round(seconds * 1_000_000)
+    )
+
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[None]:
+    """Records the duration of the block in a histogram metric."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def stage_timer(request, stage: str) -> Iterator[None]:
+    """
+    Adds the duration of the block to a request stage's :py:attr:`timings`.
+
+    Does nothing unless the view was decorated with :py:func:`~terminusgps_notifier.decorators.server_timing`.
+
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(request, "timings", None)
+        if timings is not None:
+            elapsed = time.perf_counter() - start
+            timings[stage] = timings.get(stage, 0) + elapsed
+
+
+def get_series(label_names: tuple[str, ...]) -> Iterator[dict[str, str]]:
+    """Yields every known label combination for a metric."""
+    for method, paths in settings.NOTIFICATION_DISPATCHERS.items():
+        values = {
+            "method": [method],
+            "stage": STAGES,
+            "status": NOTIFY_STATUSES,
+            "dispatcher": [path.rsplit(".", 1)[-1] for path in paths],
+        }
+        for combination in itertools.product(
+            *(values[n] for n in label_names)
+        ):
+            yield dict(zip(label_names, map(str, combination)))
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render_metrics() -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    This process's buffered increments are flushed first.
+
+    :returns: Prometheus metrics text.
+    :rtype: str
+
+    """
+    metrics_writer.flush()
+    series = {name: list(get_series(METRICS[name][2])) for name in METRICS}
+    keys = []
+    for name, labelsets in series.items():
+        suffixes = [""]
+        if METRICS[name][0] == "histogram":
+            les = [*map(str, BUCKETS), "+Inf"]
+            suffixes = [f"bucket:{le}" for le in les] + ["sum"]
+        for labels, suffix in itertools.product(labelsets, suffixes):
+            keys.append(get_metric_key(name, labels, suffix))
+    values = cache.get_many(keys)
+
+    lines = []
+    for name, (kind, description, _) in METRICS.items():
+        metric = f"terminusgps_notifier_{name}"
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels in series[name]:
+            if kind == "counter":
+                value = values.get(get_metric_key(name, labels), 0)
+                lines.append(f"{metric}{{{format_labels(labels)}}} {value}")
+                continue
+            count = 0
+            for le in [*map(str, BUCKETS), "+Inf"]:
+                key = get_metric_key(name, labels, f"bucket:{le}")
+                count += values.get(key, 0)
+                bucket_labels = format_labels({**labels, "le": le})
+                lines.append(f"{metric}_bucket{{{bucket_labels}}} {count}")
+            total = values.get(get_metric_key(name, labels, "sum"), 0)
+            lines.append(
+                f"{metric}_sum{{{format_labels(labels)}}} {total / 1_000_000}"
+            )
+            lines.append(f"{metric}_count{{{format_labels(labels)}}} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.6 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terminusgps_notifier', '0005_dispatchlog_pub_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='sent'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.6 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terminusgps_notifier', '0006_dispatchlog_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchlog',
+            name='deliveries',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.6 on 2026-10-17 00:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terminusgps_notifier', '0007_dispatchlog_deliveries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_id', models.IntegerField()),
+                ('unit_name', models.CharField(blank=True, max_length=255)),
+                ('phones', models.JSONField(default=list)),
+                ('sync_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unit_contacts', to='terminusgps_notifier.profile')),
+            ],
+            options={
+                'verbose_name': 'unit contact',
+                'verbose_name_plural': 'unit contacts',
+                'constraints': [models.UniqueConstraint(fields=('profile', 'unit_id'), name='unique_profile_unit')],
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+from datetime import UTC, datetime
+
+from django.db import migrations
+
+TABLE = "terminusgps_notifier_dispatchlog"
+#: Monthly partitions created after the legacy partition.
+MONTHS_AHEAD = 3
+
+
+def get_month(months: int) -> datetime:
+    """Returns the start of the month ``months`` months after the current month in UTC."""
+    now = datetime.now(UTC)
+    index = now.year * 12 + now.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def get_months_until(value: datetime) -> int:
+    """Returns the number of months from the current month to the month of ``value`` in UTC."""
+    now, value = datetime.now(UTC), value.astimezone(UTC)
+    return (value.year - now.year) * 12 + value.month - now.month
+
+
+def partition_dispatch_log(apps, schema_editor):
+    """
+    Converts the dispatch log table into a Postgres table partitioned by ``pub_date`` range.
+
+    Existing rows are kept in a legacy partition covering everything before next month, or before the month after the latest existing row if that's later, followed by monthly partitions for the next :py:data:`MONTHS_AHEAD` months. Later partitions are created by the ``partition_dispatch_logs`` command.
+
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(pub_date) FROM {TABLE}")
+        (latest,) = cursor.fetchone()
+    first = 1 if latest is None else max(1, get_months_until(latest) + 1)
+    schema_editor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_legacy")
+    # Attaching builds the parent's (id, pub_date) primary key index instead
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE}_legacy DROP CONSTRAINT {TABLE}_pkey"
+    )
+    # Partitions can't have identity columns, ids come from a shared sequence
+    schema_editor.execute(f"CREATE SEQUENCE {TABLE}_pk_seq AS bigint")
+    schema_editor.execute(
+        f"SELECT setval('{TABLE}_pk_seq', COALESCE(MAX(id), 0) + 1, false) "
+        f"FROM {TABLE}_legacy"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE}_legacy ALTER COLUMN id DROP IDENTITY IF EXISTS"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE}_legacy ALTER COLUMN id DROP DEFAULT"
+    )
+    schema_editor.execute(
+        f"CREATE TABLE {TABLE} (LIKE {TABLE}_legacy INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (pub_date)"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE} ALTER COLUMN id "
+        f"SET DEFAULT nextval('{TABLE}_pk_seq')"
+    )
+    schema_editor.execute(f"ALTER SEQUENCE {TABLE}_pk_seq OWNED BY {TABLE}.id")
+    # Primary keys of partitioned tables must include the partition key
+    schema_editor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, pub_date)")
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {TABLE}_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{get_month(first).isoformat()}')"
+    )
+    for months in range(first, MONTHS_AHEAD + 1):
+        start, end = get_month(months), get_month(months + 1)
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE}_p{start:%Y%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    schema_editor.execute(
+        f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"
+    )
+
+
+def unpartition_dispatch_log(apps, schema_editor):
+    """Copies every partition's rows back into a plain dispatch log table with an identity primary key."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"CREATE TABLE {TABLE}_plain (LIKE {TABLE})")
+    schema_editor.execute(f"INSERT INTO {TABLE}_plain SELECT * FROM {TABLE}")
+    # Drops every partition and the shared id sequence
+    schema_editor.execute(f"DROP TABLE {TABLE}")
+    schema_editor.execute(f"ALTER TABLE {TABLE}_plain RENAME TO {TABLE}")
+    schema_editor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    schema_editor.execute(
+        f"ALTER TABLE {TABLE} ALTER COLUMN id "
+        f"ADD GENERATED BY DEFAULT AS IDENTITY"
+    )
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+        f"COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terminusgps_notifier', '0008_unitcontact'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            partition_dispatch_log, unpartition_dispatch_log, elidable=False
+        ),
+    ]
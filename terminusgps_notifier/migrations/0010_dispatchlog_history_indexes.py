@@ -0,0 +1,21 @@
+# Generated by Django 6.0.6 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terminusgps_notifier', '0009_partition_dispatchlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dispatchlog',
+            index=models.Index(fields=['user_id', 'pub_date'], name='dispatchlog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dispatchlog',
+            index=models.Index(fields=['unit_id', 'pub_date'], name='dispatchlog_unit_date_idx'),
+        ),
+    ]
@@ -33,14 +33,55 @@ class DispatchLog(models.Model):
     message = models.CharField(max_length=1024)
     msg_time_int = models.IntegerField()
     phones = models.JSONField(default=list)
+    deliveries = models.JSONField(default=dict)
     method = models.CharField(
         choices=[("sms", _("SMS")), ("voice", _("Voice"))]
     )
     pub_date = models.DateTimeField(default=timezone.now)
+    status = models.CharField(
+        choices=[
+            ("pending", _("Pending")),
+            ("sent", _("Sent")),
+            ("failed", _("Failed")),
+        ],
+        default="sent",
+    )
 
     class Meta:
         verbose_name = _("dispatch log")
         verbose_name_plural = _("dispatch logs")
+        indexes = [
+            models.Index(
+                fields=["user_id", "pub_date"],
+                name="dispatchlog_user_date_idx",
+            ),
+            models.Index(
+                fields=["unit_id", "pub_date"],
+                name="dispatchlog_unit_date_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"DispatchLog #{self.pk}"
+
+
+class UnitContact(models.Model):
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="unit_contacts"
+    )
+    unit_id = models.IntegerField()
+    unit_name = models.CharField(blank=True, max_length=255)
+    phones = models.JSONField(default=list)
+    sync_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("unit contact")
+        verbose_name_plural = _("unit contacts")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "unit_id"], name="unique_profile_unit"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.unit_name or f"Unit #{self.unit_id}"
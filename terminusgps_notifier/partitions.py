@@ -0,0 +1,278 @@
+import logging
+import re
+from datetime import UTC, datetime
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from terminusgps_notifier.models import DispatchLog
+
+__all__ = [
+    "create_partitions",
+    "delete_expired_dispatch_logs",
+    "get_partitions",
+    "get_retention_cutoff",
+    "is_partitioned",
+    "prune_partitions",
+]
+
+logger = logging.getLogger(__name__)
+
+BOUND_PATTERN = re.compile(r"FROM \((?P<start>.+?)\) TO \((?P<end>.+?)\)")
+
+
+def get_month(value: datetime) -> datetime:
+    """Returns the start of a datetime's month in UTC."""
+    value = value.astimezone(UTC)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """Returns the start of the month ``months`` months after the start of ``month``."""
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def get_partition_name(month: datetime) -> str:
+    """Returns the dispatch log partition table name for a month."""
+    return f"{DispatchLog._meta.db_table}_p{month:%Y%m}"
+
+
+def get_retention_cutoff(now: datetime | None = None) -> datetime | None:
+    """
+    Returns the datetime before which dispatch logs are expired.
+
+    Dispatch logs are kept for the current month and the previous :py:attr:`settings.DISPATCH_LOG_RETENTION_MONTHS` months.
+
+    :param now: The current datetime. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: ~datetime.datetime | None
+    :returns: A datetime, or :py:obj:`None` if dispatch logs never expire.
+    :rtype: ~datetime.datetime | None
+
+    """
+    retention = settings.DISPATCH_LOG_RETENTION_MONTHS
+    if not retention:
+        return
+    return add_months(get_month(now or timezone.now()), -retention)
+
+
+def parse_partition_bound(
+    expr: str,
+) -> tuple[datetime | None, datetime | None] | None:
+    """
+    Returns the start and end of a range partition bound expression.
+
+    :param expr: A ``pg_get_expr(relpartbound, oid)`` expression, e.g. ``"FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')"``.
+    :type expr: str
+    :returns: A start and end datetime, :py:obj:`None` for ``MINVALUE`` or ``MAXVALUE``, or :py:obj:`None` for the default partition.
+    :rtype: tuple[~datetime.datetime | None, ~datetime.datetime | None] | None
+
+    """
+    match = BOUND_PATTERN.search(expr)
+    if match is None:
+        return
+
+    def parse(value: str) -> datetime | None:
+        if value in ("MINVALUE", "MAXVALUE"):
+            return
+        return datetime.fromisoformat(value.strip("'"))
+
+    return parse(match["start"]), parse(match["end"])
+
+
+def is_partitioned() -> bool:
+    """Returns whether the dispatch log table is a Postgres partitioned table."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [DispatchLog._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partitions() -> dict[str, tuple[datetime | None, datetime | None]]:
+    """
+    Returns the range partitions of the dispatch log table.
+
+    :returns: A dictionary of partition table names and their start and end datetimes. The default partition is excluded.
+    :rtype: dict[str, tuple[~datetime.datetime | None, ~datetime.datetime | None]]
+
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [DispatchLog._meta.db_table],
+        )
+        rows = cursor.fetchall()
+    partitions = {}
+    for name, expr in rows:
+        if (bound := parse_partition_bound(expr)) is not None:
+            partitions[name] = bound
+    return partitions
+
+
+def get_missing_months(
+    partitions: dict[str, tuple[datetime | None, datetime | None]],
+    months: list[datetime],
+) -> list[datetime]:
+    """Returns the months that don't overlap an existing partition."""
+    missing = []
+    for month in months:
+        end = add_months(month, 1)
+        if not any(
+            (start is None or start < end) and (stop is None or month < stop)
+            for start, stop in partitions.values()
+        ):
+            missing.append(month)
+    return missing
+
+
+def get_expired_partitions(
+    partitions: dict[str, tuple[datetime | None, datetime | None]],
+    cutoff: datetime,
+) -> list[str]:
+    """Returns the names of partitions that only contain dispatch logs published before ``cutoff``."""
+    return sorted(
+        name
+        for name, (_, end) in partitions.items()
+        if end is not None and end <= cutoff
+    )
+
+
+def create_partitions(
+    months_ahead: int | None = None, now: datetime | None = None
+) -> list[str]:
+    """
+    Creates monthly dispatch log partitions for the current month and upcoming months.
+
+    Months that overlap an existing partition are skipped. Dispatch logs that were inserted into the default partition for a missing month are moved into its new partition. A month that fails is logged and skipped, so the remaining months are still created.
+
+    :param months_ahead: Number of upcoming months to create partitions for. Default is :py:attr:`settings.DISPATCH_LOG_PARTITIONS_AHEAD`.
+    :type months_ahead: int | None
+    :param now: The current datetime. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: ~datetime.datetime | None
+    :returns: The names of created partitions.
+    :rtype: list[str]
+
+    """
+    if months_ahead is None:
+        months_ahead = settings.DISPATCH_LOG_PARTITIONS_AHEAD
+    current = get_month(now or timezone.now())
+    months = [add_months(current, n) for n in range(months_ahead + 1)]
+    created = []
+    for month in get_missing_months(get_partitions(), months):
+        name = get_partition_name(month)
+        try:
+            create_partition(name, month, add_months(month, 1))
+        except DatabaseError as error:
+            logger.error(f"Failed to create partition '{name}': '{error}'")
+            continue
+        logger.debug(f"Created dispatch log partition '{name}'")
+        created.append(name)
+    return created
+
+
+@transaction.atomic
+def create_partition(name: str, start: datetime, end: datetime) -> None:
+    """
+    Creates a dispatch log partition from ``start`` to ``end``.
+
+    The partition is created as a standalone table, filled with the default partition's dispatch logs in its range and then attached. Attaching a partition fails if the default partition still has rows in its range.
+
+    :param name: A partition table name.
+    :type name: str
+    :param start: Earliest publish date, inclusive.
+    :type start: ~datetime.datetime
+    :param end: Latest publish date, exclusive.
+    :type end: ~datetime.datetime
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    quote = connection.ops.quote_name
+    table = DispatchLog._meta.db_table
+    partition, default = quote(name), quote(f"{table}_default")
+    bounds = [start, end]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {partition} (LIKE {quote(table)} INCLUDING DEFAULTS)"
+        )
+        cursor.execute(
+            f"INSERT INTO {partition} SELECT * FROM {default} "
+            f"WHERE pub_date >= %s AND pub_date < %s",
+            bounds,
+        )
+        if cursor.rowcount:
+            logger.warning(
+                f"Moving {cursor.rowcount} dispatch log(s) from the default partition to '{name}'"
+            )
+        cursor.execute(
+            f"DELETE FROM {default} WHERE pub_date >= %s AND pub_date < %s",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {partition} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def prune_partitions(
+    detach: bool = False, now: datetime | None = None
+) -> list[str]:
+    """
+    Detaches and drops dispatch log partitions older than the retention cutoff.
+
+    :param detach: Whether to keep detached partitions as standalone tables instead of dropping them. Default is :py:obj:`False`.
+    :type detach: bool
+    :param now: The current datetime. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: ~datetime.datetime | None
+    :returns: The names of pruned partitions.
+    :rtype: list[str]
+
+    """
+    cutoff = get_retention_cutoff(now)
+    if cutoff is None:
+        return []
+    table = connection.ops.quote_name(DispatchLog._meta.db_table)
+    expired = get_expired_partitions(get_partitions(), cutoff)
+    with connection.cursor() as cursor:
+        for name in expired:
+            cursor.execute(
+                f"ALTER TABLE {table} DETACH PARTITION {connection.ops.quote_name(name)}"
+            )
+            if not detach:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+            logger.debug(f"Pruned dispatch log partition '{name}'")
+    return expired
+
+
+def delete_expired_dispatch_logs(
+    batch_size: int = 10_000, now: datetime | None = None
+) -> int:
+    """
+    Deletes dispatch logs older than the retention cutoff in batches.
+
+    Used when the dispatch log table isn't partitioned, e.g. on SQLite.
+
+    :param batch_size: Number of dispatch logs to delete per query. Default is ``10000``.
+    :type batch_size: int
+    :param now: The current datetime. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: ~datetime.datetime | None
+    :returns: The number of deleted dispatch logs.
+    :rtype: int
+
+    """
+    cutoff = get_retention_cutoff(now)
+    if cutoff is None:
+        return 0
+    expired = DispatchLog.objects.filter(pub_date__lt=cutoff)
+    deleted = 0
+    while pks := list(expired.values_list("pk", flat=True)[:batch_size]):
+        deleted += DispatchLog.objects.filter(pk__in=pks).delete()[0]
+    return deleted
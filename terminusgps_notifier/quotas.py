@@ -0,0 +1,154 @@
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from terminusgps_notifier.models import Profile
+
+__all__ = [
+    "MessageQuota",
+    "get_messages_count_key",
+    "invalidate_messages_count",
+    "reset_messages_count",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_messages_count_key(profile_pk: int) -> str:
+    """Returns the cache key for a profile's messages count."""
+    return f"terminusgps_notifier:messages_count:{profile_pk}"
+
+
+def invalidate_messages_count(profile_pk: int) -> None:
+    """
+    Removes a profile's cached messages count.
+
+    The count is seeded from :py:attr:`Profile.messages_count` again on the next reservation.
+
+    :param profile_pk: A profile primary key.
+    :type profile_pk: int
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    cache.delete(get_messages_count_key(profile_pk))
+
+
+def reset_messages_count(profile_pk: int) -> None:
+    """
+    Sets a profile's cached messages count to 0 once the current transaction commits.
+
+    The count is set instead of removed, so reservations by requests that loaded the profile before the reset can't seed the old count again.
+
+    :param profile_pk: A profile primary key.
+    :type profile_pk: int
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    key = get_messages_count_key(profile_pk)
+    transaction.on_commit(lambda: cache.set(key, 0, timeout=None))
+
+
+def get_stored_messages_count(profile_pk: int) -> int:
+    """Returns a profile's messages count from the database."""
+    return (
+        Profile.objects.filter(pk=profile_pk)
+        .values_list("messages_count", flat=True)
+        .first()
+        or 0
+    )
+
+
+class MessageQuota:
+    """
+    Reserves and refunds messages against a profile's messages limit.
+
+    Messages are counted with atomic cache increments, so concurrent reservations can't overshoot the limit. If the cached count is unavailable, a conditional database update is used instead. Reservations and refunds are also written to :py:attr:`Profile.messages_count`, so the stored count stays current.
+
+    :param profile: A profile.
+    :type profile: ~terminusgps_notifier.models.Profile
+    :param limited: Whether to enforce the profile's messages limit. Default is :py:obj:`True`.
+    :type limited: bool
+
+    """
+
+    def __init__(self, profile: Profile, limited: bool = True) -> None:
+        self.profile = profile
+        self.limited = limited
+        self.key = get_messages_count_key(profile.pk)
+        self.cached = True
+
+    def count(self) -> int:
+        """
+        Returns the profile's current messages count.
+
+        :returns: A messages count.
+        :rtype: int
+
+        """
+        count = cache.get(self.key)
+        if count is None:
+            return get_stored_messages_count(self.profile.pk)
+        return count
+
+    def reserve(self, count: int) -> bool:
+        """
+        Reserves messages for the profile.
+
+        :param count: Number of messages to reserve.
+        :type count: int
+        :returns: Whether the messages were reserved.
+        :rtype: bool
+
+        """
+        if cache.get(self.key) is None:
+            # The profile may have been loaded before a reset, seed from the database
+            cache.add(
+                self.key,
+                get_stored_messages_count(self.profile.pk),
+                timeout=None,
+            )
+        try:
+            total = cache.incr(self.key, count)
+        except ValueError:
+            self.cached = False
+            return self._reserve_in_database(count)
+        if self.limited and total > self.profile.messages_limit:
+            cache.decr(self.key, count)
+            return False
+        Profile.objects.filter(pk=self.profile.pk).update(
+            messages_count=F("messages_count") + count
+        )
+        return True
+
+    def refund(self, count: int) -> None:
+        """
+        Refunds previously reserved messages.
+
+        :param count: Number of messages to refund.
+        :type count: int
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        if self.cached:
+            try:
+                cache.decr(self.key, count)
+            except ValueError:
+                logger.warning(f"Messages count for {self.profile} expired")
+        Profile.objects.filter(
+            pk=self.profile.pk, messages_count__gte=count
+        ).update(messages_count=F("messages_count") - count)
+
+    def _reserve_in_database(self, count: int) -> bool:
+        profiles = Profile.objects.filter(pk=self.profile.pk)
+        if self.limited:
+            profiles = profiles.filter(
+                messages_count__lte=F("messages_limit") - count
+            )
+        return bool(
+            profiles.update(messages_count=F("messages_count") + count)
+        )
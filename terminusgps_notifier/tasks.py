@@ -1,12 +1,23 @@
 import logging
+from datetime import datetime, timedelta
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 from django_rq import job
 
-from terminusgps_notifier import models
+from terminusgps_notifier import contacts, forms, models, partitions, quotas
+from terminusgps_notifier.dispatchers import close_clients, render_message
+from terminusgps_notifier.wialon import get_phones
 
 logger = logging.getLogger(__name__)
 
+SWEEP_KEY = "terminusgps_notifier:pending_dispatch_logs_swept"
+#: Seconds between sweeps of stale pending dispatch logs.
+SWEEP_INTERVAL = 60
+
 
 @job
 @transaction.atomic
@@ -16,7 +27,172 @@ def reset_messages_count(profile_pk):
         profile = models.Profile.objects.get(pk=profile_pk)
         profile.messages_count = 0
         profile.save(update_fields=["messages_count"])
+        quotas.reset_messages_count(profile.pk)
         logger.debug(f"Messages count for profile #{profile_pk} was reset")
     except models.Profile.DoesNotExist:
         logger.error(f"Failed to retrieve profile by id: #{profile_pk}")
         logger.error(f"Messages count for profile #{profile_pk} wasn't reset")
+
+
+@job("notifications")
+def dispatch_notifications(log_pk, method, data):
+    """
+    Looks up phone numbers for a pending dispatch log and sends its notifications.
+
+    Enqueued by :py:func:`~terminusgps_notifier.views.notify` when :py:attr:`settings.NOTIFICATION_DISPATCH_MODE` is ``"enqueue"``.
+
+    :param log_pk: A pending dispatch log primary key.
+    :type log_pk: int
+    :param method: A notification method.
+    :type method: str
+    :param data: Raw notification dispatch form data.
+    :type data: dict
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    from terminusgps_notifier.views import get_dispatchers, send_notifications
+
+    sweep_pending_dispatch_logs()
+    try:
+        log = models.DispatchLog.objects.get(pk=log_pk, status="pending")
+    except models.DispatchLog.DoesNotExist:
+        logger.error(f"Failed to retrieve pending dispatch log #{log_pk}")
+        return
+    quota, reserved = None, 0
+    try:
+        form = forms.NotificationDispatchForm(data)
+        if not form.is_valid():
+            logger.error(f"Invalid form data for dispatch log #{log_pk}")
+            log.status = "failed"
+            log.save(update_fields=["status"])
+            return
+        try:
+            profile = models.Profile.objects.select_related("user").get(
+                user__pk=form.cleaned_data["user_id"]
+            )
+        except models.Profile.DoesNotExist:
+            logger.error(
+                f"Failed to retrieve profile for dispatch log #{log_pk}"
+            )
+            log.status = "failed"
+            log.save(update_fields=["status"])
+            return
+        phones = contacts.get_synced_phones(
+            form.cleaned_data["user_id"], form.cleaned_data["unit_id"]
+        )
+        if phones is None:
+            phones = get_phones(
+                profile.token,
+                form.cleaned_data["unit_id"],
+                form.cleaned_data["user_id"],
+            )
+        if not phones:
+            logger.debug(f"No phones found for dispatch log #{log_pk}")
+            log.status = "failed"
+            log.save(update_fields=["status"])
+            return
+        quota = quotas.MessageQuota(profile, limited=not profile.user.is_staff)
+        if not quota.reserve(len(phones)):
+            logger.debug(f"Messages maxed for dispatch log #{log_pk}")
+            log.status = "failed"
+            log.save(update_fields=["status"])
+            return
+        reserved = len(phones)
+        dispatchers = get_dispatchers(method)
+
+        async def send():
+            # Clients are bound to this job's short-lived event loop
+            try:
+                message = await render_message(form, method)
+                return await send_notifications(
+                    method,
+                    phones,
+                    dispatchers,
+                    message,
+                    form.cleaned_data.get("dry_run", False),
+                )
+            finally:
+                await close_clients()
+
+        deliveries = async_to_sync(send)()
+        reserved = 0
+        if len(deliveries) < len(phones):
+            quota.refund(len(phones) - len(deliveries))
+        log.phones = phones
+        log.deliveries = deliveries
+        log.status = "sent" if deliveries else "failed"
+        log.save(update_fields=["phones", "deliveries", "status"])
+    except Exception as error:
+        logger.error(f"Failed to dispatch log #{log_pk}: '{error}'")
+        if reserved:
+            # Nothing is known to have been sent
+            quota.refund(reserved)
+        models.DispatchLog.objects.filter(pk=log_pk, status="pending").update(
+            status="failed"
+        )
+        raise
+
+
+def sweep_pending_dispatch_logs(now: datetime | None = None) -> int:
+    """
+    Marks dispatch logs that were pending for longer than :py:attr:`settings.DISPATCH_LOG_PENDING_TIMEOUT` seconds as failed, e.g. because their job's worker was killed.
+
+    Runs at most once every :py:data:`SWEEP_INTERVAL` seconds across workers. Messages reserved by the dead jobs aren't refunded.
+
+    :param now: The current datetime. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: ~datetime.datetime | None
+    :returns: The number of swept dispatch logs.
+    :rtype: int
+
+    """
+    if not cache.add(SWEEP_KEY, True, SWEEP_INTERVAL):
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(
+        seconds=settings.DISPATCH_LOG_PENDING_TIMEOUT
+    )
+    swept = models.DispatchLog.objects.filter(
+        status="pending", pub_date__lt=cutoff
+    ).update(status="failed")
+    if swept:
+        logger.warning(
+            f"Marked {swept} stale pending dispatch log(s) as failed"
+        )
+    return swept
+
+
+@job
+def sync_unit_phones():
+    """
+    Syncs every unit's phone numbers from Wialon into unit contacts.
+
+    Meant to be scheduled periodically, more often than :py:attr:`settings.UNIT_CONTACT_MAX_AGE` seconds, e.g. every hour.
+
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    synced = contacts.sync_unit_contacts()
+    logger.debug(f"Synced unit phones for {synced} profile(s)")
+
+
+@job
+def partition_dispatch_logs():
+    """
+    Creates upcoming dispatch log partitions and prunes expired dispatch logs.
+
+    Meant to be scheduled periodically, e.g. every day.
+
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    if not partitions.is_partitioned():
+        deleted = partitions.delete_expired_dispatch_logs()
+        logger.debug(f"Deleted {deleted} expired dispatch log(s)")
+        return
+    created = partitions.create_partitions()
+    pruned = partitions.prune_partitions()
+    logger.debug(
+        f"Created {len(created)} and pruned {len(pruned)} dispatch log partition(s)"
+    )
@@ -82,5 +82,8 @@ urlpatterns = [
     ),
     path("wialon/login/", views.wialon_login, name="wialon login"),
     path("v3/health/", views.health_check, name="health check"),
+    path("v3/history/", views.dispatch_history, name="dispatch history"),
+    path("v3/idempotency/", views.idempotency_stats, name="idempotency stats"),
+    path("v3/metrics/", views.metrics, name="metrics"),
     path("v3/notify/<str:method>/", views.notify, name="notify"),
 ]
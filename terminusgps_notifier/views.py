@@ -3,20 +3,19 @@ import copy
 import decimal
 import logging
 import urllib.parse
+from contextlib import contextmanager
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
 from authorizenet import apicontractsv1
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, LogoutView, redirect_to_login
-from django.db.models import F
-from django.http import Http404, HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.utils.module_loading import import_string
 from django.views.decorators.cache import cache_control, never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import (
@@ -29,20 +28,38 @@ from terminusgps.authorizenet import api
 from terminusgps.authorizenet.service import AuthorizenetError
 from terminusgps.wialon.session import WialonAPIError
 
-from terminusgps_notifier import constants, forms
+from terminusgps_notifier import constants, forms, tasks
 from terminusgps_notifier.authorizenet import (
+    ACTIVE_SUBSCRIPTION_STATUSES,
     create_customer_profile,
     get_authorizenet_service,
+    get_cached_subscription_status,
     get_hosted_profile_page_url,
+    invalidate_subscription_status,
     subscription_is_active,
 )
+from terminusgps_notifier.breakers import get_breaker
+from terminusgps_notifier.contacts import aget_synced_phones
 from terminusgps_notifier.decorators import (
     HtmxHttpRequest,
+    get_idempotency_stats,
     htmx_template,
+    idempotent_notification,
+    internal_only,
+    measured_notification,
     persistent_wialon_session,
+    server_timing,
 )
-from terminusgps_notifier.dispatchers import NotificationDispatcher
+from terminusgps_notifier.dispatchers import (
+    NotificationDispatcher,
+    registry,
+    render_message,
+    send_hedged_notification,
+)
+from terminusgps_notifier.history import get_dispatch_history
+from terminusgps_notifier.metrics import render_metrics, stage_timer, timer
 from terminusgps_notifier.models import DispatchLog, Profile
+from terminusgps_notifier.quotas import MessageQuota
 from terminusgps_notifier.wialon import (
     create_notification,
     get_geozones,
@@ -52,66 +69,118 @@ from terminusgps_notifier.wialon import (
     get_resources,
     get_session,
 )
+from terminusgps_notifier.writers import dispatch_log_writer
 
 logger = logging.getLogger(__name__)
 
 
-def get_dispatchers(
-    form: forms.NotificationDispatchForm, method: str
-) -> list[NotificationDispatcher]:
+def get_dispatchers(method: str) -> list[NotificationDispatcher]:
     """
-    Returns a list of notification dispatchers.
+    Returns a list of notification dispatchers from the dispatcher registry.
+
+    Dispatchers with an open circuit breaker are skipped, unless every dispatcher's circuit breaker is open.
 
-    :param form: A valid notification dispatch form.
-    :type form: :py:obj:`~django.forms.Form`
     :param method: A notification method.
     :type method: str
     :raises ValueError: If the provided method was invalid.
-    :returns: A list of notification dispatcher objects.
+    :returns: A list of long-lived notification dispatcher objects.
     :rtype: list[NotificationDispatcher]
 
     """
-    if method not in settings.NOTIFICATION_DISPATCHERS:
-        raise ValueError(f"Invalid method: '{method}'")
-    dispatcher_classes = []
-    for dispatcher_path in settings.NOTIFICATION_DISPATCHERS[method]:
-        dispatcher_cls = import_string(dispatcher_path)
-        dispatcher_classes.append(dispatcher_cls)
-    return [dispatcher(form) for dispatcher in dispatcher_classes]
-
-
-@async_to_sync
-async def send_notifications(method, phones, dispatchers) -> HttpResponse:
+    chain = registry.get_chain(method)
+    allowed = [
+        dispatcher for path, dispatcher in chain if get_breaker(path).allow()
+    ]
+    if not allowed:
+        # Rather try a failing provider than drop the notification
+        logger.warning(f"Every circuit breaker for '{method}' is open")
+        allowed = [dispatcher for _, dispatcher in chain]
+    return allowed
+
+
+async def send_notifications(
+    method: str,
+    phones: list[str],
+    dispatchers: list[NotificationDispatcher],
+    message: str,
+    dry_run: bool = False,
+) -> dict[str, str]:
     """
     Sends notifications to target phone numbers using dispatchers.
 
+    Each dispatcher only sends to the phone numbers every previous dispatcher failed to deliver to. Methods in :py:attr:`settings.NOTIFICATION_HEDGED_METHODS` are sent with :py:func:`~terminusgps_notifier.dispatchers.send_hedged_notification` instead.
+
     :param method: A notification method.
     :type method: str
     :param phones: A list of E.164 formatted phone numbers.
     :type phones: list[str]
     :param dispatchers: A list of notification dispatchers.
     :type dispatchers: list[NotificationDispatcher]
-    :returns: An HTTP response with status code 200 if successful delivery.
-    :rtype: :py:obj:`~django.http.HttpResponse`
+    :param message: A rendered notification message.
+    :type message: str
+    :param dry_run: Whether to validate sends without delivering them. Default is :py:obj:`False`.
+    :type dry_run: bool
+    :returns: A dictionary of delivered phone numbers and the names of the dispatchers that delivered to them.
+    :rtype: dict[str, str]
 
     """
+    deliveries = {}
+    remaining = list(phones)
+    if method in settings.NOTIFICATION_HEDGED_METHODS and len(dispatchers) > 1:
+        results = await asyncio.gather(
+            *[
+                send_hedged_notification(
+                    dispatchers, phone, method, message, dry_run
+                )
+                for phone in phones
+            ],
+            return_exceptions=True,
+        )
+        return {
+            phone: result
+            for phone, result in zip(phones, results)
+            if not isinstance(result, BaseException)
+        }
     for dispatcher in dispatchers:
-        tasks = [
-            dispatcher.send_notification(to_number=phone, method=method)
-            for phone in phones
-        ]
-        try:
-            await asyncio.gather(*tasks)
-        except Exception as error:
-            logger.error(f"{type(dispatcher).__name__} failed: '{error}'")
-        else:
-            return HttpResponse(
-                f"Dispatched via {type(dispatcher).__name__}".encode("utf-8"),
-                status=200,
-            )
-    return HttpResponse(
-        f"All dispatchers failed for method: '{method}'".encode("utf-8"),
-        status=500,
+        if not remaining:
+            break
+        name = type(dispatcher).__name__
+        results = await asyncio.gather(
+            *[
+                dispatcher.send_notification(phone, method, message, dry_run)
+                for phone in remaining
+            ],
+            return_exceptions=True,
+        )
+        failed = []
+        for phone, result in zip(remaining, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{name} failed for '{phone}': '{result}'")
+                failed.append(phone)
+            else:
+                deliveries[phone] = name
+        remaining = failed
+    return deliveries
+
+
+def get_delivery_response(
+    phones: list[str], deliveries: dict[str, str]
+) -> HttpResponse:
+    """
+    Returns a JSON response listing which dispatcher delivered to which phone number.
+
+    :param phones: A list of E.164 formatted phone numbers.
+    :type phones: list[str]
+    :param deliveries: A dictionary of delivered phone numbers and dispatcher names.
+    :type deliveries: dict[str, str]
+    :returns: An HTTP response with status code 200 if any phone number was delivered to, otherwise 500.
+    :rtype: :py:obj:`~django.http.JsonResponse`
+
+    """
+    failed = [phone for phone in phones if phone not in deliveries]
+    return JsonResponse(
+        {"delivered": deliveries, "failed": failed},
+        status=200 if deliveries else 500,
     )
 
 
@@ -136,13 +205,28 @@ def generate_act(method: str) -> list[dict]:
     return [{"t": "push_messages", "p": {"url": url, "get": 0}}]
 
 
+@contextmanager
+def notify_stage(request: HttpRequest, method: str, stage: str):
+    """Records the duration of a notify stage in metrics and the request's ``Server-Timing`` header."""
+    with (
+        timer("notify_stage_seconds", method=method, stage=stage),
+        stage_timer(request, stage),
+    ):
+        yield
+
+
 @require_POST
 @csrf_exempt
 @never_cache
-def notify(request: HttpRequest, method: str) -> HttpResponse:
+@server_timing
+@idempotent_notification
+@measured_notification
+async def notify(request: HttpRequest, method: str) -> HttpResponse:
     """
     Delivers notifications to destination phone numbers via `method`.
 
+    Blocking Authorizenet and Wialon API calls are run in worker threads so the event loop is free to serve other webhooks in the meantime.
+
     Returns:
 
         * 403 - If the user had an invalid subscription.
@@ -150,42 +234,114 @@ def notify(request: HttpRequest, method: str) -> HttpResponse:
         * 404 - If the provided method was invalid.
         * 404 - If the user didn't have an associated profile.
         * 406 - If the provided form data was invalid.
-        * 500 - If something went wrong dispatching notifications.
+        * 500 - If no notification could be delivered.
         * 204 - If the Wialon unit didn't have any phone numbers assigned.
-        * 200 - If phone numbers were found and all notifications were queued successfully.
+        * 202 - If :py:attr:`settings.NOTIFICATION_DISPATCH_MODE` is ``"enqueue"`` and the dispatch was queued for a worker.
+        * 200 - If any notification was delivered. The JSON body maps delivered phone numbers to dispatchers and lists failed phone numbers.
 
     """
     if method not in settings.NOTIFICATION_DISPATCHERS:
         return HttpResponse("Invalid method".encode("utf-8"), status=404)
-    form = forms.NotificationDispatchForm(request.POST)
-    if not form.is_valid():
+    with notify_stage(request, method, "form"):
+        form = forms.NotificationDispatchForm(request.POST)
+        valid = form.is_valid()
+    if not valid:
         return HttpResponse(status=406)
-    profile = get_object_or_404(Profile, user__pk=form.cleaned_data["user_id"])
+    with notify_stage(request, method, "profile"):
+        profile = await aget_object_or_404(
+            Profile.objects.select_related("user"),
+            user__pk=form.cleaned_data["user_id"],
+        )
     if not profile.user.is_staff:
-        if not subscription_is_active(profile.subscription_id):
+        with notify_stage(request, method, "subscription"):
+            try:
+                subscribed = await asyncio.wait_for(
+                    sync_to_async(
+                        subscription_is_active, thread_sensitive=False
+                    )(profile.subscription_id),
+                    timeout=settings.AUTHORIZENET_SUBSCRIPTION_TIMEOUT,
+                )
+            except TimeoutError:
+                logger.warning(
+                    f"Timed out checking subscription #{profile.subscription_id}"
+                )
+                status = await sync_to_async(get_cached_subscription_status)(
+                    profile.subscription_id
+                )
+                subscribed = status in ACTIVE_SUBSCRIPTION_STATUSES
+        if not subscribed:
             return HttpResponse(
                 "Invalid subscription".encode("utf-8"), status=403
             )
-        if profile.messages_count > profile.messages_limit:
-            return HttpResponse("Messages maxed".encode("utf-8"), status=403)
-    phones = get_phones(profile.token, form.cleaned_data["unit_id"])
+    quota = MessageQuota(profile, limited=not profile.user.is_staff)
+    if quota.limited and (
+        await sync_to_async(quota.count)() > profile.messages_limit
+    ):
+        return HttpResponse("Messages maxed".encode("utf-8"), status=403)
+    if settings.NOTIFICATION_DISPATCH_MODE == "enqueue":
+        with notify_stage(request, method, "db"):
+            log = await DispatchLog.objects.acreate(
+                user_id=form.cleaned_data["user_id"],
+                unit_id=form.cleaned_data["unit_id"],
+                message=form.cleaned_data["message"],
+                msg_time_int=form.cleaned_data["msg_time_int"],
+                method=method,
+                pub_date=timezone.now(),
+                status="pending",
+            )
+        try:
+            await sync_to_async(
+                tasks.dispatch_notifications.delay, thread_sensitive=False
+            )(log.pk, method, request.POST.dict())
+        except Exception:
+            # Don't leave a pending dispatch log without a job behind
+            await DispatchLog.objects.filter(pk=log.pk).aupdate(
+                status="failed"
+            )
+            raise
+        return HttpResponse("Accepted".encode("utf-8"), status=202)
+    with notify_stage(request, method, "phones"):
+        phones = await aget_synced_phones(
+            form.cleaned_data["user_id"], form.cleaned_data["unit_id"]
+        )
+        if phones is None:
+            # Only the Wialon API fallback runs in the thread pool, it doesn't touch the database
+            phones = await sync_to_async(get_phones, thread_sensitive=False)(
+                profile.token,
+                form.cleaned_data["unit_id"],
+                form.cleaned_data["user_id"],
+            )
     if not phones:
         return HttpResponse("No phones found".encode("utf-8"), status=204)
-    dispatchers = get_dispatchers(form, method)
-    response = send_notifications(method, phones, dispatchers)
-    if response.status_code == 200:
-        profile.messages_count = F("messages_count") + len(phones)
-        profile.save(update_fields=["messages_count"])
-        DispatchLog.objects.create(
-            user_id=form.cleaned_data["user_id"],
-            unit_id=form.cleaned_data["unit_id"],
-            message=form.cleaned_data["message"],
-            msg_time_int=form.cleaned_data["msg_time_int"],
-            phones=phones,
-            method=method,
-            pub_date=timezone.now(),
+    if not await sync_to_async(quota.reserve)(len(phones)):
+        return HttpResponse("Messages maxed".encode("utf-8"), status=403)
+    with notify_stage(request, method, "dispatch"):
+        dispatchers = await sync_to_async(get_dispatchers)(method)
+        message = await render_message(form, method)
+        deliveries = await send_notifications(
+            method,
+            phones,
+            dispatchers,
+            message,
+            form.cleaned_data.get("dry_run", False),
         )
-    return response
+    if len(deliveries) < len(phones):
+        await sync_to_async(quota.refund)(len(phones) - len(deliveries))
+    if deliveries:
+        with notify_stage(request, method, "db"):
+            await sync_to_async(dispatch_log_writer.add)(
+                DispatchLog(
+                    user_id=form.cleaned_data["user_id"],
+                    unit_id=form.cleaned_data["unit_id"],
+                    message=form.cleaned_data["message"],
+                    msg_time_int=form.cleaned_data["msg_time_int"],
+                    phones=phones,
+                    deliveries=deliveries,
+                    method=method,
+                    pub_date=timezone.now(),
+                )
+            )
+    return get_delivery_response(phones, deliveries)
 
 
 class TerminusGPSNotifierLoginView(LoginView):
@@ -224,6 +380,61 @@ def health_check(request: HttpRequest) -> HttpResponse:
     return HttpResponse("I'm alive".encode("utf-8"), status=200)
 
 
+@require_GET
+@never_cache
+@internal_only
+def idempotency_stats(request: HttpRequest) -> HttpResponse:
+    """Returns notification idempotency hit and miss counts as JSON."""
+    return JsonResponse(get_idempotency_stats())
+
+
+@require_GET
+@never_cache
+@internal_only
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Returns notification metrics aggregated across worker processes in the Prometheus text format."""
+    return HttpResponse(
+        render_metrics().encode("utf-8"),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@login_required
+@require_GET
+@never_cache
+@server_timing
+def dispatch_history(request: HttpRequest) -> HttpResponse:
+    """
+    Returns a page of the user's dispatch logs as JSON, newest first.
+
+    Dispatch logs can be filtered by ``unit_id``, ``method`` and a ``since``/``until`` publish date range. The ``next`` cursor in the response body is passed as ``cursor`` to retrieve the next page, and is :py:obj:`None` on the last page.
+
+    Returns:
+
+        * 400 - If the provided filters or cursor were invalid.
+        * 200 - A page of dispatch logs.
+
+    """
+    form = forms.DispatchHistoryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    try:
+        with stage_timer(request, "db"):
+            results, cursor = get_dispatch_history(
+                request.user.pk,
+                unit_id=form.cleaned_data["unit_id"],
+                method=form.cleaned_data["method"],
+                since=form.cleaned_data["since"],
+                until=form.cleaned_data["until"],
+                cursor=form.cleaned_data["cursor"],
+                limit=form.cleaned_data["limit"]
+                or settings.DISPATCH_HISTORY_PAGE_SIZE,
+            )
+    except ValueError as error:
+        return JsonResponse({"errors": {"cursor": [str(error)]}}, status=400)
+    return JsonResponse({"results": results, "next": cursor})
+
+
 @require_GET
 def wialon_login(request: HttpRequest) -> HttpResponse:
     return RedirectView.as_view(
@@ -282,6 +493,7 @@ def cancel_subscription(request: HtmxHttpRequest) -> HttpResponse:
             logger.error(error)
             messages.error(request, error)
         else:
+            invalidate_subscription_status(profile.subscription_id)
             messages.success(request, "Subscription successfully canceled.")
             return redirect("terminusgps_notifier:dashboard")
     return TemplateResponse(request, request.template_name)
@@ -344,8 +556,10 @@ def create_subscription(request: HtmxHttpRequest) -> HttpResponse:
                 logger.error(error)
                 messages.error(request, error)
             else:
+                invalidate_subscription_status(profile.subscription_id)
                 profile.subscription_id = anet_response.subscriptionId
                 profile.save(update_fields=["subscription_id"])
+                invalidate_subscription_status(profile.subscription_id)
                 return redirect("terminusgps_notifier:dashboard")
     else:
         form = forms.SubscriptionCreationForm(
@@ -453,6 +667,7 @@ def authorizenet_hosted_profile_page(request: HtmxHttpRequest) -> HttpResponse:
 
 @login_required
 @require_GET
+@server_timing
 @persistent_wialon_session
 @cache_control(private=True)
 @htmx_template("terminusgps_notifier/list_resources.html")
@@ -460,7 +675,8 @@ def list_resources(request: HtmxHttpRequest) -> HttpResponse:
     wialon_sid = request.session["wialon_sid"]
     force_refresh = request.GET.get("refresh") == "on"
     try:
-        response = get_resources(wialon_sid, force_refresh)
+        with stage_timer(request, "wialon"):
+            response = get_resources(wialon_sid, force_refresh)
     except WialonAPIError as error:
         logger.error(error)
         messages.error(request, error)
@@ -535,6 +751,7 @@ def list_notifications(
 
 @login_required
 @require_GET
+@server_timing
 @persistent_wialon_session
 @cache_control(private=True)
 @htmx_template("terminusgps_notifier/detail_resources.html")
@@ -543,8 +760,9 @@ def detail_resources(
 ) -> HttpResponse:
     params = {"id": resource_id, "flags": 1025}
     try:
-        session = get_session(request.session["wialon_sid"])
-        response = session.wialon_api.core_search_item(**params)
+        with stage_timer(request, "wialon"):
+            session = get_session(request.session["wialon_sid"])
+            response = session.wialon_api.core_search_item(**params)
     except WialonAPIError as error:
         logger.error(error)
         messages.error(request, error)
@@ -557,6 +775,7 @@ def detail_resources(
 
 @login_required
 @require_GET
+@server_timing
 @persistent_wialon_session
 @cache_control(private=True)
 @htmx_template("terminusgps_notifier/select_units.html")
@@ -568,9 +787,10 @@ def select_units(request: HtmxHttpRequest) -> HttpResponse:
     items_type = str(request.GET.get("items_type", "avl_unit"))
     force_refresh = request.GET.get("refresh") == "on"
     try:
-        response = get_items(
-            wialon_sid, resource_id, items_type, force_refresh
-        )
+        with stage_timer(request, "wialon"):
+            response = get_items(
+                wialon_sid, resource_id, items_type, force_refresh
+            )
     except WialonAPIError as error:
         logger.error(error)
         messages.warning(request, error)
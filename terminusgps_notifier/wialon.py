@@ -1,11 +1,18 @@
+import hashlib
 import logging
+import threading
+import time
 from collections.abc import Sequence
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from terminusgps.wialon import flags
 from terminusgps.wialon.session import WialonAPIError, WialonSession
 
+from .constants import WIALON_INVALID_SESSION
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,17 +48,84 @@ def validate_e164_phone_number(value: str) -> None:
         )
 
 
-def get_session(sid: str) -> WialonSession:
+def get_session(sid: str | None) -> WialonSession:
     """
     Returns a Wialon API session object based on the provided session id for safely interacting with the Wialon API.
 
-    :param sid: A Wialon API session id.
-    :type sid: str
+    Sessions connect to :py:attr:`settings.WIALON_API_HOST`.
+
+    :param sid: A Wialon API session id, or :py:obj:`None` for a new session.
+    :type sid: str | None
     :returns: A resumed Wialon API session.
     :rtype: :py:obj:`~terminusgps.wialon.session.WialonSession`
 
     """
-    return WialonSession(sid=sid)
+    return WialonSession(
+        scheme=settings.WIALON_API_SCHEME,
+        host=settings.WIALON_API_HOST,
+        port=settings.WIALON_API_PORT,
+        sid=sid,
+    )
+
+
+def get_token_session_cache_key(token: str) -> str:
+    """Returns the cache key for a Wialon API token's shared session id."""
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return f"terminusgps_notifier:wialon_sid:{digest}"
+
+
+def get_token_session(token: str, refresh: bool = False) -> WialonSession:
+    """
+    Returns a Wialon API session for a token, resuming the session id shared through the cache if possible.
+
+    Shared sessions are never logged out. Cached session ids expire after :py:attr:`settings.WIALON_SESSION_CACHE_TTL` seconds without use.
+
+    :param token: A Wialon API token.
+    :type token: str
+    :param refresh: Whether to log in again instead of resuming the shared session. Default is :py:obj:`False`.
+    :type refresh: bool
+    :raises WialonAPIError: If the Wialon API token login failed.
+    :returns: A Wialon API session.
+    :rtype: :py:obj:`~terminusgps.wialon.session.WialonSession`
+
+    """
+    key = get_token_session_cache_key(token)
+    if not refresh and (sid := cache.get(key)):
+        return get_session(sid)
+    session = get_session(None)
+    session.token_login(token=token)
+    cache.set(key, session.id, settings.WIALON_SESSION_CACHE_TTL)
+    return session
+
+
+def call_with_token_session(token: str, func, *args, **kwargs):
+    """
+    Calls ``func`` with a shared Wialon API session for a token as its final positional argument and returns the result.
+
+    If Wialon reports the shared session as invalid, logs in again and retries once.
+
+    :param token: A Wialon API token.
+    :type token: str
+    :param func: A callable taking a Wialon API session as its final positional argument.
+    :type func: ~collections.abc.Callable
+    :raises WialonAPIError: If the Wialon API call failed.
+    :returns: The return value of ``func``.
+    :rtype: ~typing.Any
+
+    """
+    session = get_token_session(token)
+    try:
+        result = func(*args, session, **kwargs)
+    except WialonAPIError as error:
+        if error.code != WIALON_INVALID_SESSION:
+            raise
+        logger.debug("Shared Wialon API session expired, logging in again...")
+        session = get_token_session(token, refresh=True)
+        result = func(*args, session, **kwargs)
+    cache.touch(
+        get_token_session_cache_key(token), settings.WIALON_SESSION_CACHE_TTL
+    )
+    return result
 
 
 def clean_phones(phones: list[str]) -> list[str]:
@@ -75,30 +149,170 @@ def clean_phones(phones: list[str]) -> list[str]:
     return cleaned
 
 
-def get_phone_numbers_by_id(
-    unit_id: int, session: WialonSession, timeout: int = 300
-) -> list[str]:
+def get_phone_numbers_by_id(unit_id: int, session: WialonSession) -> list[str]:
     """
     Returns a list of unit assigned phone numbers by id.
 
-    :param form: A Wialon notification dispatch form.
-    :type form: ~terminusgps_notifier.forms.WialonNotificationDispatchForm
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
     :param session: Active Wialon API session.
     :type session: ~terminusgps.wialon.session.WialonSession
-    :param timeout: Cache timeout in seconds. Default is ``300`` (5min).
-    :type timeout: int
     :returns: A list of phone numbers.
     :rtype: list[str]
 
     """
-    driver_phones = get_driver_phone_numbers(unit_id, session)
-    cfield_phones = get_cfield_phone_numbers(unit_id, session)
+    logger.debug(
+        f"Calling the Wialon API to retrieve driver and cfield phones for unit #{unit_id}..."
+    )
+    try:
+        drivers, search = session.wialon_api.core_batch(
+            **{
+                "params": [
+                    {
+                        "svc": "resource/get_unit_drivers",
+                        "params": {"unitId": unit_id},
+                    },
+                    {
+                        "svc": "core/search_item",
+                        "params": {
+                            "id": unit_id,
+                            "flags": flags.DataFlag.UNIT_CUSTOM_FIELDS,
+                        },
+                    },
+                ],
+                "flags": 0,
+            }
+        )
+    except WialonAPIError as e:
+        if e.code == WIALON_INVALID_SESSION:
+            raise
+        # Partial batch results are discarded on error, retry separately
+        logger.warning(e)
+        driver_phones = get_driver_phone_numbers(unit_id, session)
+        cfield_phones = get_cfield_phone_numbers(unit_id, session)
+    else:
+        driver_phones = parse_driver_phone_numbers(drivers)
+        cfield_phones = parse_cfield_phone_numbers(search)
     return list(frozenset(driver_phones + cfield_phones))
 
 
-def get_phones(token: str | None, unit_id: int) -> list[str]:
+def get_phones_cache_key(user_id: int, unit_id: int) -> str:
+    """Returns the cache key for a user's Wialon unit phone numbers."""
+    return f"terminusgps_notifier:phones:{user_id}:{unit_id}"
+
+
+def cache_phones(user_id: int, unit_id: int, phones: list[str]) -> None:
+    """
+    Caches a user's Wialon unit phone numbers.
+
+    Empty lists are cached for :py:attr:`settings.WIALON_PHONES_NEGATIVE_CACHE_TTL` seconds, everything else for :py:attr:`settings.WIALON_PHONES_CACHE_TTL` seconds. Expired entries are kept for another :py:attr:`settings.WIALON_PHONES_STALE_TTL` seconds while they are refreshed.
+
+    :param user_id: A user id.
+    :type user_id: int
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
+    :param phones: A list of cleaned phone numbers.
+    :type phones: list[str]
+    :returns: Nothing.
+    :rtype: None
+
+    """
+    ttl = (
+        settings.WIALON_PHONES_CACHE_TTL
+        if phones
+        else settings.WIALON_PHONES_NEGATIVE_CACHE_TTL
+    )
+    cache.set(
+        get_phones_cache_key(user_id, unit_id),
+        {"phones": phones, "expires": time.time() + ttl},
+        ttl + settings.WIALON_PHONES_STALE_TTL,
+    )
+
+
+def invalidate_phones(user_id: int, unit_id: int) -> None:
+    """
+    Removes a user's cached Wialon unit phone numbers.
+
+    :param user_id: A user id.
+    :type user_id: int
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
+    :returns: Nothing.
+    :rtype: None
+
     """
-    Calls the Wialon API and returns a list of phone numbers assigned to a unit.
+    cache.delete(get_phones_cache_key(user_id, unit_id))
+
+
+def fetch_phones(token: str, unit_id: int) -> list[str] | None:
+    """
+    Calls the Wialon API and returns a list of cleaned phone numbers assigned to a unit.
+
+    :param token: A Wialon API token.
+    :type token: str
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
+    :returns: A list of phone numbers, or :py:obj:`None` if the Wialon API session failed.
+    :rtype: list[str] | None
+
+    """
+    try:
+        dirty_phones = call_with_token_session(
+            token, get_phone_numbers_by_id, unit_id
+        )
+        return clean_phones(dirty_phones)
+    except WialonAPIError as error:
+        logger.error(error)
+        return
+
+
+def refresh_phones(token: str, unit_id: int, user_id: int) -> list[str]:
+    """
+    Calls the Wialon API and caches the phone numbers assigned to a unit.
+
+    Failed Wialon API sessions aren't cached.
+
+    :param token: A Wialon API token.
+    :type token: str
+    :param unit_id: A Wialon unit id.
+    :type unit_id: int
+    :param user_id: A user id.
+    :type user_id: int
+    :returns: A list of phone numbers assigned to the Wialon unit.
+    :rtype: list[str]
+
+    """
+    phones = fetch_phones(token, unit_id)
+    if phones is None:
+        return []
+    cache_phones(user_id, unit_id, phones)
+    return phones
+
+
+def refresh_phones_in_background(
+    token: str, unit_id: int, user_id: int
+) -> None:
+    """Refreshes a unit's cached phone numbers in a daemon thread, unless a refresh is already running."""
+    lock_key = get_phones_cache_key(user_id, unit_id) + ":refreshing"
+    if not cache.add(lock_key, True, 60):
+        return
+
+    def target() -> None:
+        try:
+            refresh_phones(token, unit_id, user_id)
+        finally:
+            cache.delete(lock_key)
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def get_phones(
+    token: str | None, unit_id: int, user_id: int | None = None
+) -> list[str]:
+    """
+    Returns a list of phone numbers assigned to a unit.
+
+    If ``user_id`` was provided, phone numbers (including empty results) are served from the cache. Expired entries are returned immediately while they are refreshed in the background. Phone numbers synced by :py:func:`~terminusgps_notifier.contacts.sync_unit_contacts` should be checked with :py:func:`~terminusgps_notifier.contacts.get_synced_phones` first.
 
     Returns an empty list if something went wrong during the Wialon API call.
 
@@ -106,19 +320,65 @@ def get_phones(token: str | None, unit_id: int) -> list[str]:
     :type token: str | None
     :param unit_id: A Wialon unit id.
     :type unit_id: int
+    :param user_id: A user id to cache phone numbers for. Default is :py:obj:`None` (no caching).
+    :type user_id: int | None
     :returns: A list of phone numbers assigned to the Wialon unit.
     :rtype: list[str]
 
     """
     if token is None:
         return []
-    try:
-        with WialonSession(token=token) as session:
-            dirty_phones = get_phone_numbers_by_id(unit_id, session)
-            return clean_phones(dirty_phones)
-    except WialonAPIError as error:
-        logger.error(error)
-        return []
+    if user_id is None:
+        return fetch_phones(token, unit_id) or []
+    entry = cache.get(get_phones_cache_key(user_id, unit_id))
+    if entry is None:
+        return refresh_phones(token, unit_id, user_id)
+    if entry["expires"] <= time.time():
+        refresh_phones_in_background(token, unit_id, user_id)
+    return entry["phones"]
+
+
+def parse_driver_phone_numbers(drivers: dict) -> list[str]:
+    """
+    Returns a list of driver phone numbers from a `resource/get_unit_drivers` response.
+
+    :param drivers: A `resource/get_unit_drivers` response dictionary.
+    :type drivers: dict
+    :returns: A list of phone numbers.
+    :rtype: list[str]
+
+    """
+    return (
+        [driver[0].get("ph") for driver in drivers.values()]
+        if drivers.values()
+        else []
+    )
+
+
+def parse_cfield_phone_numbers(
+    search: dict, cfield_key: str = "to_number"
+) -> list[str]:
+    """
+    Returns a list of custom field phone numbers from a `core/search_item` response.
+
+    :param search: A `core/search_item` response dictionary.
+    :type search: dict
+    :param cfield_key: Custom field key containing a comma-separated list of phone numbers. Default is :py:obj:`"to_number"`.
+    :type cfield_key: str
+    :returns: A list of phone numbers.
+    :rtype: list[str]
+
+    """
+    if item := search.get("item"):
+        if cfields := item.get("flds"):
+            for cfield in cfields.values():
+                if cfield["n"] == cfield_key:
+                    return (
+                        cfield["v"].split(",")
+                        if "," in cfield["v"]
+                        else [cfield["v"]]
+                    )
+    return []
 
 
 def get_driver_phone_numbers(
@@ -142,12 +402,10 @@ def get_driver_phone_numbers(
         drivers = session.wialon_api.resource_get_unit_drivers(
             **{"unitId": unit_id}
         )
-        return (
-            [driver[0].get("ph") for driver in drivers.values()]
-            if drivers.values()
-            else []
-        )
+        return parse_driver_phone_numbers(drivers)
     except WialonAPIError as e:
+        if e.code == WIALON_INVALID_SESSION:
+            raise
         logger.warning(e)
         return []
 
@@ -175,21 +433,74 @@ def get_cfield_phone_numbers(
         search = session.wialon_api.core_search_item(
             **{"id": unit_id, "flags": flags.DataFlag.UNIT_CUSTOM_FIELDS}
         )
-        if item := search.get("item"):
-            if cfields := item.get("flds"):
-                for cfield in cfields.values():
-                    if cfield["n"] == cfield_key:
-                        return (
-                            cfield["v"].split(",")
-                            if "," in cfield["v"]
-                            else [cfield["v"]]
-                        )
-        return []
+        return parse_cfield_phone_numbers(search, cfield_key)
     except WialonAPIError as e:
+        if e.code == WIALON_INVALID_SESSION:
+            raise
         logger.warning(e)
         return []
 
 
+def get_unit_contacts(
+    session: WialonSession, cfield_key: str = "to_number"
+) -> dict[int, dict]:
+    """
+    Returns the name and phone numbers of every unit the session can access.
+
+    Units and their custom fields are retrieved with one `core/search_items` call, and every resource's drivers with another, regardless of the number of units.
+
+    :param session: Active Wialon API session.
+    :type session: ~terminusgps.wialon.session.WialonSession
+    :param cfield_key: Custom field key containing a comma-separated list of phone numbers. Default is :py:obj:`"to_number"`.
+    :type cfield_key: str
+    :returns: A dictionary of unit ids and dictionaries with the unit's ``"name"`` and uncleaned ``"phones"``.
+    :rtype: dict[int, dict]
+
+    """
+    spec = {
+        "propName": "sys_name",
+        "propValueMask": "*",
+        "propType": "property",
+        "sortType": "sys_name",
+    }
+    logger.debug("Calling the Wialon API to retrieve every unit's phones...")
+    units = session.wialon_api.core_search_items(
+        **{
+            "spec": {**spec, "itemsType": "avl_unit"},
+            "force": 1,
+            "from": 0,
+            "to": 0,
+            "flags": flags.DataFlag.UNIT_BASE
+            | flags.DataFlag.UNIT_CUSTOM_FIELDS,
+        }
+    )
+    resources = session.wialon_api.core_search_items(
+        **{
+            "spec": {**spec, "itemsType": "avl_resource"},
+            "force": 1,
+            "from": 0,
+            "to": 0,
+            "flags": flags.DataFlag.RESOURCE_BASE
+            | flags.DataFlag.RESOURCE_DRIVERS,
+        }
+    )
+    contacts = {
+        unit["id"]: {
+            "name": unit.get("nm", ""),
+            "phones": parse_cfield_phone_numbers({"item": unit}, cfield_key),
+        }
+        for unit in units.get("items", [])
+    }
+    for resource in resources.get("items", []):
+        for driver in (resource.get("drvrs") or {}).values():
+            # Drivers bound to a unit have its id in "bu"
+            if driver.get("ph") and driver.get("bu") in contacts:
+                contacts[driver["bu"]]["phones"].append(driver["ph"])
+    for contact in contacts.values():
+        contact["phones"] = list(dict.fromkeys(contact["phones"]))
+    return contacts
+
+
 def get_resources(wialon_sid: str, force: bool = False) -> dict:
     """
     Returns a dictionary of Wialon resources.
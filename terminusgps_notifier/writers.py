@@ -0,0 +1,266 @@
+import atexit
+import itertools
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from terminusgps_notifier.lifespan import on_shutdown, on_startup
+from terminusgps_notifier.models import DispatchLog
+
+__all__ = [
+    "DispatchLogWriter",
+    "dispatch_log_writer",
+    "get_lost_dispatch_logs_count",
+    "reap_lost_dispatch_logs",
+]
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "terminusgps_notifier:dispatch_log_writer"
+#: Number of writer slots read per cache query when reaping.
+SLOT_PAGE_SIZE = 100
+
+
+class DispatchLogWriter:
+    """
+    Buffers unsaved dispatch logs and inserts them with :py:meth:`~django.db.models.query.QuerySet.bulk_create`.
+
+    Buffered logs are flushed once :py:attr:`settings.DISPATCH_LOG_BATCH_SIZE` logs were added or :py:attr:`settings.DISPATCH_LOG_FLUSH_INTERVAL` seconds after the first buffered log, whichever happens first.
+
+    While logs are being inserted, their number is counted in the cache. Once the writer has flushed, it holds a cache slot for the rest of its life and a heartbeat thread keeps it alive, so logs being inserted by a killed worker are reported by :py:func:`reap_lost_dispatch_logs` when the next worker starts. Logs that were still buffered, at most :py:attr:`settings.DISPATCH_LOG_FLUSH_INTERVAL` seconds' worth, aren't reported. If the cache can't count (e.g. a dummy cache), killed workers' logs aren't reported.
+
+    """
+
+    #: Seconds without a heartbeat after which a writer is considered dead.
+    heartbeat_ttl = 60
+
+    def __init__(self) -> None:
+        self.rows: list[DispatchLog] = []
+        self.lost = 0
+        self.id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.slot: int | None = None
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._stopped = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    def get_key(self, suffix: str) -> str:
+        """Returns a cache key for the writer's state."""
+        return f"{KEY_PREFIX}:{self.id}:{suffix}"
+
+    def add(self, log: DispatchLog) -> None:
+        """
+        Adds an unsaved dispatch log to the buffer.
+
+        Flushes the buffer in the calling thread if it's full, otherwise schedules a flush in a timer thread.
+
+        :param log: An unsaved dispatch log.
+        :type log: ~terminusgps_notifier.models.DispatchLog
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        with self._lock:
+            self.rows.append(log)
+            full = len(self.rows) >= settings.DISPATCH_LOG_BATCH_SIZE
+            if not full and self._timer is None:
+                self._timer = threading.Timer(
+                    settings.DISPATCH_LOG_FLUSH_INTERVAL, self._flush_in_timer
+                )
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Inserts every buffered dispatch log.
+
+        Logs that couldn't be inserted are dropped and added to :py:attr:`lost`.
+
+        :returns: The number of inserted dispatch logs.
+        :rtype: int
+
+        """
+        with self._lock:
+            rows, self.rows = self.rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        self._start_heartbeat()
+        self._track_pending(len(rows))
+        try:
+            DispatchLog.objects.bulk_create(rows)
+        except DatabaseError as error:
+            self.lost += len(rows)
+            logger.error(f"Lost {len(rows)} dispatch log(s): '{error}'")
+            add_lost_dispatch_logs(len(rows))
+            return 0
+        finally:
+            self._track_pending(-len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        """Flushes the buffer, releases the writer's cache slot and logs the total number of lost dispatch logs, if any."""
+        self.flush()
+        self._stopped.set()
+        if self.slot is not None:
+            try:
+                cache.delete_many(
+                    [
+                        get_slot_key(self.slot),
+                        self.get_key("alive"),
+                        self.get_key("pending"),
+                    ]
+                )
+            except Exception as error:
+                logger.warning(f"Failed to release writer slot: '{error}'")
+            self.slot = None
+        if self.lost:
+            logger.critical(f"Lost {self.lost} dispatch log(s) in total")
+
+    def register(self) -> None:
+        """
+        Refreshes the writer's heartbeat and claims the lowest free cache slot, unless the writer still holds one.
+
+        Slots of writers that closed or were reaped are reused, so :py:func:`reap_lost_dispatch_logs` only scans as many slots as there were concurrent writers.
+
+        :returns: Nothing.
+        :rtype: None
+
+        """
+        cache.set(self.get_key("alive"), True, self.heartbeat_ttl)
+        if self.slot is not None and (
+            cache.get(get_slot_key(self.slot)) == self.id
+        ):
+            return
+        slot = 1
+        while not cache.add(get_slot_key(slot), self.id, None):
+            slot += 1
+        self.slot = slot
+
+    def _start_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is not None or self._stopped.is_set():
+                return
+            self._heartbeat = threading.Thread(
+                target=self._beat, name="dispatch-log-heartbeat", daemon=True
+            )
+        try:
+            self.register()
+        except Exception as error:
+            logger.warning(f"Failed to register writer: '{error}'")
+        self._heartbeat.start()
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(self.heartbeat_ttl / 3):
+            try:
+                self.register()
+            except Exception as error:
+                logger.warning(
+                    f"Failed to refresh writer heartbeat: '{error}'"
+                )
+
+    def _track_pending(self, delta: int) -> None:
+        """Adds ``delta`` to the writer's cached pending count."""
+        try:
+            cache.add(self.get_key("pending"), 0, None)
+            cache.incr(self.get_key("pending"), delta)
+        except ValueError:
+            pass
+        except Exception as error:
+            logger.warning(f"Failed to count pending dispatch logs: '{error}'")
+
+    def _flush_in_timer(self) -> None:
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+def get_slot_key(slot: int) -> str:
+    """Returns the cache key of a writer slot."""
+    return f"{KEY_PREFIX}:slot:{slot}"
+
+
+def add_lost_dispatch_logs(count: int) -> None:
+    key = f"{KEY_PREFIX}:lost"
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key, count)
+    except ValueError:
+        pass
+
+
+def get_lost_dispatch_logs_count() -> int:
+    """Returns the total number of dispatch logs lost by every worker."""
+    return cache.get(f"{KEY_PREFIX}:lost", 0)
+
+
+def reap_lost_dispatch_logs() -> int:
+    """
+    Reports dispatch logs that were being inserted by writers without a heartbeat, e.g. killed workers.
+
+    Reaped writers' pending counts are logged, added to :py:func:`get_lost_dispatch_logs_count` and removed, and their slots are freed for new writers.
+
+    :returns: The number of lost dispatch logs found.
+    :rtype: int
+
+    """
+    writers = {}
+    # Writers claim the lowest free slot, so the first empty page ends the scan
+    for start in itertools.count(1, SLOT_PAGE_SIZE):
+        page = cache.get_many(
+            [get_slot_key(n) for n in range(start, start + SLOT_PAGE_SIZE)]
+        )
+        if not page:
+            break
+        writers.update(page)
+    state = cache.get_many(
+        [
+            f"{KEY_PREFIX}:{writer_id}:{suffix}"
+            for writer_id in writers.values()
+            for suffix in ("alive", "pending")
+        ]
+    )
+    lost = 0
+    for slot_key, writer_id in writers.items():
+        if f"{KEY_PREFIX}:{writer_id}:alive" in state:
+            continue
+        pending = state.get(f"{KEY_PREFIX}:{writer_id}:pending", 0)
+        if pending > 0:
+            logger.critical(
+                f"Lost {pending} dispatch log(s) buffered by writer '{writer_id}'"
+            )
+            lost += pending
+        cache.delete_many([slot_key, f"{KEY_PREFIX}:{writer_id}:pending"])
+    if lost:
+        add_lost_dispatch_logs(lost)
+    return lost
+
+
+dispatch_log_writer = DispatchLogWriter()
+atexit.register(dispatch_log_writer.close)
+
+
+@on_shutdown
+async def flush_dispatch_logs() -> None:
+    """Flushes buffered dispatch logs before the server exits."""
+    await sync_to_async(dispatch_log_writer.close)()
+
+
+@on_startup
+async def report_lost_dispatch_logs() -> None:
+    """Reports dispatch logs lost by killed workers when the server starts."""
+    await sync_to_async(reap_lost_dispatch_logs)()
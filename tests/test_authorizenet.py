@@ -1,7 +1,11 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
 from django.test import TestCase, override_settings
-from terminusgps.authorizenet.service import AuthorizenetError
+from terminusgps.authorizenet.service import (
+    AuthorizenetError,
+    AuthorizenetService,
+)
 
 from terminusgps_notifier import authorizenet
 
@@ -88,3 +92,65 @@ class SubscriptionIsActiveTestCase(TestCase):
         ):
             result = authorizenet.subscription_is_active(id=1)
             self.assertFalse(result)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    AUTHORIZENET_SUBSCRIPTION_CACHE_TTL=300,
+    AUTHORIZENET_SUBSCRIPTION_STALE_TTL=3600,
+)
+class GetSubscriptionStatusCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = MagicMock(AuthorizenetService)
+        self.service.execute.return_value = MagicMock(status="active")
+
+    def test_status_cached_between_calls(self):
+        """Fails if a fresh cached status didn't prevent a second Authorizenet API call."""
+        with patch(
+            "terminusgps_notifier.authorizenet.get_authorizenet_service",
+            return_value=self.service,
+        ):
+            self.assertEqual(authorizenet.get_subscription_status(1), "active")
+            self.assertEqual(authorizenet.get_subscription_status(1), "active")
+        self.service.execute.assert_called_once()
+
+    def test_stale_status_returned_on_error(self):
+        """Fails if an expired cached status wasn't returned when the Authorizenet API call failed."""
+        key = authorizenet.get_subscription_cache_key(1)
+        cache.set(key, {"status": "active", "expires": 0})
+        self.service.execute.side_effect = AuthorizenetError(
+            message="", code="1"
+        )
+        with patch(
+            "terminusgps_notifier.authorizenet.get_authorizenet_service",
+            return_value=self.service,
+        ):
+            self.assertEqual(authorizenet.get_subscription_status(1), "active")
+
+    def test_not_found_removes_cached_status(self):
+        """Fails if a cached status wasn't removed after Authorizenet reported the subscription missing."""
+        key = authorizenet.get_subscription_cache_key(1)
+        cache.set(key, {"status": "active", "expires": 0})
+        self.service.execute.side_effect = AuthorizenetError(
+            message="", code="E00035"
+        )
+        with patch(
+            "terminusgps_notifier.authorizenet.get_authorizenet_service",
+            return_value=self.service,
+        ):
+            self.assertIsNone(authorizenet.get_subscription_status(1))
+        self.assertIsNone(cache.get(key))
+
+    def test_invalidate_forces_api_call(self):
+        """Fails if invalidating a cached status didn't force another Authorizenet API call."""
+        with patch(
+            "terminusgps_notifier.authorizenet.get_authorizenet_service",
+            return_value=self.service,
+        ):
+            authorizenet.get_subscription_status(1)
+            authorizenet.invalidate_subscription_status(1)
+            authorizenet.get_subscription_status(1)
+        self.assertEqual(self.service.execute.call_count, 2)
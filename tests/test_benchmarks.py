@@ -0,0 +1,66 @@
+import io
+import logging
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from terminusgps_notifier import benchmarks
+from terminusgps_notifier.models import DispatchLog
+
+logging.disable(logging.CRITICAL)
+
+
+class BenchmarksTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.baseline = Path(self.tempdir.name) / "benchmarks.json"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_every_benchmark_runs(self):
+        """Fails if a benchmark raised or didn't return a positive time."""
+        for name, setup in benchmarks.BENCHMARKS.items():
+            with self.subTest(name=name):
+                seconds = benchmarks.run_benchmark(setup, number=1, repeat=1)
+                self.assertGreater(seconds, 0)
+
+    def test_dispatch_log_inserts_rolled_back(self):
+        """Fails if the dispatch log benchmarks left rows behind."""
+        for name in ("dispatch_log_create", "dispatch_log_bulk_create_100"):
+            benchmarks.run_benchmark(
+                benchmarks.BENCHMARKS[name], number=1, repeat=1
+            )
+        self.assertFalse(DispatchLog.objects.exists())
+
+    def test_compare_flags_regressions(self):
+        """Fails if only benchmarks slower than the tolerance weren't flagged."""
+        results = {"fast": 1.2, "slow": 1.3, "new": 9.0}
+        baseline = {"fast": 1.0, "slow": 1.0}
+        self.assertEqual(
+            benchmarks.compare(results, baseline, tolerance=0.25), ["slow"]
+        )
+
+    def test_save_baseline_merges(self):
+        """Fails if saving a baseline dropped benchmarks that weren't run."""
+        benchmarks.save_baseline(self.baseline, {"a": 1.0, "b": 1.0})
+        benchmarks.save_baseline(self.baseline, {"b": 2.0})
+        self.assertEqual(
+            benchmarks.load_baseline(self.baseline), {"a": 1.0, "b": 2.0}
+        )
+
+    def test_command_raises_on_regression(self):
+        """Fails if the command didn't raise for a benchmark slower than its baseline."""
+        benchmarks.save_baseline(self.baseline, {"generate_act": 1e-12})
+        with self.assertRaises(CommandError):
+            call_command(
+                "benchmark_notify",
+                "generate_act",
+                baseline=self.baseline,
+                number=1,
+                repeat=1,
+                stdout=io.StringIO(),
+            )
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import breakers, views
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = breakers.CircuitBreaker(
+            "test", error_rate=0.5, min_requests=4, open_timeout=30
+        )
+
+    async def test_opens_at_error_rate(self):
+        """Fails if the breaker didn't open once the error rate was reached."""
+        await self.breaker.record_success()
+        await self.breaker.record_success()
+        await self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        await self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+    async def test_concurrent_sends_counted(self):
+        """Fails if concurrently recorded sends lost increments."""
+        await asyncio.gather(
+            *(self.breaker.record_success() for _ in range(25)),
+            *(self.breaker.record_failure() for _ in range(25)),
+        )
+        window = int(time.time() // self.breaker.window)
+        counts = await cache.aget_many(
+            [
+                self.breaker.get_key(f"requests:{window}"),
+                self.breaker.get_key(f"errors:{window}"),
+            ]
+        )
+        self.assertEqual(sorted(counts.values()), [25, 50])
+        self.assertFalse(self.breaker.allow())
+
+    async def test_min_requests_required(self):
+        """Fails if the breaker opened before seeing the minimum number of sends."""
+        for _ in range(3):
+            await self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+    async def test_half_open_allows_one_probe(self):
+        """Fails if a half-open breaker didn't let exactly one trial send through."""
+        await self.breaker.open()
+        await cache.adelete(self.breaker.get_key("open"))
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    async def test_probe_success_closes(self):
+        """Fails if a successful trial send didn't close the breaker."""
+        await self.breaker.open()
+        await cache.adelete(self.breaker.get_key("open"))
+        self.breaker.allow()
+        await self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    async def test_probe_failure_reopens(self):
+        """Fails if a failed trial send didn't open the breaker again."""
+        await self.breaker.open()
+        await cache.adelete(self.breaker.get_key("open"))
+        self.breaker.allow()
+        await self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    NOTIFICATION_DISPATCHERS={
+        "voice": [
+            "terminusgps_notifier.dispatchers.AWSNotificationDispatcher",
+            "terminusgps_notifier.dispatchers.TwilioNotificationDispatcher",
+        ]
+    },
+)
+class GetDispatchersBreakerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_open_dispatcher_skipped(self):
+        """Fails if a dispatcher with an open circuit breaker was returned."""
+        await breakers.get_breaker(
+            "terminusgps_notifier.dispatchers.AWSNotificationDispatcher"
+        ).open()
+        dispatchers = views.get_dispatchers("voice")
+        self.assertEqual(
+            [type(dispatcher).__name__ for dispatcher in dispatchers],
+            ["TwilioNotificationDispatcher"],
+        )
+
+    async def test_all_open_returns_every_dispatcher(self):
+        """Fails if no dispatchers were returned when every circuit breaker was open."""
+        for path in (
+            "terminusgps_notifier.dispatchers.AWSNotificationDispatcher",
+            "terminusgps_notifier.dispatchers.TwilioNotificationDispatcher",
+        ):
+            await breakers.get_breaker(path).open()
+        dispatchers = views.get_dispatchers("voice")
+        self.assertEqual(len(dispatchers), 2)
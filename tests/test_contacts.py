@@ -0,0 +1,144 @@
+import logging
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from terminusgps.wialon.session import WialonAPIError
+
+from terminusgps_notifier import contacts, models, wialon
+
+logging.disable(logging.CRITICAL)
+
+
+class GetUnitContactsTestCase(TestCase):
+    def test_drivers_and_cfields_merged(self):
+        """Fails if bound driver and custom field phones weren't merged per unit."""
+        session = MagicMock()
+        session.wialon_api.core_search_items.side_effect = [
+            {
+                "items": [
+                    {
+                        "id": 1,
+                        "nm": "Truck",
+                        "flds": {
+                            "1": {
+                                "n": "to_number",
+                                "v": "+15555555555,+15555555556",
+                            }
+                        },
+                    },
+                    {"id": 2, "nm": "Van", "flds": {}},
+                ]
+            },
+            {
+                "items": [
+                    {
+                        "id": 10,
+                        "drvrs": {
+                            "1": {"bu": 1, "ph": "+15555555555"},
+                            "2": {"bu": 2, "ph": "+15555555557"},
+                            "3": {"bu": 0, "ph": "+15555555558"},
+                            "4": {"bu": 99, "ph": "+15555555559"},
+                        },
+                    }
+                ]
+            },
+        ]
+        self.assertEqual(
+            wialon.get_unit_contacts(session),
+            {
+                1: {
+                    "name": "Truck",
+                    "phones": ["+15555555555", "+15555555556"],
+                },
+                2: {"name": "Van", "phones": ["+15555555557"]},
+            },
+        )
+        self.assertEqual(session.wialon_api.core_search_items.call_count, 2)
+
+
+class SyncUnitContactsTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        self.profile = models.Profile.objects.get(pk=1)
+        self.profile.token = "token"
+        self.profile.save(update_fields=["token"])
+
+    def test_contacts_replaced(self):
+        """Fails if synced unit contacts weren't updated and inaccessible units weren't deleted."""
+        models.UnitContact.objects.create(
+            profile=self.profile, unit_id=3, phones=["+15555555550"]
+        )
+        models.UnitContact.objects.create(
+            profile=self.profile, unit_id=1, phones=["+15555555550"]
+        )
+        with patch(
+            "terminusgps_notifier.contacts.call_with_token_session",
+            return_value={
+                1: {"name": "Truck", "phones": ["+15555555555", "invalid"]},
+                2: {"name": "Van", "phones": []},
+            },
+        ):
+            self.assertEqual(contacts.sync_unit_contacts(), 1)
+        self.assertEqual(
+            dict(models.UnitContact.objects.values_list("unit_id", "phones")),
+            {1: ["+15555555555"], 2: []},
+        )
+
+    def test_failed_sync_keeps_contacts(self):
+        """Fails if a failed Wialon API call deleted a profile's unit contacts."""
+        models.UnitContact.objects.create(profile=self.profile, unit_id=1)
+        with patch(
+            "terminusgps_notifier.contacts.call_with_token_session",
+            side_effect=WialonAPIError("Invalid session"),
+        ):
+            self.assertEqual(contacts.sync_unit_contacts(), 0)
+        self.assertTrue(models.UnitContact.objects.exists())
+
+    def test_synced_phones_read_without_wialon(self):
+        """Fails if a recently synced unit's phones weren't returned."""
+        models.UnitContact.objects.create(
+            profile=self.profile, unit_id=1, phones=["+15555555555"]
+        )
+        self.assertEqual(contacts.get_synced_phones(1, 1), ["+15555555555"])
+        self.assertIsNone(contacts.get_synced_phones(1, 2))
+
+    @override_settings(UNIT_CONTACT_MAX_AGE=60)
+    def test_stale_synced_phones_ignored(self):
+        """Fails if a unit contact older than the maximum age was returned."""
+        models.UnitContact.objects.create(
+            profile=self.profile,
+            unit_id=1,
+            phones=["+15555555555"],
+            sync_date=timezone.now() - timedelta(seconds=61),
+        )
+        self.assertIsNone(contacts.get_synced_phones(1, 1))
+
+    async def test_notify_reads_synced_phones(self):
+        """Fails if the notify view called the Wialon API for a synced unit."""
+        await models.UnitContact.objects.acreate(
+            profile=self.profile, unit_id=1, phones=[]
+        )
+        with (
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+            patch("terminusgps_notifier.views.get_phones") as mock_get_phones,
+        ):
+            response = await self.async_client.post(
+                "/v3/notify/sms/",
+                {
+                    "user_id": "1",
+                    "unit_id": "1",
+                    "message": "Test",
+                    "msg_time_int": 0,
+                },
+            )
+        self.assertEqual(response.status_code, 204)
+        mock_get_phones.assert_not_called()
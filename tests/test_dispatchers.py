@@ -0,0 +1,241 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from django.core.exceptions import ImproperlyConfigured
+
+from terminusgps_notifier import dispatchers, lifespan
+
+logging.disable(logging.CRITICAL)
+
+
+class AWSClientPoolTestCase(TestCase):
+    def setUp(self):
+        self.pool = dispatchers.AWSClientPool()
+        self.client = MagicMock()
+        self.client.close = AsyncMock()
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=self.client)
+        self.pool.session = MagicMock()
+        self.pool.session.client.return_value = context
+
+    async def test_client_reused(self):
+        """Fails if a second client was created for the same event loop, service and region."""
+        first = await self.pool.get_client(
+            "pinpoint-sms-voice-v2", "us-east-1"
+        )
+        second = await self.pool.get_client(
+            "pinpoint-sms-voice-v2", "us-east-1"
+        )
+        self.assertIs(first, second)
+        self.pool.session.client.assert_called_once()
+
+    async def test_close_closes_clients(self):
+        """Fails if closing the pool didn't close its clients."""
+        await self.pool.get_client("pinpoint-sms-voice-v2", "us-east-1")
+        await self.pool.close()
+        self.client.close.assert_awaited_once()
+        await self.pool.get_client("pinpoint-sms-voice-v2", "us-east-1")
+        self.assertEqual(self.pool.session.client.call_count, 2)
+
+
+@override_settings(
+    TWILIO_ACCOUNT_SID="AC00000000000000000000000000000000",
+    TWILIO_AUTH_TOKEN="token",
+    TWILIO_MAX_CONNECTIONS=5,
+)
+class TwilioClientPoolTestCase(TestCase):
+    async def test_client_reused(self):
+        """Fails if a second Twilio client was created for the same event loop."""
+        pool = dispatchers.TwilioClientPool()
+        first = await pool.get_client()
+        second = await pool.get_client()
+        self.assertIs(first, second)
+        self.assertEqual(first.http_client.session.connector.limit, 5)
+        await pool.close()
+
+    async def test_close_closes_http_session(self):
+        """Fails if closing the pool didn't close the shared HTTP session."""
+        pool = dispatchers.TwilioClientPool()
+        client = await pool.get_client()
+        await pool.close()
+        self.assertTrue(client.http_client.session.closed)
+
+
+class LifespanTestCase(TestCase):
+    async def test_shutdown_hooks_awaited(self):
+        """Fails if shutdown hooks weren't awaited on an ASGI lifespan shutdown event."""
+        hook = AsyncMock()
+        application = AsyncMock()
+        receive = AsyncMock(
+            side_effect=[
+                {"type": "lifespan.startup"},
+                {"type": "lifespan.shutdown"},
+            ]
+        )
+        send = AsyncMock()
+        with patch.object(lifespan, "_shutdown_hooks", [hook]):
+            await lifespan.lifespan(application)(
+                {"type": "lifespan"}, receive, send
+            )
+        hook.assert_awaited_once()
+        application.assert_not_awaited()
+        send.assert_any_await({"type": "lifespan.shutdown.complete"})
+
+    async def test_startup_hooks_awaited(self):
+        """Fails if startup hooks weren't awaited before startup was reported complete."""
+        calls = []
+        hook = AsyncMock(side_effect=lambda: calls.append("hook"))
+        receive = AsyncMock(
+            side_effect=[
+                {"type": "lifespan.startup"},
+                {"type": "lifespan.shutdown"},
+            ]
+        )
+        send = AsyncMock(side_effect=lambda message: calls.append(message))
+        with patch.object(lifespan, "_startup_hooks", [hook]):
+            await lifespan.lifespan(AsyncMock())(
+                {"type": "lifespan"}, receive, send
+            )
+        self.assertEqual(
+            calls[:2], ["hook", {"type": "lifespan.startup.complete"}]
+        )
+
+
+class DispatcherRegistryTestCase(TestCase):
+    def setUp(self):
+        self.registry = dispatchers.DispatcherRegistry()
+
+    def test_dispatchers_shared_across_methods(self):
+        """Fails if a dispatcher path used by several methods wasn't instantiated once."""
+        path = "terminusgps_notifier.dispatchers.DummyNotificationDispatcher"
+        self.registry.load({"sms": [path], "voice": [path, path]})
+        sms = self.registry.get_chain("sms")
+        voice = self.registry.get_chain("voice")
+        self.assertEqual(len(voice), 2)
+        self.assertIs(sms[0][1], voice[0][1])
+        self.assertIs(voice[0][1], voice[1][1])
+
+    def test_invalid_paths_raise(self):
+        """Fails if an unimportable or non-dispatcher path didn't raise ImproperlyConfigured."""
+        for path in ("terminusgps_notifier.dispatchers.Missing", "json.dumps"):
+            with self.subTest(path=path):
+                with self.assertRaises(ImproperlyConfigured):
+                    self.registry.load({"sms": [path]})
+
+    def test_invalid_method_raises(self):
+        """Fails if an unknown notification method didn't raise ImproperlyConfigured."""
+        with self.assertRaises(ImproperlyConfigured):
+            self.registry.load({"fax": []})
+
+    @override_settings(
+        NOTIFICATION_DISPATCHERS={
+            "sms": ["tests.test_dispatchers.PrimaryDispatcher"]
+        }
+    )
+    def test_reloaded_on_setting_change(self):
+        """Fails if the global registry wasn't reloaded after NOTIFICATION_DISPATCHERS changed."""
+        ((_, dispatcher),) = dispatchers.registry.get_chain("sms")
+        self.assertIsInstance(dispatcher, PrimaryDispatcher)
+
+    async def test_start_failures_logged(self):
+        """Fails if a dispatcher failing to start stopped the other dispatchers from starting."""
+        self.registry.load(
+            {
+                "voice": [
+                    "tests.test_dispatchers.PrimaryDispatcher",
+                    "tests.test_dispatchers.SecondaryDispatcher",
+                ]
+            }
+        )
+        primary, secondary = self.registry.dispatchers.values()
+        with (
+            patch.object(primary, "start", AsyncMock(side_effect=ValueError)),
+            patch.object(secondary, "start", AsyncMock()) as mock_start,
+        ):
+            await self.registry.start()
+        mock_start.assert_awaited_once()
+
+
+class PrimaryDispatcher(dispatchers.DummyNotificationDispatcher):
+    pass
+
+
+class SecondaryDispatcher(dispatchers.DummyNotificationDispatcher):
+    pass
+
+
+@override_settings(NOTIFICATION_HEDGE_DELAY=0.05)
+class SendHedgedNotificationTestCase(TestCase):
+    def setUp(self):
+        self.primary = PrimaryDispatcher()
+        self.secondary = SecondaryDispatcher()
+        self.secondary.send_notification = AsyncMock()
+        dispatchers.send_latencies.clear()
+
+    async def test_fast_primary_not_hedged(self):
+        """Fails if the secondary dispatcher was started although the primary dispatcher succeeded in time."""
+        self.primary.send_notification = AsyncMock()
+        name = await dispatchers.send_hedged_notification(
+            [self.primary, self.secondary],
+            "+15555555555",
+            "voice",
+            "Test Message",
+        )
+        self.assertEqual(name, "PrimaryDispatcher")
+        self.secondary.send_notification.assert_not_awaited()
+
+    async def test_slow_primary_hedged_and_cancelled(self):
+        """Fails if a slow primary dispatcher wasn't hedged by the secondary dispatcher and cancelled."""
+        cancelled = asyncio.Event()
+
+        async def slow_send(to_number, method, message, dry_run):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        self.primary.send_notification = slow_send
+        name = await dispatchers.send_hedged_notification(
+            [self.primary, self.secondary],
+            "+15555555555",
+            "voice",
+            "Test Message",
+        )
+        self.assertEqual(name, "SecondaryDispatcher")
+        self.assertTrue(cancelled.is_set())
+
+    async def test_failed_primary_falls_back(self):
+        """Fails if the secondary dispatcher wasn't used after the primary dispatcher failed."""
+        self.primary.send_notification = AsyncMock(side_effect=ValueError)
+        name = await dispatchers.send_hedged_notification(
+            [self.primary, self.secondary],
+            "+15555555555",
+            "voice",
+            "Test Message",
+        )
+        self.assertEqual(name, "SecondaryDispatcher")
+
+    async def test_all_failing_raises(self):
+        """Fails if the last dispatcher error wasn't raised after every dispatcher failed."""
+        self.primary.send_notification = AsyncMock(side_effect=ValueError)
+        self.secondary.send_notification = AsyncMock(side_effect=KeyError)
+        with self.assertRaises(KeyError):
+            await dispatchers.send_hedged_notification(
+                [self.primary, self.secondary],
+                "+15555555555",
+                "voice",
+                "Test Message",
+            )
+
+    def test_hedge_delay_uses_p95(self):
+        """Fails if the hedge delay wasn't the 95th percentile of measured latencies."""
+        self.assertEqual(dispatchers.get_hedge_delay(self.primary), 0.05)
+        dispatchers.send_latencies["PrimaryDispatcher"].extend(
+            [0.1] * 95 + [5.0] * 5
+        )
+        self.assertGreater(dispatchers.get_hedge_delay(self.primary), 0.1)
+        self.assertLess(dispatchers.get_hedge_delay(self.primary), 5.0)
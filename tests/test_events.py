@@ -0,0 +1,145 @@
+import logging
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from terminusgps.wialon.session import WialonAPIError
+from wialon.api import WialonError
+
+from terminusgps_notifier import events, models, wialon
+from terminusgps_notifier.management.commands import watch_unit_phones
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class UnitPhonesWatcherTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.profile = models.Profile.objects.get(pk=1)
+        self.profile.token = "token"
+        self.profile.save(update_fields=["token"])
+        self.session = MagicMock()
+        self.session.wialon_api.core_update_data_flags.return_value = [
+            {"i": 1, "d": {"cls": 2, "nm": "Truck"}},
+            {"i": 2, "d": {"cls": 2, "nm": "Van"}},
+            {"i": 10, "d": {"cls": 3, "drvrs": {"1": {"bu": 1}}}},
+        ]
+        self.watcher = events.UnitPhonesWatcher(self.profile)
+        patcher = patch(
+            "terminusgps_notifier.events.get_session",
+            return_value=self.session,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def poll(self, *events_, phones=None):
+        self.session.wialon_api.avl_evts.return_value = {
+            "tm": 1,
+            "events": list(events_),
+        }
+        with patch(
+            "terminusgps_notifier.events.get_phone_numbers_by_id",
+            side_effect=lambda unit_id, session: (phones or {}).get(
+                unit_id, []
+            ),
+        ) as mock_get:
+            changed = self.watcher.poll()
+        return changed, mock_get
+
+    def test_cfield_change_refreshes_unit(self):
+        """Fails if a custom field change didn't refresh only that unit's unit contact and cached phones."""
+        models.UnitContact.objects.create(
+            profile=self.profile, unit_id=1, phones=[]
+        )
+        changed, mock_get = self.poll(
+            {"i": 1, "t": "u", "d": {"flds": {}}},
+            {"i": 2, "t": "u", "d": {"pos": {}}},
+            phones={1: ["+15555555555"]},
+        )
+        self.assertEqual(changed, {1})
+        mock_get.assert_called_once_with(1, self.session)
+        self.assertEqual(
+            models.UnitContact.objects.get(unit_id=1).phones, ["+15555555555"]
+        )
+        self.assertEqual(
+            cache.get(wialon.get_phones_cache_key(self.profile.user_id, 1))[
+                "phones"
+            ],
+            ["+15555555555"],
+        )
+
+    def test_driver_rebinding_refreshes_both_units(self):
+        """Fails if rebinding a driver didn't refresh both the old and new unit."""
+        changed, _ = self.poll(
+            {"i": 10, "t": "u", "d": {"drvrs": {"1": {"bu": 2}}}}
+        )
+        self.assertEqual(changed, {1, 2})
+        self.assertEqual(self.watcher.bindings, {(10, "1"): 2})
+
+    def test_unit_deletion_invalidates_unit(self):
+        """Fails if a deleted unit's unit contact and cached phones weren't removed."""
+        models.UnitContact.objects.create(profile=self.profile, unit_id=1)
+        wialon.cache_phones(self.profile.user_id, 1, ["+15555555555"])
+        changed, mock_get = self.poll({"i": 1, "t": "d", "d": None})
+        self.assertEqual(changed, {1})
+        mock_get.assert_not_called()
+        self.assertFalse(models.UnitContact.objects.exists())
+        self.assertIsNone(
+            cache.get(wialon.get_phones_cache_key(self.profile.user_id, 1))
+        )
+
+    def test_invalid_session_subscribes_again(self):
+        """Fails if an invalid session wasn't subscribed to again on the next poll."""
+        self.session.wialon_api.avl_evts.side_effect = [
+            WialonAPIError(WialonError(1, "Invalid session")),
+            {"tm": 2, "events": []},
+        ]
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertIsNone(self.watcher.session)
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertEqual(
+            self.session.wialon_api.core_update_data_flags.call_count, 2
+        )
+
+
+class WatchUnitPhonesCommandTestCase(TestCase):
+    def test_poll_closes_old_connections(self):
+        """Fails if a poll didn't close old database connections before and after polling."""
+        watcher = MagicMock()
+        watcher.poll.side_effect = Exception("Failed")
+        command = watch_unit_phones.Command()
+        with patch.object(
+            watch_unit_phones, "close_old_connections"
+        ) as mock_close:
+            self.assertEqual(command.poll(watcher), set())
+        self.assertEqual(mock_close.call_count, 2)
+        self.assertIsNone(watcher.session)
+
+    def test_watchers_refreshed_on_interval(self):
+        """Fails if Wialon API tokens were reloaded before the refresh interval."""
+        with (
+            patch.object(
+                watch_unit_phones.Command, "update_watchers"
+            ) as mock_update,
+            patch.object(
+                watch_unit_phones.time,
+                "sleep",
+                side_effect=[None, None, KeyboardInterrupt],
+            ),
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command(
+                    "watch_unit_phones", interval=0, refresh_interval=60
+                )
+        mock_update.assert_called_once()
@@ -0,0 +1,99 @@
+import logging
+from datetime import UTC, datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from terminusgps_notifier import history, models
+
+logging.disable(logging.CRITICAL)
+
+
+class DispatchHistoryTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        self.user = get_user_model().objects.get(pk=1)
+        start = datetime(2026, 10, 1, tzinfo=UTC)
+        # Two logs share every publish date to exercise the id tiebreaker
+        models.DispatchLog.objects.bulk_create(
+            models.DispatchLog(
+                user_id=self.user.pk,
+                unit_id=1 + n % 2,
+                message=f"Message #{n}",
+                msg_time_int=0,
+                method="sms" if n % 3 else "voice",
+                pub_date=start + timedelta(minutes=n // 2),
+            )
+            for n in range(10)
+        )
+        models.DispatchLog.objects.create(
+            user_id=2,
+            unit_id=1,
+            message="Someone else's message",
+            msg_time_int=0,
+            method="sms",
+            pub_date=start,
+        )
+
+    def test_pages_cover_every_log_once(self):
+        """Fails if paginating with cursors skipped, repeated or misordered the user's logs."""
+        seen, cursor = [], None
+        while True:
+            rows, cursor = history.get_dispatch_history(
+                self.user.pk, cursor=cursor, limit=3
+            )
+            seen.extend(rows)
+            if cursor is None:
+                break
+        expected = list(
+            models.DispatchLog.objects.filter(user_id=self.user.pk)
+            .order_by("-pub_date", "-pk")
+            .values_list("pk", flat=True)
+        )
+        self.assertEqual([row["id"] for row in seen], expected)
+
+    def test_filters(self):
+        """Fails if the unit, method and date range filters weren't applied."""
+        rows, cursor = history.get_dispatch_history(
+            self.user.pk,
+            unit_id=1,
+            method="sms",
+            since=datetime(2026, 10, 1, 0, 1, tzinfo=UTC),
+            until=datetime(2026, 10, 1, 0, 4, tzinfo=UTC),
+        )
+        self.assertIsNone(cursor)
+        self.assertEqual(
+            [row["message"] for row in rows], ["Message #4", "Message #2"]
+        )
+
+    def test_view_single_history_query(self):
+        """Fails if a history page took more than one dispatch log query."""
+        self.client.force_login(self.user)
+        response = self.client.get("/v3/history/", {"limit": 4})
+        cursor = response.json()["next"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/v3/history/", {"limit": 4, "cursor": cursor}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 4)
+        self.assertEqual(
+            len([q for q in queries if "dispatchlog" in q["sql"]]), 1
+        )
+
+    def test_view_invalid_cursor(self):
+        """Fails if an invalid cursor didn't return status code 400."""
+        self.client.force_login(self.user)
+        response = self.client.get("/v3/history/", {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_requires_login(self):
+        """Fails if an anonymous user wasn't redirected to login."""
+        response = self.client.get("/v3/history/")
+        self.assertEqual(response.status_code, 302)
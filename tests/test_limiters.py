@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import limiters
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class DispatchLimiterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_concurrency_limited(self):
+        """Fails if a send over the concurrency limit didn't wait and time out."""
+        limiter = limiters.DispatchLimiter("test", concurrency=1, timeout=0.1)
+        async with limiter.limit():
+            with self.assertRaises(TimeoutError):
+                async with limiter.limit():
+                    pass
+        async with limiter.limit():
+            pass
+
+    async def test_slot_released_on_error(self):
+        """Fails if a slot wasn't released after the send raised an exception."""
+        limiter = limiters.DispatchLimiter("test", concurrency=1, timeout=0.1)
+        with self.assertRaises(ValueError):
+            async with limiter.limit():
+                raise ValueError
+        self.assertEqual(await cache.aget(limiter.get_concurrency_key()), 0)
+
+    async def test_rate_limited(self):
+        """Fails if a send over the rate limit in the same second didn't wait and time out."""
+        limiter = limiters.DispatchLimiter("test", rate=2, timeout=0.1)
+        with patch.object(limiters.time, "time", return_value=1000.0):
+            for _ in range(2):
+                async with limiter.limit():
+                    pass
+            with self.assertRaises(TimeoutError):
+                async with limiter.limit():
+                    pass
+        with patch.object(limiters.time, "time", return_value=1001.0):
+            async with limiter.limit():
+                pass
+
+    async def test_concurrency_limited_under_burst(self):
+        """Fails if concurrent sends exceeded the concurrency limit during a burst."""
+        limiter = limiters.DispatchLimiter("test", concurrency=5, timeout=5)
+        active, peak = 0, 0
+
+        async def send():
+            nonlocal active, peak
+            async with limiter.limit():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(send() for _ in range(50)))
+        self.assertEqual(peak, 5)
+        self.assertEqual(await cache.aget(limiter.get_concurrency_key()), 0)
+
+    async def test_rate_limited_under_burst(self):
+        """Fails if tokens taken in the same second exceeded the rate limit during a burst."""
+        limiter = limiters.DispatchLimiter("test", rate=5)
+        with patch.object(limiters.time, "time", return_value=1000.0):
+            results = await asyncio.gather(
+                *(limiter._take_token() for _ in range(50))
+            )
+        self.assertEqual(results.count(True), 5)
+
+    async def test_rate_timeout_scales_with_queue(self):
+        """Fails if sends queued behind the rate limit in the same process timed out."""
+        limiter = limiters.DispatchLimiter("test", rate=10, timeout=0.1)
+
+        async def send():
+            async with limiter.limit():
+                pass
+
+        results = await asyncio.gather(
+            *(send() for _ in range(15)), return_exceptions=True
+        )
+        self.assertEqual(results, [None] * 15)
+        self.assertEqual(limiters._waiting["test"], 0)
+
+    async def test_held_slot_refreshed(self):
+        """Fails if the concurrency counter expired while a slot was held."""
+        limiter = limiters.DispatchLimiter("test", concurrency=1)
+        limiter.slot_ttl = 0.3
+        async with limiter.limit():
+            await asyncio.sleep(0.5)
+            self.assertEqual(
+                await cache.aget(limiter.get_concurrency_key()), 1
+            )
+        self.assertEqual(await cache.aget(limiter.get_concurrency_key()), 0)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }
+    )
+    async def test_dummy_cache_not_limited(self):
+        """Fails if sends were limited without a cache that can count."""
+        limiter = limiters.DispatchLimiter(
+            "test", concurrency=1, rate=1, timeout=0.1
+        )
+        async with limiter.limit():
+            async with limiter.limit():
+                pass
+
+    @override_settings(
+        NOTIFICATION_DISPATCHER_LIMITS={"test": {"concurrency": 5, "rate": 2}},
+        NOTIFICATION_DISPATCHER_LIMIT_TIMEOUT=3,
+    )
+    def test_get_limiter_uses_settings(self):
+        """Fails if the limiter wasn't configured from settings."""
+        limiter = limiters.get_limiter("test")
+        self.assertEqual(limiter.concurrency, 5)
+        self.assertEqual(limiter.rate, 2)
+        self.assertEqual(limiter.timeout, 3)
+        limiter = limiters.get_limiter("unknown")
+        self.assertIsNone(limiter.concurrency)
+        self.assertIsNone(limiter.rate)
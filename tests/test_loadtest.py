@@ -0,0 +1,85 @@
+import logging
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import loadtest, models, wialon
+
+logging.disable(logging.CRITICAL)
+
+
+class LatencyRecorderTestCase(TestCase):
+    def test_summary_percentiles(self):
+        """Fails if the summarized percentiles weren't in milliseconds."""
+        recorder = loadtest.LatencyRecorder()
+        for n in range(1, 101):
+            recorder.record("total", n / 1000)
+        summary = recorder.summarize()["total"]
+        self.assertEqual(summary["count"], 100)
+        self.assertAlmostEqual(summary["p50"], 50.5)
+        self.assertAlmostEqual(summary["p99"], 99.01)
+
+    def test_single_sample(self):
+        """Fails if a single sample wasn't used for every percentile."""
+        recorder = loadtest.LatencyRecorder()
+        recorder.record("total", 0.002)
+        self.assertEqual(recorder.summarize()["total"]["p95"], 2)
+
+
+class ParseServerTimingTestCase(TestCase):
+    def test_durations_in_seconds(self):
+        """Fails if Server-Timing durations weren't parsed into seconds."""
+        timings = loadtest.parse_server_timing(
+            'phones;dur=12.5, cache;desc="hit", total;dur=40'
+        )
+        self.assertEqual(timings, {"phones": 0.0125, "total": 0.04})
+
+
+class FakeProvidersTestCase(TestCase):
+    async def test_fake_wialon_serves_phones(self):
+        """Fails if phone numbers couldn't be fetched from the fake Wialon API."""
+        fakes = loadtest.FakeProviders(phones=3)
+        await fakes.start()
+        try:
+            with override_settings(**fakes.get_settings()):
+                phones = await sync_to_async(wialon.fetch_phones)(
+                    "token", 12345678
+                )
+        finally:
+            await fakes.stop()
+        self.assertEqual(
+            sorted(phones), ["+15555550000", "+15555550001", "+15555550002"]
+        )
+        self.assertEqual(fakes.get_calls()["wialon"], 2)
+
+
+class LoadtestCommandTestCase(TestCase):
+    @override_settings(DEBUG=False)
+    def test_refuses_without_debug(self):
+        """Fails if an in-process load test ran against a non-debug database."""
+        with self.assertRaises(CommandError):
+            call_command("loadtest_notify", stdout=StringIO())
+        self.assertFalse(
+            get_user_model().objects.filter(username="loadtest").exists()
+        )
+
+    @override_settings(DEBUG=True)
+    def test_cleans_up_user_and_logs(self):
+        """Fails if the load test user or its dispatch logs were left in the database."""
+        call_command(
+            "loadtest_notify",
+            requests=2,
+            rate=100,
+            wialon_latency=0,
+            pinpoint_latency=0,
+            twilio_latency=0,
+            stdout=StringIO(),
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(username="loadtest").exists()
+        )
+        self.assertFalse(models.DispatchLog.objects.exists())
@@ -0,0 +1,91 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import metrics
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    NOTIFICATION_DISPATCHERS={
+        "sms": ["terminusgps_notifier.dispatchers.AWSNotificationDispatcher"]
+    },
+)
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.metrics_writer.flush()
+
+    def test_histogram_buckets_cumulative(self):
+        """Fails if histogram buckets, sum and count weren't rendered cumulatively."""
+        metrics.observe(
+            "notify_stage_seconds", 0.02, method="sms", stage="form"
+        )
+        metrics.observe("notify_stage_seconds", 3, method="sms", stage="form")
+        text = metrics.render_metrics()
+        series = 'terminusgps_notifier_notify_stage_seconds_{}{{method="sms",stage="form"{}}} {}'
+        self.assertIn(series.format("bucket", ',le="0.01"', 0), text)
+        self.assertIn(series.format("bucket", ',le="0.025"', 1), text)
+        self.assertIn(series.format("bucket", ',le="5.0"', 2), text)
+        self.assertIn(series.format("bucket", ',le="+Inf"', 2), text)
+        self.assertIn(series.format("sum", "", 3.02), text)
+        self.assertIn(series.format("count", "", 2), text)
+
+    def test_counter_by_dispatcher(self):
+        """Fails if counters weren't rendered per method and dispatcher."""
+        metrics.increment(
+            "dispatcher_send_errors_total",
+            method="sms",
+            dispatcher="AWSNotificationDispatcher",
+        )
+        text = metrics.render_metrics()
+        self.assertIn(
+            'terminusgps_notifier_dispatcher_send_errors_total{method="sms",dispatcher="AWSNotificationDispatcher"} 1',
+            text,
+        )
+
+    def test_flushes_add_across_writers(self):
+        """Fails if increments flushed by separate writers weren't summed."""
+        key = metrics.get_metric_key(
+            "notify_requests_total", {"method": "sms", "status": 200}
+        )
+        for _ in range(2):
+            writer = metrics.MetricsWriter()
+            writer.add(key, 2)
+            writer.flush()
+        self.assertEqual(cache.get(key), 4)
+
+    async def test_notify_counts_responses(self):
+        """Fails if a notify response wasn't counted by method and status code."""
+        await self.async_client.post("/v3/notify/sms/", {"user_id": "x"})
+        text = await sync_to_async(metrics.render_metrics)()
+        self.assertIn(
+            'terminusgps_notifier_notify_requests_total{method="sms",status="406"} 1',
+            text,
+        )
+        self.assertIn(
+            'terminusgps_notifier_notify_stage_seconds_count{method="sms",stage="form"} 1',
+            text,
+        )
+
+    def test_metrics_view(self):
+        """Fails if the metrics endpoint didn't return Prometheus text."""
+        response = self.client.get("/v3/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b"# TYPE terminusgps_notifier_notify_request_seconds histogram",
+            response.content,
+        )
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_metrics_view_restricted(self):
+        """Fails if metrics were served to an external anonymous user."""
+        response = self.client.get("/v3/metrics/")
+        self.assertEqual(response.status_code, 403)
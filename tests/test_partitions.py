@@ -0,0 +1,151 @@
+import logging
+import unittest
+from datetime import UTC, datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from terminusgps_notifier import models, partitions
+
+logging.disable(logging.CRITICAL)
+
+
+class PartitionBoundsTestCase(TestCase):
+    def test_parse_partition_bound(self):
+        """Fails if a range partition bound expression wasn't parsed."""
+        self.assertEqual(
+            partitions.parse_partition_bound(
+                "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')"
+            ),
+            (None, datetime(2026, 11, 1, tzinfo=UTC)),
+        )
+        self.assertIsNone(partitions.parse_partition_bound("DEFAULT"))
+
+    def test_missing_months_skip_overlaps(self):
+        """Fails if months covered by an existing partition weren't skipped."""
+        existing = {
+            "legacy": (None, datetime(2026, 11, 1, tzinfo=UTC)),
+            "p202612": (
+                datetime(2026, 12, 1, tzinfo=UTC),
+                datetime(2027, 1, 1, tzinfo=UTC),
+            ),
+        }
+        months = [
+            partitions.add_months(datetime(2026, 10, 1, tzinfo=UTC), n)
+            for n in range(4)
+        ]
+        self.assertEqual(
+            partitions.get_missing_months(existing, months),
+            [
+                datetime(2026, 11, 1, tzinfo=UTC),
+                datetime(2027, 1, 1, tzinfo=UTC),
+            ],
+        )
+
+    @override_settings(DISPATCH_LOG_RETENTION_MONTHS=2)
+    def test_expired_partitions(self):
+        """Fails if partitions ending after the retention cutoff were expired."""
+        cutoff = partitions.get_retention_cutoff(
+            datetime(2027, 1, 15, tzinfo=UTC)
+        )
+        self.assertEqual(cutoff, datetime(2026, 11, 1, tzinfo=UTC))
+        existing = {
+            "legacy": (None, datetime(2026, 10, 1, tzinfo=UTC)),
+            "p202610": (
+                datetime(2026, 10, 1, tzinfo=UTC),
+                datetime(2026, 11, 1, tzinfo=UTC),
+            ),
+            "p202611": (
+                datetime(2026, 11, 1, tzinfo=UTC),
+                datetime(2026, 12, 1, tzinfo=UTC),
+            ),
+        }
+        self.assertEqual(
+            partitions.get_expired_partitions(existing, cutoff),
+            ["legacy", "p202610"],
+        )
+
+
+@unittest.skipIf(
+    connection.vendor == "postgresql", "Dispatch logs are partitioned"
+)
+@override_settings(DISPATCH_LOG_RETENTION_MONTHS=1)
+class DeleteExpiredDispatchLogsTestCase(TestCase):
+    def test_unpartitioned_logs_deleted(self):
+        """Fails if expired dispatch logs weren't deleted when the table wasn't partitioned."""
+        for pub_date in (
+            datetime(2026, 8, 31, tzinfo=UTC),
+            datetime(2026, 9, 1, tzinfo=UTC),
+        ):
+            models.DispatchLog.objects.create(
+                user_id=1,
+                unit_id=1,
+                message="Hello",
+                msg_time_int=0,
+                method="sms",
+                pub_date=pub_date,
+            )
+        self.assertEqual(
+            partitions.delete_expired_dispatch_logs(
+                batch_size=1, now=datetime(2026, 10, 17, tzinfo=UTC)
+            ),
+            1,
+        )
+        self.assertEqual(models.DispatchLog.objects.count(), 1)
+
+    def test_command_falls_back_to_delete(self):
+        """Fails if the command didn't delete dispatch logs on an unpartitioned table."""
+        stdout = StringIO()
+        call_command("partition_dispatch_logs", stdout=stdout)
+        self.assertIn("aren't partitioned", stdout.getvalue())
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Dispatch logs aren't partitioned"
+)
+class CreatePartitionsTestCase(TestCase):
+    def setUp(self):
+        self.month = partitions.add_months(
+            partitions.get_month(timezone.now()), 8
+        )
+
+    def get_partition(self, log):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT tableoid::regclass::text FROM {models.DispatchLog._meta.db_table} WHERE id = %s",
+                [log.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_default_rows_moved(self):
+        """Fails if dispatch logs in the default partition weren't moved into a new partition."""
+        log = models.DispatchLog.objects.create(
+            user_id=1,
+            unit_id=1,
+            message="Hello",
+            msg_time_int=0,
+            method="sms",
+            pub_date=self.month,
+        )
+        self.assertTrue(self.get_partition(log).endswith("_default"))
+        created = partitions.create_partitions(months_ahead=8)
+        name = partitions.get_partition_name(self.month)
+        self.assertIn(name, created)
+        self.assertEqual(self.get_partition(log), name)
+
+    def test_failed_month_skipped(self):
+        """Fails if a month that couldn't be created stopped the remaining months."""
+        name = partitions.get_partition_name(self.month)
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {name} (id integer)")
+        created = partitions.create_partitions(months_ahead=9)
+        self.assertNotIn(name, created)
+        self.assertIn(
+            partitions.get_partition_name(
+                partitions.add_months(self.month, 1)
+            ),
+            created,
+        )
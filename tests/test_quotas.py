@@ -0,0 +1,107 @@
+import logging
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import models, quotas, tasks
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class MessageQuotaTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.profile = models.Profile.objects.get(pk=1)
+        self.profile.messages_count = 495
+        self.profile.save(update_fields=["messages_count"])
+
+    def test_reserve_within_limit(self):
+        """Fails if messages within the limit weren't reserved in the cache."""
+        quota = quotas.MessageQuota(self.profile)
+        self.assertTrue(quota.reserve(5))
+        self.assertEqual(quota.count(), 500)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 500)
+
+    def test_reserve_over_limit_fails(self):
+        """Fails if messages over the limit were reserved or the count wasn't restored."""
+        quota = quotas.MessageQuota(self.profile)
+        self.assertFalse(quota.reserve(6))
+        self.assertEqual(quota.count(), 495)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 495)
+
+    def test_reserve_without_limit(self):
+        """Fails if an unlimited quota refused messages over the limit."""
+        quota = quotas.MessageQuota(self.profile, limited=False)
+        self.assertTrue(quota.reserve(10))
+        self.assertEqual(quota.count(), 505)
+
+    def test_refund_restores_count(self):
+        """Fails if refunded messages weren't removed from the count."""
+        quota = quotas.MessageQuota(self.profile)
+        quota.reserve(3)
+        quota.refund(3)
+        self.assertEqual(quota.count(), 495)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 495)
+
+    def test_invalidate_reseeds_from_profile(self):
+        """Fails if an invalidated count wasn't seeded from the profile again."""
+        quotas.MessageQuota(self.profile).reserve(2)
+        quotas.invalidate_messages_count(self.profile.pk)
+        self.profile.messages_count = 0
+        self.profile.save(update_fields=["messages_count"])
+        quota = quotas.MessageQuota(self.profile)
+        quota.reserve(1)
+        self.assertEqual(quota.count(), 1)
+
+    def test_reset_not_undone_by_stale_profile(self):
+        """Fails if a request that loaded its profile before a reset restored the old count."""
+        quotas.MessageQuota(self.profile).reserve(2)
+        stale = models.Profile.objects.get(pk=self.profile.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.reset_messages_count(self.profile.pk)
+        quota = quotas.MessageQuota(stale)
+        self.assertTrue(quota.reserve(1))
+        self.assertEqual(quota.count(), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 1)
+
+    def test_seed_reads_database(self):
+        """Fails if an uncached count was seeded from a stale in-memory profile."""
+        stale = models.Profile.objects.get(pk=self.profile.pk)
+        models.Profile.objects.filter(pk=self.profile.pk).update(
+            messages_count=0
+        )
+        quota = quotas.MessageQuota(stale)
+        self.assertTrue(quota.reserve(1))
+        self.assertEqual(quota.count(), 1)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }
+    )
+    def test_database_fallback(self):
+        """Fails if messages weren't reserved and refunded in the database without a usable cache."""
+        quota = quotas.MessageQuota(self.profile)
+        self.assertTrue(quota.reserve(5))
+        self.assertFalse(quota.reserve(1))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 500)
+        quota.refund(5)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.messages_count, 495)
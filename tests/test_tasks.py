@@ -0,0 +1,136 @@
+import logging
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from terminusgps_notifier import models, tasks
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    NOTIFICATION_DISPATCHERS={
+        "sms": [
+            "terminusgps_notifier.dispatchers.DummyNotificationDispatcher"
+        ],
+        "voice": [
+            "terminusgps_notifier.dispatchers.DummyNotificationDispatcher"
+        ],
+    },
+)
+class DispatchNotificationsTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.data = {
+            "user_id": "1",
+            "unit_id": "12345678",
+            "message": "Test",
+            "msg_time_int": "0",
+        }
+        self.log = models.DispatchLog.objects.create(
+            user_id=1,
+            unit_id=12345678,
+            message="Test",
+            msg_time_int=0,
+            method="sms",
+            status="pending",
+        )
+
+    def test_successful_dispatch_marks_log_sent(self):
+        """Fails if a successful dispatch didn't mark the log as sent with its phones."""
+        with patch(
+            "terminusgps_notifier.tasks.get_phones",
+            return_value=["+15555555555"],
+        ):
+            tasks.dispatch_notifications(self.log.pk, "sms", self.data)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.status, "sent")
+        self.assertEqual(self.log.phones, ["+15555555555"])
+
+    def test_successful_dispatch_increments_messages_count(self):
+        """Fails if a successful dispatch didn't increment the profile's messages count."""
+        with patch(
+            "terminusgps_notifier.tasks.get_phones",
+            return_value=["+15555555555", "+15555555556"],
+        ):
+            tasks.dispatch_notifications(self.log.pk, "sms", self.data)
+        profile = models.Profile.objects.get(pk=1)
+        self.assertEqual(profile.messages_count, 2)
+
+    def test_no_phones_marks_log_failed(self):
+        """Fails if a dispatch without phone numbers wasn't marked as failed."""
+        with patch("terminusgps_notifier.tasks.get_phones", return_value=[]):
+            tasks.dispatch_notifications(self.log.pk, "sms", self.data)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.status, "failed")
+
+    def test_failed_dispatchers_mark_log_failed(self):
+        """Fails if a dispatch where every dispatcher failed wasn't marked as failed."""
+        with (
+            patch(
+                "terminusgps_notifier.tasks.get_phones",
+                return_value=["+15555555555"],
+            ),
+            patch(
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher.send_sms",
+                side_effect=ValueError,
+            ),
+        ):
+            tasks.dispatch_notifications(self.log.pk, "sms", self.data)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.status, "failed")
+        profile = models.Profile.objects.get(pk=1)
+        self.assertEqual(profile.messages_count, 0)
+
+    def test_error_marks_log_failed_and_refunds(self):
+        """Fails if an error after reserving messages left the log pending or kept the reservation."""
+        with (
+            patch(
+                "terminusgps_notifier.tasks.get_phones",
+                return_value=["+15555555555"],
+            ),
+            patch(
+                "terminusgps_notifier.tasks.render_message",
+                side_effect=RuntimeError,
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            tasks.dispatch_notifications(self.log.pk, "sms", self.data)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.status, "failed")
+        profile = models.Profile.objects.get(pk=1)
+        self.assertEqual(profile.messages_count, 0)
+
+    def test_stale_pending_logs_swept(self):
+        """Fails if stale pending logs weren't marked as failed at most once per interval."""
+        stale = models.DispatchLog.objects.create(
+            user_id=1,
+            unit_id=12345678,
+            message="Test",
+            msg_time_int=0,
+            method="sms",
+            status="pending",
+            pub_date=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(tasks.sweep_pending_dispatch_logs(), 1)
+        stale.refresh_from_db()
+        self.log.refresh_from_db()
+        self.assertEqual(stale.status, "failed")
+        self.assertEqual(self.log.status, "pending")
+        self.assertEqual(
+            tasks.sweep_pending_dispatch_logs(
+                now=timezone.now() + timedelta(hours=2)
+            ),
+            0,
+        )
@@ -1,14 +1,18 @@
+import asyncio
+import inspect
+import json
 import logging
 from unittest.mock import MagicMock, patch
 
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase, override_settings
 from django.utils import timezone
 from terminusgps.authorizenet.service import AuthorizenetService
 from terminusgps.wialon.session import WialonSession
 
-from terminusgps_notifier import forms, models, views
+from terminusgps_notifier import decorators, models, views
 
 logging.disable(logging.CRITICAL)
 
@@ -26,38 +30,27 @@ logging.disable(logging.CRITICAL)
 class GetDispatchersTestCase(TestCase):
     def test_invalid_method_raises_valueerror(self):
         """Fails if :py:exec:`ValueError` wasn't raised when provided with an invalid method."""
-        form = forms.NotificationDispatchForm(
-            {
-                "user_id": "1",
-                "unit_id": "12345678",
-                "message": "Test Message",
-                "msg_time_int": 0,
-            }
-        )
-        form.is_valid()
         with self.assertRaises(ValueError):
-            views.get_dispatchers(form, method="not_a_method")
+            views.get_dispatchers(method="not_a_method")
 
     def test_expected_dispatchers_returned(self):
         """Fails if the dummy dispatcher wasn't in the return value."""
-        form = forms.NotificationDispatchForm(
-            {
-                "user_id": "1",
-                "unit_id": "12345678",
-                "message": "Test Message",
-                "msg_time_int": 0,
-            }
-        )
-        form.is_valid()
-        dispatchers = views.get_dispatchers(form, method="sms")
+        dispatchers = views.get_dispatchers(method="sms")
         self.assertEqual(
             type(dispatchers[0]).__name__, "DummyNotificationDispatcher"
         )
-        dispatchers = views.get_dispatchers(form, method="voice")
+        dispatchers = views.get_dispatchers(method="voice")
         self.assertEqual(
             type(dispatchers[0]).__name__, "DummyNotificationDispatcher"
         )
 
+    def test_dispatchers_long_lived(self):
+        """Fails if new dispatcher objects were created for each call."""
+        self.assertIs(
+            views.get_dispatchers(method="sms")[0],
+            views.get_dispatchers(method="sms")[0],
+        )
+
 
 @override_settings(
     NOTIFICATION_DISPATCHERS={
@@ -70,43 +63,90 @@ class GetDispatchersTestCase(TestCase):
     }
 )
 class SendNotificationsTestCase(TestCase):
-    def test_any_dispatcher_succeeding_returns_200(self):
-        """Fails if a notification dispatcher succeeds and status code 200 wasn't returned."""
-        form = forms.NotificationDispatchForm(
-            {
-                "user_id": "1",
-                "unit_id": "12345678",
-                "message": "Test Message",
-                "msg_time_int": 0,
-            }
-        )
-        self.assertTrue(form.is_valid())
+    async def test_any_dispatcher_succeeding_delivers(self):
+        """Fails if a notification dispatcher succeeds and the phone wasn't delivered to."""
         method = "sms"
         phones = ["+15555555555"]
-        dispatchers = views.get_dispatchers(form, method)
-        response = views.send_notifications(method, phones, dispatchers)
-        self.assertEqual(response.status_code, 200)
+        dispatchers = views.get_dispatchers(method)
+        deliveries = await views.send_notifications(
+            method, phones, dispatchers, "Test Message"
+        )
+        self.assertEqual(
+            deliveries, {"+15555555555": "DummyNotificationDispatcher"}
+        )
 
-    def test_all_dispatchers_failing_returns_500(self):
-        """Fails if all notification dispatchers fail and status code 500 wasn't returned."""
+    async def test_all_dispatchers_failing_delivers_nothing(self):
+        """Fails if all notification dispatchers fail and a phone was delivered to."""
         with patch(
             "terminusgps_notifier.dispatchers.DummyNotificationDispatcher.send_sms",
             side_effect=ValueError,
         ):
-            form = forms.NotificationDispatchForm(
-                {
-                    "user_id": "1",
-                    "unit_id": "12345678",
-                    "message": "Test Message",
-                    "msg_time_int": 0,
-                }
-            )
-            self.assertTrue(form.is_valid())
             method = "sms"
             phones = ["+15555555555"]
-            dispatchers = views.get_dispatchers(form, method)
-            response = views.send_notifications(method, phones, dispatchers)
-            self.assertEqual(response.status_code, 500)
+            dispatchers = views.get_dispatchers(method)
+            deliveries = await views.send_notifications(
+                method, phones, dispatchers, "Test Message"
+            )
+            self.assertEqual(deliveries, {})
+
+    @override_settings(
+        NOTIFICATION_DISPATCHERS={
+            "sms": [
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher",
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher",
+            ]
+        }
+    )
+    async def test_only_failed_phones_fall_back(self):
+        """Fails if a phone the first dispatcher delivered to was sent to the fallback dispatcher."""
+        method = "sms"
+        phones = ["+15555555555", "+15555555556"]
+        dispatchers = views.get_dispatchers(method)
+        sent = []
+
+        async def send_sms(to_number, message, dry_run=False):
+            sent.append(to_number)
+            if sent.count("+15555555556") == 1 and to_number == "+15555555556":
+                raise ValueError
+
+        with patch(
+            "terminusgps_notifier.dispatchers.DummyNotificationDispatcher.send_sms",
+            side_effect=send_sms,
+        ):
+            deliveries = await views.send_notifications(
+                method, phones, dispatchers, "Test Message"
+            )
+        self.assertEqual(
+            deliveries,
+            {
+                "+15555555555": "DummyNotificationDispatcher",
+                "+15555555556": "DummyNotificationDispatcher",
+            },
+        )
+        self.assertEqual(sent.count("+15555555555"), 1)
+        self.assertEqual(sent.count("+15555555556"), 2)
+
+
+class GetDeliveryResponseTestCase(TestCase):
+    def test_partial_delivery_returns_200(self):
+        """Fails if a partial delivery didn't return status code 200 listing delivered and failed phones."""
+        response = views.get_delivery_response(
+            ["+15555555555", "+15555555556"],
+            {"+15555555555": "DummyNotificationDispatcher"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {
+                "delivered": {"+15555555555": "DummyNotificationDispatcher"},
+                "failed": ["+15555555556"],
+            },
+        )
+
+    def test_no_delivery_returns_500(self):
+        """Fails if no delivery didn't return status code 500."""
+        response = views.get_delivery_response(["+15555555555"], {})
+        self.assertEqual(response.status_code, 500)
 
 
 class HealthCheckViewTestCase(TestCase):
@@ -249,6 +289,182 @@ class NotifyTestCase(TestCase):
                 profile.refresh_from_db()
                 self.assertEqual(profile.messages_count, 1)
 
+    def test_view_is_async(self):
+        """Fails if the notify view wasn't a coroutine function."""
+        self.assertTrue(inspect.iscoroutinefunction(views.notify))
+
+    async def test_async_client_dispatch_succeeds(self):
+        """Fails if a notification dispatched through an async client didn't return status code 200."""
+        with patch(
+            "terminusgps_notifier.views.get_phones",
+            return_value=["+15555555555"],
+        ):
+            with patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ):
+                response = await AsyncClient().post(
+                    "/v3/notify/sms/",
+                    {
+                        "user_id": "1",
+                        "unit_id": "12345678",
+                        "message": "Test",
+                        "msg_time_int": 0,
+                    },
+                )
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        NOTIFICATION_DISPATCHERS={
+            "sms": [
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher",
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher",
+            ]
+        }
+    )
+    def test_message_rendered_once(self):
+        """Fails if the message was rendered more than once for multiple phones and fallback dispatchers."""
+        sent = []
+
+        async def send_sms(to_number, message, dry_run=False):
+            sent.append(message)
+            if len(sent) <= 3:
+                raise ValueError
+
+        with (
+            patch(
+                "terminusgps_notifier.views.get_phones",
+                return_value=["+15555555555", "+15555555556", "+15555555557"],
+            ),
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+            patch(
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher.send_sms",
+                side_effect=send_sms,
+            ),
+            patch(
+                "terminusgps_notifier.dispatchers.render_to_string",
+                return_value="Rendered",
+            ) as mock_render_to_string,
+        ):
+            response = self.client.post(
+                "/v3/notify/sms/",
+                {
+                    "user_id": "1",
+                    "unit_id": "12345678",
+                    "message": "Test",
+                    "msg_time_int": 0,
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sent, ["Rendered"] * 6)
+        mock_render_to_string.assert_called_once()
+
+    def test_server_timing_header_lists_stages(self):
+        """Fails if the Server-Timing header didn't list every notify stage."""
+        with (
+            patch(
+                "terminusgps_notifier.views.get_phones",
+                return_value=["+15555555555"],
+            ),
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+        ):
+            response = self.client.post(
+                "/v3/notify/sms/",
+                {
+                    "user_id": "1",
+                    "unit_id": "12345678",
+                    "message": "Test",
+                    "msg_time_int": 0,
+                },
+            )
+        stages = [
+            metric.split(";")[0]
+            for metric in response["Server-Timing"].split(", ")
+        ]
+        # The fixture user isn't staff, so its subscription is checked
+        for stage in (
+            "form",
+            "profile",
+            "subscription",
+            "phones",
+            "dispatch",
+            "db",
+            "total",
+        ):
+            self.assertIn(stage, stages)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_request_logged(self):
+        """Fails if a request slower than the threshold wasn't logged with its stage breakdown."""
+        with patch("terminusgps_notifier.decorators.logger") as mock_logger:
+            self.client.post("/v3/notify/sms/", {})
+        timings = mock_logger.warning.call_args.kwargs["extra"]["timings"]
+        self.assertIn("form", timings)
+        self.assertIn("total", timings)
+
+    @override_settings(NOTIFICATION_DISPATCH_MODE="enqueue")
+    def test_enqueue_mode_returns_202(self):
+        """Fails if enqueue mode didn't return status code 202 after queuing a pending dispatch log."""
+        with (
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+            patch(
+                "terminusgps_notifier.tasks.dispatch_notifications.delay"
+            ) as mock_delay,
+            patch("terminusgps_notifier.views.get_phones") as mock_get_phones,
+        ):
+            response = self.client.post(
+                "/v3/notify/sms/",
+                {
+                    "user_id": "1",
+                    "unit_id": "12345678",
+                    "message": "Test",
+                    "msg_time_int": 0,
+                },
+            )
+            self.assertEqual(response.status_code, 202)
+            log = models.DispatchLog.objects.get(user_id=1)
+            self.assertEqual(log.status, "pending")
+            mock_delay.assert_called_once()
+            self.assertEqual(mock_delay.call_args.args[0], log.pk)
+            mock_get_phones.assert_not_called()
+
+    @override_settings(NOTIFICATION_DISPATCH_MODE="enqueue")
+    def test_enqueue_failure_marks_log_failed(self):
+        """Fails if a dispatch log whose job couldn't be enqueued was left pending."""
+        self.client.raise_request_exception = False
+        with (
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+            patch(
+                "terminusgps_notifier.tasks.dispatch_notifications.delay",
+                side_effect=ConnectionError,
+            ),
+        ):
+            response = self.client.post(
+                "/v3/notify/sms/",
+                {
+                    "user_id": "1",
+                    "unit_id": "12345678",
+                    "message": "Test",
+                    "msg_time_int": 0,
+                },
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(
+            models.DispatchLog.objects.get(user_id=1).status, "failed"
+        )
+
     def test_dispatch_log_created(self):
         """Fails if a dispatch log for the notification wasn't created."""
         with patch(
@@ -273,9 +489,114 @@ class NotifyTestCase(TestCase):
                 self.assertEqual(log.message, "Test")
                 self.assertEqual(log.msg_time_int, 0)
                 self.assertEqual(log.phones, ["+15555555555"])
+                self.assertEqual(
+                    log.deliveries,
+                    {"+15555555555": "DummyNotificationDispatcher"},
+                )
                 self.assertEqual(log.method, "sms")
 
 
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    NOTIFICATION_DISPATCHERS={
+        "sms": ["terminusgps_notifier.dispatchers.DummyNotificationDispatcher"]
+    },
+)
+class IdempotentNotifyTestCase(TestCase):
+    fixtures = [
+        "terminusgps_notifier/tests/test_user.json",
+        "terminusgps_notifier/tests/test_profile.json",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.data = {
+            "user_id": "1",
+            "unit_id": "12345678",
+            "message": "Test",
+            "msg_time_int": 0,
+        }
+
+    def test_duplicate_replays_response(self):
+        """Fails if a duplicate request wasn't answered with the first response without dispatching again."""
+        with (
+            patch(
+                "terminusgps_notifier.views.get_phones",
+                return_value=["+15555555555"],
+            ) as mock_get_phones,
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+        ):
+            first = self.client.post("/v3/notify/sms/", self.data)
+            second = self.client.post("/v3/notify/sms/", self.data)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        mock_get_phones.assert_called_once()
+        response = self.client.get("/v3/idempotency/")
+        self.assertEqual(
+            json.loads(response.content), {"hits": 1, "misses": 1}
+        )
+
+    def test_different_method_not_duplicate(self):
+        """Fails if the same payload for another method was treated as a duplicate."""
+        with patch(
+            "terminusgps_notifier.views.subscription_is_active",
+            return_value=True,
+        ):
+            self.client.post("/v3/notify/sms/", self.data)
+            response = self.client.post("/v3/notify/voice/", self.data)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+    def test_failed_request_can_be_retried(self):
+        """Fails if a request that failed with status code 500 couldn't be retried."""
+        with (
+            patch(
+                "terminusgps_notifier.views.get_phones",
+                return_value=["+15555555555"],
+            ) as mock_get_phones,
+            patch(
+                "terminusgps_notifier.views.subscription_is_active",
+                return_value=True,
+            ),
+            patch(
+                "terminusgps_notifier.dispatchers.DummyNotificationDispatcher.send_sms",
+                side_effect=ValueError,
+            ),
+        ):
+            first = self.client.post("/v3/notify/sms/", self.data)
+            second = self.client.post("/v3/notify/sms/", self.data)
+        self.assertEqual(first.status_code, 500)
+        self.assertFalse(second.has_header("Idempotent-Replayed"))
+        self.assertEqual(mock_get_phones.call_count, 2)
+
+    async def test_concurrent_stats_counted(self):
+        """Fails if concurrently counted idempotency stats lost increments."""
+        await asyncio.gather(
+            *(decorators.count_idempotency_stat("hits") for _ in range(50))
+        )
+        self.assertEqual(
+            decorators.get_idempotency_stats(), {"hits": 50, "misses": 0}
+        )
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_stats_restricted(self):
+        """Fails if idempotency stats were served to an external anonymous user."""
+        self.assertEqual(self.client.get("/v3/idempotency/").status_code, 403)
+        user = get_user_model().objects.get(pk=1)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/v3/idempotency/").status_code, 403)
+        user.is_staff = True
+        user.save(update_fields=["is_staff"])
+        self.assertEqual(self.client.get("/v3/idempotency/").status_code, 200)
+
+
 class DashboardViewTestCase(TestCase):
     fixtures = [
         "terminusgps_notifier/tests/test_user.json",
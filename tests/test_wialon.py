@@ -1,8 +1,10 @@
 import logging
 from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
-from terminusgps.wialon.session import WialonSession
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from terminusgps.wialon.session import WialonAPIError, WialonSession
+from wialon.api import WialonError
 
 from terminusgps_notifier import wialon
 
@@ -53,6 +55,174 @@ class GetPhonesFromWialonTestCase(TestCase):
         self.assertEqual(result, [])
 
 
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    WIALON_PHONES_CACHE_TTL=300,
+    WIALON_PHONES_NEGATIVE_CACHE_TTL=60,
+    WIALON_PHONES_STALE_TTL=3600,
+)
+class GetPhonesCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_phones_cached_between_calls(self):
+        """Fails if cached phone numbers didn't prevent a second Wialon API lookup."""
+        with patch(
+            "terminusgps_notifier.wialon.fetch_phones",
+            return_value=["+15555555555"],
+        ) as mock_fetch_phones:
+            for _ in range(2):
+                result = wialon.get_phones("token", 12345678, 1)
+                self.assertEqual(result, ["+15555555555"])
+            mock_fetch_phones.assert_called_once()
+
+    def test_empty_phones_cached(self):
+        """Fails if an empty phone number lookup wasn't cached."""
+        with patch(
+            "terminusgps_notifier.wialon.fetch_phones", return_value=[]
+        ) as mock_fetch_phones:
+            for _ in range(2):
+                self.assertEqual(wialon.get_phones("token", 12345678, 1), [])
+            mock_fetch_phones.assert_called_once()
+
+    def test_failed_lookup_not_cached(self):
+        """Fails if a failed Wialon API session was cached."""
+        with patch(
+            "terminusgps_notifier.wialon.fetch_phones", return_value=None
+        ) as mock_fetch_phones:
+            for _ in range(2):
+                self.assertEqual(wialon.get_phones("token", 12345678, 1), [])
+            self.assertEqual(mock_fetch_phones.call_count, 2)
+
+    def test_stale_phones_returned_while_refreshing(self):
+        """Fails if expired phone numbers weren't returned while a background refresh was started."""
+        cache.set(
+            wialon.get_phones_cache_key(1, 12345678),
+            {"phones": ["+15555555555"], "expires": 0},
+        )
+        with patch(
+            "terminusgps_notifier.wialon.refresh_phones_in_background"
+        ) as mock_refresh:
+            result = wialon.get_phones("token", 12345678, 1)
+            self.assertEqual(result, ["+15555555555"])
+            mock_refresh.assert_called_once_with("token", 12345678, 1)
+
+    def test_invalidate_phones(self):
+        """Fails if invalidated phone numbers weren't looked up again."""
+        with patch(
+            "terminusgps_notifier.wialon.fetch_phones",
+            return_value=["+15555555555"],
+        ) as mock_fetch_phones:
+            wialon.get_phones("token", 12345678, 1)
+            wialon.invalidate_phones(1, 12345678)
+            wialon.get_phones("token", 12345678, 1)
+            self.assertEqual(mock_fetch_phones.call_count, 2)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    WIALON_SESSION_CACHE_TTL=240,
+)
+class TokenSessionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_session_id_shared_between_calls(self):
+        """Fails if a cached session id wasn't reused instead of logging in again."""
+        with patch(
+            "terminusgps_notifier.wialon.WialonSession"
+        ) as mock_session_cls:
+            mock_session_cls.return_value.id = "sid"
+            wialon.get_token_session("token")
+            wialon.get_token_session("token")
+            mock_session_cls.return_value.token_login.assert_called_once_with(
+                token="token"
+            )
+            self.assertEqual(mock_session_cls.call_args.kwargs["sid"], "sid")
+
+    def test_invalid_session_logs_in_again(self):
+        """Fails if an invalid session error didn't trigger a new login and retry."""
+        cache.set(wialon.get_token_session_cache_key("token"), "old_sid")
+        func = MagicMock(
+            side_effect=[
+                WialonAPIError(WialonError(1, "Invalid session")),
+                ["+15555555555"],
+            ]
+        )
+        with patch(
+            "terminusgps_notifier.wialon.WialonSession"
+        ) as mock_session_cls:
+            mock_session_cls.return_value.id = "new_sid"
+            result = wialon.call_with_token_session("token", func, 12345678)
+            self.assertEqual(result, ["+15555555555"])
+            self.assertEqual(func.call_count, 2)
+            mock_session_cls.return_value.token_login.assert_called_once()
+        self.assertEqual(
+            cache.get(wialon.get_token_session_cache_key("token")), "new_sid"
+        )
+
+    def test_other_errors_reraised(self):
+        """Fails if a non-session Wialon API error was retried instead of reraised."""
+        cache.set(wialon.get_token_session_cache_key("token"), "sid")
+        func = MagicMock(
+            side_effect=WialonAPIError(WialonError(7, "Access denied"))
+        )
+        with self.assertRaises(WialonAPIError):
+            wialon.call_with_token_session("token", func, 12345678)
+        func.assert_called_once()
+
+
+class GetPhoneNumbersByIdTestCase(TestCase):
+    def setUp(self):
+        self.session = MagicMock(WialonSession)
+        self.drivers = {"1": [{"ph": "+15555555555"}]}
+        self.search = {
+            "item": {
+                "flds": {
+                    "1": {"n": "to_number", "v": "+15555555556,+15555555557"}
+                }
+            }
+        }
+
+    def test_single_batch_request(self):
+        """Fails if driver and cfield phones weren't retrieved with a single batch request."""
+        self.session.wialon_api.core_batch.return_value = [
+            self.drivers,
+            self.search,
+        ]
+        result = wialon.get_phone_numbers_by_id(12345678, self.session)
+        self.assertEqual(
+            sorted(result), ["+15555555555", "+15555555556", "+15555555557"]
+        )
+        self.session.wialon_api.core_batch.assert_called_once()
+        self.session.wialon_api.resource_get_unit_drivers.assert_not_called()
+        self.session.wialon_api.core_search_item.assert_not_called()
+
+    def test_batch_error_falls_back_to_separate_requests(self):
+        """Fails if a failed batch request didn't fall back to separate lookups with empty list fallbacks."""
+        self.session.wialon_api.core_batch.side_effect = WialonAPIError(
+            WialonError(0, "Invalid input (4) core/batch")
+        )
+        self.session.wialon_api.resource_get_unit_drivers.side_effect = (
+            WialonAPIError(WialonError(4, "resource/get_unit_drivers"))
+        )
+        self.session.wialon_api.core_search_item.return_value = self.search
+        result = wialon.get_phone_numbers_by_id(12345678, self.session)
+        self.assertEqual(sorted(result), ["+15555555556", "+15555555557"])
+
+    def test_invalid_session_reraised(self):
+        """Fails if an invalid session error wasn't reraised for a new login."""
+        self.session.wialon_api.core_batch.side_effect = WialonAPIError(
+            WialonError(1, "core/batch")
+        )
+        with self.assertRaises(WialonAPIError):
+            wialon.get_phone_numbers_by_id(12345678, self.session)
+
+
 class GetResourcesFromWialonTestCase(TestCase):
     def test_forced_true(self):
         """Fails if `force` wasn't set to `1` before making a Wialon API call."""
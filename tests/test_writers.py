@@ -0,0 +1,185 @@
+import logging
+import subprocess
+import sys
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from terminusgps_notifier import models, writers
+
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(DISPATCH_LOG_BATCH_SIZE=3, DISPATCH_LOG_FLUSH_INTERVAL=60)
+class DispatchLogWriterTestCase(TestCase):
+    def setUp(self):
+        self.writer = writers.DispatchLogWriter()
+
+    def tearDown(self):
+        self.writer._stopped.set()
+        if self.writer._timer is not None:
+            self.writer._timer.cancel()
+
+    def create_log(self) -> models.DispatchLog:
+        return models.DispatchLog(
+            user_id=1,
+            unit_id=12345678,
+            message="Test",
+            msg_time_int=0,
+            phones=["+15555555555"],
+            method="sms",
+        )
+
+    def test_add_buffers_logs(self):
+        """Fails if a dispatch log was inserted before the buffer was full."""
+        self.writer.add(self.create_log())
+        self.assertEqual(models.DispatchLog.objects.count(), 0)
+        self.assertEqual(len(self.writer.rows), 1)
+        self.assertIsNotNone(self.writer._timer)
+
+    def test_full_buffer_flushed(self):
+        """Fails if a full buffer wasn't inserted with a single query."""
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.writer.add(self.create_log())
+        self.assertEqual(models.DispatchLog.objects.count(), 3)
+        self.assertEqual(self.writer.rows, [])
+        self.assertIsNone(self.writer._timer)
+
+    def test_flush_inserts_buffered_logs(self):
+        """Fails if flushing didn't insert the buffered dispatch logs."""
+        self.writer.add(self.create_log())
+        self.writer.add(self.create_log())
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(models.DispatchLog.objects.count(), 2)
+
+    def test_failed_flush_counts_lost_logs(self):
+        """Fails if dispatch logs that couldn't be inserted weren't counted as lost."""
+        self.writer.add(self.create_log())
+        self.writer.add(self.create_log())
+        with patch.object(
+            models.DispatchLog.objects,
+            "bulk_create",
+            side_effect=DatabaseError,
+        ):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(self.writer.lost, 2)
+        self.assertEqual(self.writer.rows, [])
+
+    def test_lifespan_hooks_registered(self):
+        """Fails if the writers' lifespan hooks weren't registered by loading the app."""
+        code = (
+            "import django; django.setup(); "
+            "from terminusgps_notifier import lifespan; "
+            "print(*[f.__qualname__ for f in lifespan._startup_hooks + lifespan._shutdown_hooks])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        hooks = result.stdout.split()
+        self.assertIn("report_lost_dispatch_logs", hooks)
+        self.assertIn("flush_dispatch_logs", hooks)
+        self.assertIn("flush_metrics", hooks)
+
+    async def test_shutdown_flushes_logs(self):
+        """Fails if the shutdown hook didn't flush the global writer."""
+        with patch.object(writers, "dispatch_log_writer") as mock_writer:
+            await writers.flush_dispatch_logs()
+            mock_writer.close.assert_called_once()
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    DISPATCH_LOG_BATCH_SIZE=3,
+    DISPATCH_LOG_FLUSH_INTERVAL=60,
+)
+class LostDispatchLogsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.writer = writers.DispatchLogWriter()
+
+    def tearDown(self):
+        self.writer._stopped.set()
+        if self.writer._timer is not None:
+            self.writer._timer.cancel()
+
+    def create_log(self) -> models.DispatchLog:
+        return models.DispatchLog(
+            user_id=1,
+            unit_id=12345678,
+            message="Test",
+            msg_time_int=0,
+            method="sms",
+        )
+
+    def flush_and_reap(self) -> int:
+        """Flushes the writer, reaping it as if it was killed while inserting."""
+        reaped = []
+
+        def kill(rows):
+            cache.delete(self.writer.get_key("alive"))
+            reaped.append(writers.reap_lost_dispatch_logs())
+
+        with patch.object(
+            models.DispatchLog.objects, "bulk_create", side_effect=kill
+        ):
+            self.writer.flush()
+        return reaped[0]
+
+    def test_killed_writer_logs_reported(self):
+        """Fails if logs being inserted by a writer without a heartbeat weren't reported once."""
+        self.writer.add(self.create_log())
+        self.writer.add(self.create_log())
+        self.assertEqual(self.flush_and_reap(), 2)
+        self.assertEqual(writers.get_lost_dispatch_logs_count(), 2)
+        self.assertEqual(writers.reap_lost_dispatch_logs(), 0)
+
+    def test_live_writer_not_reaped(self):
+        """Fails if logs being inserted by a live writer were reported as lost."""
+        self.writer.add(self.create_log())
+        with patch.object(
+            models.DispatchLog.objects,
+            "bulk_create",
+            side_effect=lambda rows: self.assertEqual(
+                writers.reap_lost_dispatch_logs(), 0
+            ),
+        ):
+            self.writer.flush()
+        self.assertEqual(cache.get(self.writer.get_key("pending")), 0)
+
+    def test_add_skips_cache(self):
+        """Fails if adding a dispatch log used the cache."""
+        with patch.object(writers, "cache") as mock_cache:
+            self.writer.add(self.create_log())
+        mock_cache.assert_not_called()
+        self.assertEqual(mock_cache.method_calls, [])
+
+    def test_writer_keeps_slot(self):
+        """Fails if a writer claimed another slot after its heartbeat expired."""
+        self.writer.add(self.create_log())
+        self.writer.flush()
+        self.assertEqual(self.writer.slot, 1)
+        cache.delete(self.writer.get_key("alive"))
+        self.writer.register()
+        self.assertEqual(self.writer.slot, 1)
+
+    def test_slots_reused(self):
+        """Fails if the slots of reaped and closed writers weren't reused."""
+        self.writer.add(self.create_log())
+        self.assertEqual(self.flush_and_reap(), 1)
+        self.assertIsNone(cache.get(writers.get_slot_key(1)))
+        other = writers.DispatchLogWriter()
+        self.addCleanup(other._stopped.set)
+        other.register()
+        self.assertEqual(other.slot, 1)
+        self.writer.register()
+        self.assertEqual(self.writer.slot, 2)
+        other.close()
+        self.assertIsNone(cache.get(writers.get_slot_key(1)))